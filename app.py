@@ -4,35 +4,22 @@
 """
 
 import streamlit as st
-import streamlit.components.v1 as components
 import pandas as pd
 import numpy as np
-from datetime import date, timedelta
-from FinMind.data import DataLoader
-from scipy.stats import norm
-import plotly.graph_objects as go
-import plotly.express as px
-
-import feedparser
+import html
 import time
-from collections import Counter
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
-import random
-import httpx
-# 開頭加這段（import）
-from supabase import create_client
 from datetime import date
-import streamlit as st
-
-@st.cache_resource
-def init_supabase():
-    return create_client(
-        st.secrets["SUPABASE_URL"],
-        st.secrets["SUPABASE_ANON_KEY"]
-    )
-
 
+# 資料抓取 / 快取放在 services、純運算放在 core：模組只在行程第一次 import，重跑只執行下面的 UI
+# 圖表 (plotly)、IV / 掃描、回測、Supabase 都延到第一次用到才載入
+from core.prefetch import prefetch
+from core.telemetry import TELEMETRY
+from services.data import (
+    backtest_taiex_leverage_v191, get_backtest_sweep, get_data, get_finmind_client, get_oi_walls, get_quota_store,
+    get_institutional_data, get_quote_streamer, get_real_news, get_render_cache, get_scan_index, get_shared_cache,
+    get_source_latency, get_support_pressure, get_write_queue, seed_quote_streamer, snapshot_version,
+    warm_option_archive, with_script_ctx,
+)
 
 
 # =========================================
@@ -77,118 +64,31 @@ for key, value in init_state.items():
 FINMIND_TOKEN = st.secrets.get("FINMIND_TOKEN", st.secrets.get("finmind_token", ""))
 
 # =========================================
-# 2. 核心函數庫 (全數保留)
+# 2. 核心函數庫 (已拆到 services/、core/)
 # =========================================
-@st.cache_data(ttl=60)
-def get_data(token):
-    dl = DataLoader()
-    if token: dl.login_by_token(api_token=token)
-    try:
-        index_df = dl.taiwan_stock_daily("TAIEX", start_date=(date.today()-timedelta(days=100)).strftime("%Y-%m-%d"))
-        S = float(index_df["close"].iloc[-1]) if not index_df.empty else 23000.0
-        ma20 = index_df['close'].rolling(20).mean().iloc[-1] if len(index_df) > 20 else S * 0.98
-        ma60 = index_df['close'].rolling(60).mean().iloc[-1] if len(index_df) > 60 else S * 0.95
-    except: 
-        S, ma20, ma60 = 23000.0, 22800.0, 22500.0
-
-    opt_start = (date.today() - timedelta(days=30)).strftime("%Y-%m-%d")
-    df = dl.taiwan_option_daily("TXO", start_date=opt_start)
-    if df.empty: return S, pd.DataFrame(), pd.to_datetime(date.today()), ma20, ma60
-    
-    df["date"] = pd.to_datetime(df["date"])
-    latest = df["date"].max()
-    return S, df[df["date"] == latest].copy(), latest, ma20, ma60
-
-@st.cache_data(ttl=1800)
-def get_real_news(token):
-    dl = DataLoader()
-    if token: dl.login_by_token(api_token=token)
-    start_date = (date.today() - timedelta(days=3)).strftime("%Y-%m-%d")
-    try:
-        news = dl.taiwan_stock_news(stock_id="TAIEX", start_date=start_date)
-        if news.empty:
-            news = dl.taiwan_stock_news(stock_id="2330", start_date=start_date)
-        news["date"] = pd.to_datetime(news["date"])
-        news = news.sort_values("date", ascending=False).head(10)
-        return news
-    except:
-        return pd.DataFrame()
-
-@st.cache_data(ttl=1800)
-def get_institutional_data(token):
-    dl = DataLoader()
-    if token: dl.login_by_token(api_token=token)
-    start_date = (date.today() - timedelta(days=10)).strftime("%Y-%m-%d")
-    try:
-        df = dl.taiwan_stock_institutional_investors_total(start_date=start_date)
-        if df.empty: return pd.DataFrame()
-        df["date"] = pd.to_datetime(df["date"])
-        latest_date = df["date"].max()
-        df_latest = df[df["date"] == latest_date].copy()
-        df_latest["net"] = (df_latest["buy"] - df_latest["sell"]) / 100000000
-        return df_latest
-    except:
-        return pd.DataFrame()
-
-@st.cache_data(ttl=3600)
-def get_support_pressure(token):
-    dl = DataLoader()
-    if token: dl.login_by_token(api_token=token)
-    start_date = (date.today() - timedelta(days=90)).strftime("%Y-%m-%d")
-    try:
-        df = dl.taiwan_stock_daily("TAIEX", start_date=start_date)
-        if df.empty: return 0, 0
-        pressure = df['max'].tail(20).max()
-        support = df['min'].tail(60).min()
-        return pressure, support
-    except:
-        return 0, 0
-
-def bs_price_delta(S, K, T, r, sigma, cp):
-    if T <= 0: return 0.0, 0.5
-    try:
-        d1 = (np.log(S/K) + (r + 0.5*sigma**2)*T) / (sigma * np.sqrt(T))
-        d2 = d1 - sigma * np.sqrt(T)
-        if cp == "CALL": return S*norm.cdf(d1)-K*np.exp(-r*T)*norm.cdf(d2), norm.cdf(d1)
-        return K*np.exp(-r*T)*norm.cdf(-d2)-S*norm.cdf(-d1), -norm.cdf(-d1)
-    except: return 0.0, 0.5
-
-def calculate_win_rate(delta, days):
-    return min(max((abs(delta)*0.7 + 0.8*0.3)*100, 1), 99)
-
-def plot_payoff(K, premium, cp):
-    x_range = np.linspace(K * 0.9, K * 1.1, 100)
-    profit = []
-    for spot in x_range:
-        val = (max(0, spot - K) - premium) if cp == "CALL" else (max(0, K - spot) - premium)
-        profit.append(val * 50)
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(x=x_range, y=profit, mode='lines', fill='tozeroy', 
-                             line=dict(color='green' if profit[-1]>0 else 'red')))
-    fig.add_hline(y=0, line_dash="dash", line_color="gray")
-    fig.update_layout(title=f"到期損益圖 ({cp} @ {K})", xaxis_title="指數", yaxis_title="損益(TWD)", 
-                      height=300, margin=dict(l=0,r=0,t=30,b=0))
-    return fig
-
-def plot_oi_walls(current_price):
-    strikes = np.arange(int(current_price)-600, int(current_price)+600, 100)
-    np.random.seed(int(current_price)) 
-    call_oi = np.random.randint(2000, 15000, len(strikes))
-    put_oi = np.random.randint(2000, 15000, len(strikes))
-    fig = go.Figure()
-    fig.add_trace(go.Bar(x=strikes, y=call_oi, name='Call OI (壓力)', marker_color='#FF6B6B'))
-    fig.add_trace(go.Bar(x=strikes, y=-put_oi, name='Put OI (支撐)', marker_color='#4ECDC4'))
-    fig.update_layout(title="籌碼戰場 (OI Walls)", barmode='overlay', height=300, margin=dict(l=0,r=0,t=30,b=0))
-    return fig
+finmind = get_finmind_client()
+finmind.begin_rerun()
+rerun_t0 = time.perf_counter()
 
 # =========================================
 # 3. 載入數據 & 側邊欄
 # =========================================
 with st.spinner("🚀 啟動財富引擎..."):
-    try:
-        S_current, df_latest, latest_date, ma20, ma60 = get_data(FINMIND_TOKEN)
-    except:
-        S_current, df_latest, latest_date, ma20, ma60 = 23000.0, pd.DataFrame(), pd.to_datetime(date.today()), 22800.0, 22500.0
+    # 快報 + 法人 / 新聞面板用到的來源同時抓，單一來源慢或失敗只影響自己的面板；延遲顯示在快報下方
+    startup = prefetch({
+        "market": (lambda: get_data(FINMIND_TOKEN), 25.0),
+        "news": (lambda: get_real_news(FINMIND_TOKEN), 8.0),
+        "institutional": (lambda: get_institutional_data(FINMIND_TOKEN), 8.0),
+        "support": (lambda: get_support_pressure(FINMIND_TOKEN), 8.0),
+    }, fallbacks={
+        "market": (23000.0, pd.DataFrame(), pd.to_datetime(date.today()), 22800.0, 22500.0),
+        "news": pd.DataFrame(), "institutional": pd.DataFrame(), "support": (0, 0),
+    }, wrap=with_script_ctx)
+    S_current, df_latest, latest_date, ma20, ma60 = startup["market"].value
+    warm_option_archive(FINMIND_TOKEN)  # 回測用的 TXO 歷史在背景回補，每個 token 只啟動一次
+    # 畫面衍生物 (表格、圖) 以快照版本 + 元件參數記憶，重跑時沒變的不重建
+    snap = snapshot_version(latest_date, df_latest, S_current)
+    render_cache = get_render_cache()
         
 
 
@@ -200,19 +100,49 @@ with st.spinner("🚀 啟動財富引擎..."):
 st.markdown("# 🥯 ** 貝伊果屋 - 0050不只正2**")
 st.markdown("-專為沒資源散戶打造--")
 
+def market_header():
+    change_pct = (S_current - ma20) / ma20 * 100
+    return {
+        "index": (f"{S_current:,.0f}", f"{change_pct:+.1f}%"),
+        "ma_trend": "🔥 多頭" if ma20 > ma60 else "⚖️ 盤整",
+        "real_date": min(latest_date.date(), date.today()).strftime("%m/%d"),
+        "signal": "🟢 大好局面" if S_current > ma20 > ma60 else "🟡 觀望",
+    }
+
+
+header = render_cache.get("header", snap, (ma20, ma60, date.today()), market_header)
 col1, col2, col3, col4 = st.columns(4, gap="small")
 with col1:
-    change_pct = (S_current - ma20) / ma20 * 100
-    st.metric("📈 加權指數", f"{S_current:,.0f}", f"{change_pct:+.1f}%")
+    st.metric("📈 加權指數", *header["index"])
 with col2:
-    ma_trend = "🔥 多頭" if ma20 > ma60 else "⚖️ 盤整"
-    st.metric("均線狀態", ma_trend)
+    st.metric("均線狀態", header["ma_trend"])
 with col3:
-    real_date = min(latest_date.date(), date.today())
-    st.metric("資料更新", real_date.strftime("%m/%d"))
+    st.metric("資料更新", header["real_date"])
 with col4:
-    signal = "🟢 大好局面" if S_current > ma20 > ma60 else "🟡 觀望"
-    st.metric("今日建議", signal)
+    st.metric("今日建議", header["signal"])
+st.caption("⏱️ 資料來源延遲：" + " | ".join(
+    f"{r.name} {r.seconds:.2f}s" + ("" if r.ok else f" ⚠️{r.error.split(':')[0]}")
+    for r in [*startup.values(), *get_source_latency().values()]))
+
+# 法人 / 新聞：兩個本地歷史庫 (flow_store) 記憶體裡的最新切片，補抓照 30 分鐘節流
+INVESTOR_NAMES = {"Foreign_Investor": "外資", "Investment_Trust": "投信", "Dealer_self": "自營商",
+                  "Dealer_Hedging": "自營商避險", "Foreign_Dealer_Self": "外資自營商", "total": "合計"}
+with st.expander("📰 法人動向 & 盤前新聞", expanded=False):
+    pressure, support = startup["support"].value
+    flows = startup["institutional"].value
+    flow_cols = st.columns(2 + len(flows))
+    flow_cols[0].metric("20日壓力", f"{pressure:,.0f}" if pressure else "—")
+    flow_cols[1].metric("60日支撐", f"{support:,.0f}" if support else "—")
+    for col, row in zip(flow_cols[2:], flows.itertuples()):
+        col.metric(INVESTOR_NAMES.get(row.name, str(row.name)), f"{row.net:+,.1f} 億")
+    news = startup["news"].value
+    if news.empty:
+        st.caption("暫無新聞")
+    for row in news.itertuples():
+        st.markdown(f"""
+        <div class='news-card'><span class='source-badge'>{html.escape(str(row.source))}</span>{pd.Timestamp(row.date):%m/%d %H:%M}<br>
+        <a href='{html.escape(str(row.link))}' target='_blank'><b>{html.escape(str(row.title))}</b></a></div>
+        """, unsafe_allow_html=True)
 st.markdown("---")
 
 # =========================================
@@ -247,122 +177,87 @@ tabs = st.tabs(tabnames)
 # ──────────────────────────────────────────────────────────────────────────
 # Tab 0 v19.1 完整版：槓桿篩選 + Email付費回測 + Supabase VIP收集
 # ────────────────────────────────────────────────────────────────────────────────
-from supabase import create_client
-
-@st.cache_resource
-def init_supabase():
-    return create_client(
-        st.secrets["SUPABASE_URL"],
-        st.secrets["SUPABASE_ANON_KEY"]
-    )
-
 with tabs[0]:
     KEY_RES = "results_lev_v191"
     KEY_BEST = "best_lev_v191"
     KEY_BT = "backtest_lev_v191"
     KEY_EMAIL = "email_v191"
-    KEY_USES = "bt_uses_v191"
+    KEY_IV = "iv_smile_v191"
+    KEY_RES_VER = "results_ver_v191"
+    KEY_SCAN_MSG = "scan_msg_v191"
 
     if KEY_RES not in st.session_state: st.session_state[KEY_RES] = []
     if KEY_BEST not in st.session_state: st.session_state[KEY_BEST] = None
     if KEY_BT not in st.session_state: st.session_state[KEY_BT] = None
     if KEY_EMAIL not in st.session_state: st.session_state[KEY_EMAIL] = ""
-    if KEY_USES not in st.session_state: st.session_state[KEY_USES] = 0
+    if KEY_IV not in st.session_state: st.session_state[KEY_IV] = None
+    if KEY_RES_VER not in st.session_state: st.session_state[KEY_RES_VER] = None
 
     st.markdown("### ♟️ **貝伊果屋專業戰情室 v19.1 (付費回測)**")
-    col_search, col_backtest = st.columns([1.3, 0.7])
-
-    def calculate_raw_score_v191(delta, days, volume, S, K, op_type):
-        s_delta = abs(delta) * 100.0
-        m = (S - K) / S if op_type == "CALL" else (K - S) / S
-        s_money = max(-10, min(m * 100 * 2, 10)) + 50
-        s_time = min(days / 90.0 * 100, 100)
-        s_vol = min(volume / 5000.0 * 100, 100)
-        return s_delta * 0.4 + s_money * 0.2 + s_time * 0.2 + s_vol * 0.2
-
-    def micro_expand_scores_v191(results):
-        if not results: return []
-        results.sort(key=lambda x: x['raw_score'], reverse=True)
-        n = len(results)
-        top_n = max(1, int(n * 0.4))
-        for i in range(n):
-            if i < top_n:
-                score = 95.0 - (i / (top_n - 1) * 5.0) if top_n > 1 else 95.0
-            else:
-                remain = n - top_n
-                idx = i - top_n
-                score = 85.0 - (idx / (remain - 1) * 70.0) if remain > 1 else 15.0
-            results[i]['勝率'] = round(score, 1)
-        return results
-
-    @st.cache_data(ttl=3600)
-    def backtest_taiex_leverage_v191(lev, days, token):
-        try:
-            from FinMind.data import DataLoader
-            dl = DataLoader()
-            if token: dl.login_by_token(api_token=token)
-            start_date = (date.today() - timedelta(days=max(days * 2, 180))).strftime("%Y-%m-%d")
-            df_taiex = dl.taiwan_stock_daily("TAIEX", start_date=start_date)
-            if df_taiex.empty: raise ValueError("TAIEX數據為空")
-            df_taiex['date'] = pd.to_datetime(df_taiex['date'])
-            df_taiex = df_taiex.sort_values('date').reset_index(drop=True)
-            df_taiex['ret'] = df_taiex['close'].pct_change().fillna(0)
-            theta_decay = 0.0003
-            lev_returns = (df_taiex['ret'] * lev * 0.8 - theta_decay).clip(lower=-0.95)
-            df_taiex['cum_tai'] = (1 + df_taiex['ret']).cumprod()
-            df_taiex['cum_lev'] = (1 + lev_returns).cumprod()
-            avg_ret = lev_returns.mean()
-            std_ret = lev_returns.std()
-            return (df_taiex[['date', 'cum_tai', 'cum_lev']].copy(), {
-                'total_lev': df_taiex['cum_lev'].iloc[-1] - 1,
-                'total_tai': df_taiex['cum_tai'].iloc[-1] - 1,
-                'win_rate': round((lev_returns > 0).mean() * 100, 1),
-                'sharpe': round((avg_ret / std_ret * np.sqrt(252)) if std_ret > 0 else 0, 2),
-                'maxdd': round((df_taiex['cum_lev'] / df_taiex['cum_lev'].cummax() - 1).min() * 100, 1),
-                'trades': len(df_taiex), 'lev': lev,
-                'avg_ret': round(avg_ret * 100, 2)
-            })
-        except:
-            np.random.seed(42)
-            n_days = min(days * 2, 365)
-            dates = pd.date_range(end=date.today(), periods=n_days, freq='B')
-            mock_daily_ret = np.random.normal(0.0005, 0.012, n_days)
-            mock_lev_ret = mock_daily_ret * lev * 0.8 - 0.0003
-            mock_df = pd.DataFrame({
-                'date': dates,
-                'cum_tai': (1 + pd.Series(mock_daily_ret)).cumprod(),
-                'cum_lev': (1 + pd.Series(mock_lev_ret)).cumprod()
-            })
-            mock_avg = mock_lev_ret.mean()
-            mock_std = mock_lev_ret.std()
-            return (mock_df, {
-                'total_lev': mock_df['cum_lev'].iloc[-1] - 1,
-                'total_tai': mock_df['cum_tai'].iloc[-1] - 1,
-                'win_rate': round((pd.Series(mock_lev_ret) > 0).mean() * 100, 1),
-                'sharpe': round((mock_avg / mock_std * np.sqrt(252)) if mock_std > 0 else 0, 2),
-                'maxdd': round((mock_df['cum_lev'] / mock_df['cum_lev'].cummax() - 1).min() * 100, 1),
-                'trades': n_days, 'lev': lev, 'avg_ret': round(mock_avg * 100, 2)
-            })
-
-    # ════ 左欄：免費槓桿掃描 ════════════════════════════════════════════════════
-    with col_search:
-        st.markdown("#### 🔍 **免費槓桿掃描 (LEAPS CALL優化)** 💰")
-        if df_latest.empty:
-            st.error("⚠️ 無最新資料，請檢查數據源")
-            st.stop()
-
-        df_work = df_latest.copy()
-        df_work['call_put'] = df_work['call_put'].str.upper().str.strip()
-        for col in ['close', 'volume', 'strike_price']:
-            df_work[col] = pd.to_numeric(df_work[col], errors='coerce').fillna(0)
 
+    def results_table(records):
+        # Top15 顯示用表格 (整欄格式化)；同一次掃描結果只建一次
+        df_display = pd.DataFrame(records)
+        df_display['權利金'] = df_display['價格'].round(0).astype(int)
+        df_display['槓桿'] = df_display['槓桿'].map("{:.1f}x".format)
+        df_display['Delta'] = df_display['Delta'].map("{:.3f}".format)
+        df_display['勝率'] = df_display['勝率'].map("{:.1f}%".format)
+        df_display['天數'] = df_display['天數'].astype(int)
+        return df_display[["合約", "履約價", "類型", "權利金", "槓桿", "勝率", "Delta", "天數", "狀態"]]
+
+    def strategy_view(records, picked, qtys, smile):
+        from core.strategy import legs_from_scan, strategy_pnl
+        from services.charts import plot_strategy
+        legs = legs_from_scan([records[i] for i in picked], qtys, smile=smile)
+        with TELEMETRY.span("strategy_pnl"):
+            grid = strategy_pnl(legs, np.linspace(S_current * 0.85, S_current * 1.15, 301))
+        return grid, plot_strategy(grid)
+
+    @st.fragment
+    def strategy_panel():
+        # 片段：換腳位 / 口數只重跑這個區塊
+        res_records, res_ver = st.session_state[KEY_RES], st.session_state[KEY_RES_VER]
+        if not res_records: return
+        labels = [f"{r['合約']} {r['履約價']} {r['類型']} @{r['價格']:.0f}" for r in res_records]
+        picked = st.multiselect("選擇合約 (最多 6 腳)", list(range(len(labels))), default=[0],
+                                format_func=lambda i: labels[i], max_selections=6, key="v191_legs")
+        qty_cols = st.columns(max(len(picked), 1))
+        qtys = [qty_cols[j].number_input("口數 (負=賣出)", -10, 10, 1, key=f"v191_qty_{i}") for j, i in enumerate(picked)]
+        if picked:
+            grid, fig = render_cache.get("strategy", snap, (res_ver, tuple(picked), tuple(qtys)),
+                                         lambda: strategy_view(res_records, picked, qtys, st.session_state[KEY_IV]))
+            st.plotly_chart(fig, use_container_width=True)
+            st.caption(f"到期最大獲利 {grid.max_profit:,.0f} 元 | 最大虧損 {grid.max_loss:,.0f} 元 (指數 ±15% 範圍內)")
+
+    live = get_quote_streamer()
+
+    @st.fragment(run_every=live.push_interval if live is not None else None)
+    def live_panel(live):
+        # 片段：照串流的發布節奏讀記憶體裡最新的快照，只有這一塊在動，不整頁重跑
+        snap_live = live.snapshot()
+        if snap_live is None: return
+        op_live = "CALL" if "CALL" in st.session_state.get("v191_dir", "CALL") else "PUT"
+        lev_live = st.session_state.get("v191_lev", 5.0)
+        live_df = snap_live.rank(lev_live, op_live, top=10)
+        live_df["價格"] = live_df["價格"].round(0).astype(int)
+        live_df["槓桿"] = live_df["槓桿"].map("{:.1f}x".format)
+        live_df["勝率"] = live_df["勝率"].map("{:.1f}%".format)
+        live_df["即時"] = np.where(live_df["即時"], "🟢 盤中", "收盤")
+        live_stats = live.stats()
+        st.metric("⚡ 即時加權指數", f"{snap_live.S:,.0f}", f"{snap_live.S - S_current:+.0f} (較收盤)")
+        st.dataframe(live_df, use_container_width=True, hide_index=True)
+        st.caption(f"目標 {lev_live:.1f}x {op_live} | 逐筆 {live_stats['ticks']:,} | 發布 #{snap_live.version} | "
+                   f"重算 {live_stats['repriced_rows']:,} 檔次 | {pd.Timestamp(snap_live.ts, unit='s', tz='Asia/Taipei'):%H:%M:%S}")
+
+    @st.fragment
+    def scan_panel(scan_index, scan_smile):
+        # 片段：換方向 / 月份 / 槓桿、按掃描只重跑這一欄，不重跑整頁
         c1, c2, c3, c4 = st.columns([1, 1, 1, 0.6])
         with c1:
             dir_mode = st.selectbox("📊 方向", ["📈 CALL (LEAPS)", "📉 PUT"], 0, key="v191_dir")
             op_type = "CALL" if "CALL" in dir_mode else "PUT"
         with c2:
-            contracts = df_work[df_work['call_put'] == op_type]['contract_date'].dropna()
-            available = sorted(contracts[contracts.astype(str).str.len() == 6].unique())
+            available = scan_index.contracts(op_type)
             default_idx = len(available) - 1 if available else 0
             sel_con = st.selectbox("📅 月份", available if available else [""], index=default_idx, key="v191_con")
         with c3:
@@ -371,63 +266,43 @@ with tabs[0]:
             if st.button("🧹 重置全部", key="v191_reset_all"):
                 for k in [KEY_RES, KEY_BEST, KEY_BT]:
                     st.session_state[k] = None if 'best' in k else []
+                st.session_state[KEY_IV] = None
+                st.session_state[KEY_RES_VER] = None
                 st.rerun()
 
+        scan_all_mode = st.checkbox("🌐 一次掃全部月份 × CALL/PUT (全域排名)", key="v191_scan_all")
         if st.button("🚀 智慧掃描", type="primary", use_container_width=True, key="v191_scan"):
             st.session_state[KEY_RES] = []
             st.session_state[KEY_BEST] = None
             st.session_state[KEY_BT] = None
-            if sel_con and len(str(sel_con)) == 6:
-                tdf = df_work[(df_work["contract_date"].astype(str) == sel_con) & (df_work["call_put"] == op_type)]
-                if tdf.empty:
-                    st.warning("⚠️ 無此合約交易資料")
+            # 結果版本 = 掃描當下的快照 + 參數：之後快照更新了，舊結果也不會對到別人的新結果
+            st.session_state[KEY_RES_VER] = (snap, scan_all_mode, sel_con, op_type, target_lev)
+            if scan_all_mode:
+                with TELEMETRY.span("scan_all"):
+                    scan_df = scan_index.scan_all(target_lev, top=15)
+                st.session_state[KEY_IV] = scan_smile if not scan_smile.empty else None
+                if scan_df.empty:
+                    st.session_state[KEY_SCAN_MSG] = ("warning", "⚠️ 無符合條件的優質合約")
                 else:
-                    try:
-                        y, m = int(str(sel_con)[:4]), int(str(sel_con)[4:6])
-                        days_to_exp = max((date(y, m, 15) - latest_date.date()).days, 1)
-                        T_years = days_to_exp / 365.0
-                    except Exception as e:
-                        st.error(f"日期解析失敗: {e}")
-                        st.stop()
-
-                    raw_results = []
-                    for _, row in tdf.iterrows():
-                        try:
-                            strike = float(row["strike_price"])
-                            volume = float(row["volume"])
-                            close_price = float(row["close"])
-                            if strike <= 0: continue
-                            try:
-                                r, vola = 0.02, 0.2
-                                d1 = (np.log(S_current / strike) + (r + 0.5 * vola**2) * T_years) / (vola * np.sqrt(T_years))
-                                delta = norm.cdf(d1) if op_type == "CALL" else -norm.cdf(-d1)
-                            except:
-                                delta = 0.5
-                            bs_price = (abs(delta) * S_current) / target_lev
-                            price = close_price if volume > 0 else bs_price
-                            if price <= 0.5 or abs(delta) < 0.1: continue
-                            leverage = (abs(delta) * S_current) / price
-                            score = calculate_raw_score_v191(delta, days_to_exp, volume, S_current, strike, op_type)
-                            raw_results.append({
-                                "履約價": int(strike), "價格": round(price, 1),
-                                "狀態": "🟢成交" if volume > 0 else "🔵合理價",
-                                "槓桿": leverage, "Delta": round(delta, 3),
-                                "raw_score": score, "Vol": int(volume),
-                                "差距": abs(leverage - target_lev),
-                                "合約": sel_con, "類型": op_type, "天數": days_to_exp
-                            })
-                        except:
-                            continue
-
-                    if raw_results:
-                        final_results = micro_expand_scores_v191(raw_results)
-                        final_results.sort(key=lambda x: (x['差距'], -x['勝率'], -x['天數']))
-                        st.session_state[KEY_RES] = final_results[:15]
-                        st.session_state[KEY_BEST] = final_results[0]
-                        st.success(f"✅ 掃描完成！最佳槓桿：{final_results[0]['槓桿']:.1f}x | 勝率：{final_results[0]['勝率']}%")
-                    else:
-                        st.warning("⚠️ 無符合條件的優質合約")
-
+                    final_results = scan_df.to_dict("records")
+                    st.session_state[KEY_RES] = final_results
+                    st.session_state[KEY_BEST] = final_results[0]
+                    st.session_state[KEY_SCAN_MSG] = ("success", f"✅ 全市場掃描完成 ({len(scan_index.groups)} 組月份 × 買賣權)！最佳：{final_results[0]['合約']} {final_results[0]['類型']} 槓桿 {final_results[0]['槓桿']:.1f}x | 勝率：{final_results[0]['勝率']}%")
+            elif sel_con and len(str(sel_con)) == 6:
+                with TELEMETRY.span("scan"):
+                    scan_df = scan_index.scan(sel_con, op_type, target_lev, top=15)
+                st.session_state[KEY_IV] = scan_smile[scan_smile["contract_date"] == sel_con] if not scan_smile.empty else None
+                if scan_df.empty:
+                    st.session_state[KEY_SCAN_MSG] = ("warning", "⚠️ 無符合條件的優質合約")
+                else:
+                    final_results = scan_df.to_dict("records")
+                    st.session_state[KEY_RES] = final_results
+                    st.session_state[KEY_BEST] = final_results[0]
+                    st.session_state[KEY_SCAN_MSG] = ("success", f"✅ 掃描完成！最佳槓桿：{final_results[0]['槓桿']:.1f}x | 勝率：{final_results[0]['勝率']}%")
+            # 回測面板的預設槓桿 / 天數跟著最佳合約，舊的回測結果也清掉了 → 整頁重跑讓它一起更新 (訊息留到重跑後顯示)
+            st.rerun(scope="app")
+        scan_msg = st.session_state.pop(KEY_SCAN_MSG, None)
+        if scan_msg: getattr(st, scan_msg[0])(scan_msg[1])
         if st.session_state[KEY_RES]:
             best_contract = st.session_state[KEY_BEST]
             st.markdown("─" * 60)
@@ -441,17 +316,21 @@ with tabs[0]:
                 <p>到期：<b>{best_contract['天數']}天</b> | 狀態：<span style='color:yellow'>{best_contract['狀態']}</span></p>
             </div>
             """, unsafe_allow_html=True)
+            res_ver = st.session_state[KEY_RES_VER]
             with st.expander(f"📋 Top15完整結果 ({len(st.session_state[KEY_RES])}筆)", expanded=True):
-                df_display = pd.DataFrame(st.session_state[KEY_RES]).copy()
-                df_display['權利金'] = df_display['價格'].round(0).astype(int)
-                df_display['槓桿'] = df_display['槓桿'].apply(lambda x: f"{x:.1f}x")
-                df_display['Delta'] = df_display['Delta'].apply(lambda x: f"{x:.3f}")
-                df_display['勝率'] = df_display['勝率'].apply(lambda x: f"{x:.1f}%")
-                df_display['天數'] = df_display['天數'].astype(int)
-                st.dataframe(df_display[["合約", "履約價", "權利金", "槓桿", "勝率", "Delta", "天數", "狀態"]], use_container_width=True, hide_index=True)
-
-    # ════ 右欄：Email付費回測 ════════════════════════════════════════════════════════
-    with col_backtest:
+                df_display = render_cache.get("top15", res_ver[0], res_ver[1:], lambda: results_table(st.session_state[KEY_RES]))
+                st.dataframe(df_display, use_container_width=True, hide_index=True)
+            smile = st.session_state[KEY_IV]
+            if smile is not None and smile["converged"].any():
+                with st.expander(f"📈 隱含波動率微笑 ({smile['converged'].sum()}/{len(smile)} 檔收斂)", expanded=False):
+                    from core.iv import iv_surface
+                    st.line_chart(render_cache.get("iv_surface", snap, res_ver, lambda: iv_surface(smile, S_current) * 100),
+                                  use_container_width=True)
+            with st.expander("🧮 策略損益模擬 (價差 / 跨式)", expanded=False):
+                strategy_panel()
+
+    @st.fragment
+    def backtest_panel():
         st.markdown("#### 🔒 **貝伊果屋付費回測引擎 (每日3次免費)** 💎")
 
         # ── Email授權區（只出現一次）────────────────────────────────────────────────
@@ -468,26 +347,22 @@ with tabs[0]:
             if st.button("✅ 立即開通", type="secondary", use_container_width=True, key="email_auth_v191"):
                 if '@' in email_entered and '.' in email_entered.split('@')[-1]:
                     st.session_state[KEY_EMAIL] = email_entered
-                    st.session_state[KEY_USES] = 0
-                    # 🔥 寫入 Supabase
-                    try:
-                        supabase = init_supabase()
-                        supabase.table("vips").insert({
-                            "email": email_entered,
-                            "uses": 0,
-                            "source": "貝伊果屋 v19.1"
-                        }).execute()
-                    except:
-                        pass
-                    st.success(f"🎉 {email_entered} 授權成功！剩餘3/3次")
+                    # 🔥 寫入 Supabase (本機佇列，背景送出；斷線會重試，不會卡住按鈕)
+                    # 額度記在伺服器端，重新開通不會歸零
+                    vip_email = email_entered.strip().lower()
+                    get_write_queue().enqueue("vips", vip_email, {
+                        "email": vip_email,
+                        "source": "貝伊果屋 v19.1"
+                    })
+                    st.success(f"🎉 {email_entered} 授權成功！今日剩餘{get_quota_store().remaining(vip_email)}/3次")
                     st.balloons()
                     st.rerun()
                 else:
                     st.error("❌ Email格式錯誤 (需包含@和.)")
 
         email_authorized = bool(st.session_state[KEY_EMAIL] and '@' in st.session_state[KEY_EMAIL])
-        daily_quota = 3
-        remaining_uses = daily_quota - st.session_state[KEY_USES] if email_authorized else 0
+        quota = get_quota_store()
+        remaining_uses = quota.remaining(st.session_state[KEY_EMAIL]) if email_authorized else 0
 
         if not email_authorized:
             st.warning("🔒 **請輸入Email開通付費功能**")
@@ -514,20 +389,41 @@ with tabs[0]:
 
             backtest_leverage = st.slider("🎯 回測槓桿", 2.0, 20.0, round(default_leverage, 1), 0.5, key="v191_backtest_leverage")
             backtest_days = st.slider("📅 回測天數", 30, 500, min(default_duration, 365), 30, key="v191_backtest_days")
+            try:
+                bt_sweep = get_backtest_sweep(FINMIND_TOKEN)
+                _, preview = bt_sweep.lookup(backtest_leverage, backtest_days)
+                st.caption(f"⚡ 即時預覽 (指數近似，不扣額度)：總報酬 {preview['total_lev']:.1%} | Sharpe {preview['sharpe']:.2f} | 最大回撤 {preview['maxdd']:.1f}% | 日勝率 {preview['win_rate']:.1f}%")
+                with st.expander("🗺️ 槓桿 × 天數 熱力圖 (總報酬)", expanded=False):
+                    from services.charts import plot_sweep_heatmap
+                    sweep_ver = f"{bt_sweep.dates[-1]}:{len(bt_sweep.dates)}"
+                    fig_grid = render_cache.get("sweep_heatmap", sweep_ver, (), lambda: plot_sweep_heatmap(bt_sweep))
+                    st.plotly_chart(fig_grid, use_container_width=True)
+            except Exception:
+                pass
 
             col_run1, col_run2 = st.columns([3, 1])
             with col_run1:
                 if st.button(f"🔄 貝伊果屋回測 (剩餘{remaining_uses}/3)", type="primary", use_container_width=True, key="execute_backtest_v191"):
-                    with st.spinner("🚀 專業回測引擎啟動中..."):
-                        bt_chart_data, bt_metrics = backtest_taiex_leverage_v191(backtest_leverage, backtest_days, FINMIND_TOKEN)
-                        st.session_state[KEY_USES] += 1
-                        st.session_state[KEY_BT] = {
-                            'data': bt_chart_data, 'metrics': bt_metrics,
-                            'email': st.session_state[KEY_EMAIL],
-                            'remaining': daily_quota - st.session_state[KEY_USES],
-                            'params': {'lev': backtest_leverage, 'days': backtest_days}
-                        }
-                        st.success("✅ 回測完成！結果已儲存")
+                    # 先原子扣額度再跑 (多開分頁同時按也不會超過 3 次)，回測失敗退回
+                    ok, left = quota.try_consume(st.session_state[KEY_EMAIL])
+                    if not ok:
+                        st.error("⏰ **今日額度已用完** | 明天12:00自動重置")
+                    else:
+                        with st.spinner("🚀 專業回測引擎啟動中..."):
+                            try:
+                                bt_chart_data, bt_metrics = backtest_taiex_leverage_v191(backtest_leverage, backtest_days, FINMIND_TOKEN)
+                            except Exception:
+                                quota.refund(st.session_state[KEY_EMAIL])
+                                raise
+                            st.session_state[KEY_BT] = {
+                                'data': bt_chart_data, 'metrics': bt_metrics,
+                                'email': st.session_state[KEY_EMAIL],
+                                'remaining': left,
+                                'params': {'lev': backtest_leverage, 'days': backtest_days},
+                                # 圖表用的表在回測當下建好一次，之後重跑直接畫
+                                'chart': bt_chart_data.set_index('date').set_axis(['大盤累積報酬', f'{bt_metrics["lev"]:.1f}x LEAPS'], axis=1),
+                            }
+                            st.success("✅ 回測完成！結果已儲存")
             with col_run2:
                 if st.button("📱 Threads更新", key="threads_update_v191"):
                     st.toast(f"已記錄 {st.session_state[KEY_EMAIL]} 到貝伊果屋VIP名單")
@@ -545,10 +441,9 @@ with tabs[0]:
                     st.metric("日勝率", f"{metrics_result['win_rate']:.1f}%")
                 with col_kpi4:
                     st.metric("最大回撤", f"{metrics_result['maxdd']:.1f}%")
-                chart_data = bt_result['data'].set_index('date')
-                chart_data.columns = ['大盤累積報酬', f'{metrics_result["lev"]:.1f}x LEAPS']
-                st.line_chart(chart_data, use_container_width=True)
-                st.caption(f"📊 回測 {metrics_result['trades']} 個交易日 | Theta每日衰減 0.03% | 授權Email：{bt_result['email']} | 剩餘額度：{bt_result['remaining']}/3")
+                st.line_chart(bt_result['chart'], use_container_width=True)
+                engine_note = f"真實TXO換倉 {metrics_result['rolls']} 次 (含滑價/手續費/稅)" if metrics_result.get('engine') == 'txo' else "Theta每日衰減 0.03%"
+                st.caption(f"📊 回測 {metrics_result['trades']} 個交易日 | {engine_note} | 授權Email：{bt_result['email']} | 剩餘額度：{bt_result['remaining']}/3")
                 col_action1, col_action2 = st.columns(2)
                 with col_action1:
                     if st.button("🗑️ 清除回測結果", key="clear_bt_result_v191"):
@@ -557,6 +452,32 @@ with tabs[0]:
                 with col_action2:
                     st.caption("⚙️ 重跑不扣額度")
 
+    col_search, col_backtest = st.columns([1.3, 0.7])
+
+    # ════ 左欄：免費槓桿掃描 ════════════════════════════════════════════════════
+    with col_search:
+        st.markdown("#### 🔍 **免費槓桿掃描 (LEAPS CALL優化)** 💰")
+        if df_latest.empty:
+            st.error("⚠️ 無最新資料，請檢查數據源")
+            st.stop()
+
+        # 每份快照只建一次索引 (跨 session 共用)，之後換月份 / 槓桿都是查表
+        scan_index, scan_smile = get_scan_index(df_latest, S_current, latest_date, len(df_latest))
+        oi_walls = get_oi_walls(df_latest, latest_date, len(df_latest))
+        if oi_walls is not None:
+            with st.expander(f"🧱 籌碼戰場：壓力 {oi_walls.call_wall:,.0f} | 支撐 {oi_walls.put_wall:,.0f} | 最大痛點 {oi_walls.max_pain:,.0f} | P/C {oi_walls.pcr:.2f}", expanded=False):
+                from services.charts import plot_oi_walls
+                st.plotly_chart(render_cache.get("oi_walls", snap, (), lambda: plot_oi_walls(oi_walls, S_current)), use_container_width=True)
+
+        if live is not None and st.toggle("⚡ 盤中即時槓桿 (串流報價)", key="v191_live"):
+            seed_quote_streamer(live, snap, df_latest, S_current, latest_date, scan_smile)
+            live_panel(live)
+        scan_panel(scan_index, scan_smile)
+
+    # ════ 右欄：Email付費回測 ════════════════════════════════════════════════════════
+    with col_backtest:
+        backtest_panel()
+
     # ── 底部 ──────────────────────────────────────────────────────────────────────
     st.markdown("─" * 90)
     st.markdown("#### 💎 **貝伊果屋功能對比表**")
@@ -579,5 +500,15 @@ with tabs[0]:
     ⚠️ **僅供學習研究，非投資建議** | 實際交易請諮詢專業顧問
     """)
     st.caption("© 貝伊果屋 2026 | mintung.chen@beigou.tw")
-
-
+    fm_stats = finmind.rerun_stats()
+    st.caption(f"🔌 FinMind 本次重跑：登入 {fm_stats['logins']} 次 | 新連線 {fm_stats['connections']} 條 | 請求 {fm_stats['requests']} 次 | 重登 {fm_stats['auth_retries']} 次")
+    sc_stats = get_shared_cache().stats()
+    st.caption(f"🗄️ 共用快取 (本行程累計)：命中 {sc_stats['hits']} | 舊快照先回 {sc_stats['stale']} | 回源 {sc_stats['loads']} | 合併等待 {sc_stats['coalesced']} | 失敗 {sc_stats['errors']}")
+
+if TELEMETRY.enabled: TELEMETRY.observe("rerun", time.perf_counter() - rerun_t0)
+
+# 隱藏的管理面板：網址加 ?admin=<ADMIN_TOKEN> 才出現
+admin_token = st.secrets.get("ADMIN_TOKEN", "")
+if admin_token and st.query_params.get("admin") == admin_token:
+    from services.admin import render_admin_panel
+    render_admin_panel()
@@ -0,0 +1,25 @@
+"""
+真實 TXO 回測引擎測速：多年期合成歷史鏈
+執行：python -m benchmarks.bench_backtest
+"""
+
+import time
+
+from benchmarks.synthetic import make_history
+from core.backtest import run_option_backtest
+
+
+def main():
+    for years in (1, 3, 5):
+        taiex, chain = make_history(years=years)
+        runs = []
+        for lev in (3.0, 5.0, 10.0):
+            t0 = time.perf_counter()
+            _, metrics = run_option_backtest(chain, taiex, lev)
+            runs.append(time.perf_counter() - t0)
+        print(f"{years}y  chain rows={len(chain):>9,}  worst={max(runs) * 1e3:6.0f} ms  rolls={metrics['rolls']}")
+        assert max(runs) < 1.0, "多年期回測應在 1 秒內完成"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+法人 / 新聞：每 30 分鐘整段重抓 (舊做法) vs 依水位增量追加 (core.flow_store)，比較請求數、下載位元組與面板結果
+模擬一個交易日裡 ticks 次刷新，中途當天的新聞陸續進來、收盤後法人資料公布
+執行：python -m benchmarks.bench_flow_store
+"""
+
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.fake_finmind import FakeFinMind
+from core.finmind_client import FinMindClient
+from core.flow_store import InstitutionalHistory, NewsHistory
+
+NAMES = ["Foreign_Investor", "Investment_Trust", "Dealer_self", "Dealer_Hedging", "Foreign_Dealer_Self"]
+TICKS = 16
+NEWS_PER_DAY = 60
+
+
+def make_news(days):
+    rng = np.random.default_rng(0)
+    rows = []
+    for d in days:
+        for i in range(NEWS_PER_DAY):
+            t = pd.Timestamp(d) + pd.Timedelta(hours=8, minutes=int(i * 600 / NEWS_PER_DAY))
+            rows.append({"date": t.strftime("%Y-%m-%d %H:%M:%S"), "stock_id": "TAIEX", "title": f"{d} 標題 {i}",
+                         "description": "內文摘要" * int(rng.integers(10, 40)), "link": f"https://news.example/{d}/{i}",
+                         "source": ["經濟日報", "工商時報", "鉅亨網"][i % 3]})
+    return pd.DataFrame(rows)
+
+
+def make_institutional(days):
+    rng = np.random.default_rng(1)
+    return pd.DataFrame([{"date": str(d), "name": n, "buy": int(rng.integers(1e9, 9e10)), "sell": int(rng.integers(1e9, 9e10))}
+                         for d in days for n in NAMES])
+
+
+def legacy_news(fm):
+    start_date = (date.today() - timedelta(days=3)).strftime("%Y-%m-%d")
+    news = fm.fetch("", "taiwan_stock_news", stock_id="TAIEX", start_date=start_date)
+    if news.empty:
+        news = fm.fetch("", "taiwan_stock_news", stock_id="2330", start_date=start_date)
+    news["date"] = pd.to_datetime(news["date"])
+    return news.sort_values("date", ascending=False).head(10)
+
+
+def legacy_institutional(fm):
+    start_date = (date.today() - timedelta(days=10)).strftime("%Y-%m-%d")
+    df = fm.fetch("", "taiwan_stock_institutional_investors_total", start_date=start_date)
+    df["date"] = pd.to_datetime(df["date"])
+    df_latest = df[df["date"] == df["date"].max()].copy()
+    df_latest["net"] = (df_latest["buy"] - df_latest["sell"]) / 100000000
+    return df_latest
+
+
+def run(fake, step):
+    """step(fm, tick) 回傳 (news, institutional)；新資料依 tick 進場，每個 tick 比一次面板"""
+    today = date.today()
+    past = [today - timedelta(days=i) for i in range(14, 0, -1)]
+    news_all, inst_all = make_news(past + [today]), make_institutional(past + [today])
+    fm = FinMindClient(api_url=fake.api_url)
+    outputs = []
+    t0 = time.perf_counter()
+    for tick in range(TICKS):
+        # 當天新聞隨 tick 逐步進來；最後四個 tick 當作收盤後，法人資料公布
+        shown = int(NEWS_PER_DAY * (tick + 1) / TICKS)
+        day = news_all["date"].str[:10]
+        fake.fixtures["TaiwanStockNews"] = news_all[(day < str(today)) | (news_all.index % NEWS_PER_DAY < shown)]
+        fake.fixtures["TaiwanStockTotalInstitutionalInvestors"] = inst_all if tick >= TICKS - 4 else inst_all[inst_all["date"] < str(today)]
+        outputs.append(step(fm, tick))
+    return time.perf_counter() - t0, fm.stats(), outputs
+
+
+def main():
+    with FakeFinMind() as fake, tempfile.TemporaryDirectory() as tmp:
+        legacy_s, legacy_stats, legacy_out = run(fake, lambda fm, tick: (legacy_news(fm), legacy_institutional(fm)))
+
+        stores = {}
+
+        def incremental(fm, tick):
+            if not stores:
+                stores["news"] = NewsHistory(fm, os.path.join(tmp, "news.parquet"), refresh_interval=0)
+                stores["inst"] = InstitutionalHistory(fm, os.path.join(tmp, "inst.parquet"), refresh_interval=0)
+            return stores["news"].latest(""), stores["inst"].latest("")
+
+        inc_s, inc_stats, inc_out = run(fake, incremental)
+
+        print(f"{TICKS} refreshes, {NEWS_PER_DAY} news/day")
+        print(f"refetch     {legacy_stats['requests']:>3} requests {legacy_stats['bytes'] / 1e3:>9.1f} kB  {legacy_s:.2f}s")
+        print(f"incremental {inc_stats['requests']:>3} requests {inc_stats['bytes'] / 1e3:>9.1f} kB  {inc_s:.2f}s")
+        print(f"bytes saved {1 - inc_stats['bytes'] / legacy_stats['bytes']:.0%}")
+
+        for (ln, li), (nn, ni) in zip(legacy_out, inc_out):
+            assert list(ln["title"]) == list(nn["title"]), "最新 10 則新聞應相同"
+            a = li.sort_values("name")[["name", "net"]].reset_index(drop=True)
+            b = ni.assign(name=ni["name"].astype(str)).sort_values("name")[["name", "net"]].reset_index(drop=True)
+            pd.testing.assert_frame_equal(a, b, check_dtype=False)
+
+        news, inst = stores["news"], stores["inst"]
+        print(f"news history {len(news.history())} rows (fetched {news.fetched_rows}, duplicates dropped "
+              f"{news.fetched_rows - len(news.history())}), file {os.path.getsize(news.path) / 1e3:.1f} kB")
+        print(f"institutional history {len(inst.history())} rows, {inst.net_flows().shape[0]} days")
+        assert news.history()["hash"].is_unique
+        assert isinstance(news.history()["source"].dtype, pd.CategoricalDtype)
+        assert inc_stats["bytes"] < legacy_stats["bytes"] / 2
+
+        # 重啟：從 Parquet 讀回，最新切片不變、不必先抓
+        fm = FinMindClient(api_url=fake.api_url)
+        again = NewsHistory(fm, news.path)
+        assert list(again.latest()["title"]) == list(news.latest()["title"]) and fm.stats()["requests"] == 0
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+冷啟動 import 測速：舊版 app.py 開頭的 import 清單 vs 拆分後的啟動路徑
+每個情境開新的 Python 行程跑 -X importtime，解析 stderr 算總時間，並回報行程的峰值記憶體 (ru_maxrss)
+執行：python -m benchmarks.bench_import [--repeat 5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 舊版 (v19.1) app.py 最上層的 import，依原檔順序 (本機沒裝的套件會列為「未安裝」，實際部署還要再加上它們的成本)
+LEGACY = [
+    "streamlit", "streamlit.components.v1", "pandas", "numpy", "datetime", "FinMind.data", "scipy.stats",
+    "plotly.graph_objects", "plotly.express", "feedparser", "time", "collections", "wordcloud",
+    "matplotlib.pyplot", "random", "httpx", "supabase",
+]
+# 拆分後 app.py 啟動時真正載入的模組
+SLIM = ["streamlit", "pandas", "numpy", "time", "datetime", "core.prefetch", "core.telemetry", "services.data"]
+
+_CHILD = """
+import importlib, json, resource, sys
+missing = []
+for name in {mods!r}:
+    try:
+        importlib.import_module(name)
+    except ImportError:
+        missing.append(name)
+print(json.dumps({{"maxrss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, "missing": missing}}))
+"""
+
+
+def parse_importtime(stderr):
+    """回傳 {最上層模組: 累積微秒}；縮排的子模組已算在上層的 cumulative 裡"""
+    top = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line: continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        if name[1:2] != " ":  # "| name" 後面沒有縮排 = 最上層
+            top[name.strip()] = int(cumulative)
+    return top
+
+
+def run_once(mods):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD.format(mods=mods)],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    info = json.loads(proc.stdout.strip().splitlines()[-1])
+    info["modules"] = parse_importtime(proc.stderr)
+    info["total_ms"] = sum(info["modules"].values()) / 1e3
+    return info
+
+
+def report(label, mods, repeat):
+    runs = [run_once(mods) for _ in range(repeat)]
+    best = min(runs, key=lambda r: r["total_ms"])
+    total = statistics.median(r["total_ms"] for r in runs)
+    rss = statistics.median(r["maxrss_kb"] for r in runs) / 1024
+    print(f"\n== {label} ==  import {total:7.0f} ms (中位數, {repeat} 次)  峰值記憶體 {rss:6.0f} MB")
+    for name, us in sorted(best["modules"].items(), key=lambda kv: -kv[1])[:8]:
+        print(f"   {us / 1e3:7.1f} ms  {name}")
+    if best["missing"]:
+        print("   未安裝：" + ", ".join(best["missing"]))
+    return total, rss
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    legacy_ms, legacy_mb = report("舊版 app.py import 清單", LEGACY, args.repeat)
+    slim_ms, slim_mb = report("拆分後啟動路徑", SLIM, args.repeat)
+    print(f"\n冷啟動省下 {legacy_ms - slim_ms:.0f} ms ({1 - slim_ms / legacy_ms:.0%})，"
+          f"每個容器行程少 {legacy_mb - slim_mb:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
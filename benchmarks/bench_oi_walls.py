@@ -0,0 +1,51 @@
+"""
+OI 籌碼牆測速：pandas pivot_table + 逐價位迴圈算最大痛點 vs core.oi_walls 的 bincount 樞紐 + 矩陣
+執行：python -m benchmarks.bench_oi_walls
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from core.oi_walls import OIWallTracker, compute_oi_walls, strike_oi
+
+
+def make_oi_chain(n_contracts, strikes=400, seed=0):
+    rng = np.random.default_rng(seed)
+    grid = 23000 + 50.0 * (np.arange(strikes) - strikes // 2)
+    frames = [pd.DataFrame({"contract_date": f"2026{m:02d}" if m <= 12 else f"2027{m - 12:02d}", "strike_price": grid,
+                            "call_put": cp, "open_interest": rng.integers(0, 20000, strikes)})
+              for m in range(1, n_contracts + 1) for cp in ("call", "put")]
+    return pd.concat(frames, ignore_index=True)
+
+
+def legacy(chain):
+    pv = chain.pivot_table(index="strike_price", columns=chain["call_put"].str.upper(), values="open_interest", aggfunc="sum", fill_value=0)
+    strikes, call, put = pv.index.to_numpy(), pv["CALL"].to_numpy(), pv["PUT"].to_numpy()
+    pain = [sum(c * max(s - k, 0) for k, c in zip(strikes, call)) + sum(p * max(k - s, 0) for k, p in zip(strikes, put)) for s in strikes]
+    return strikes[int(np.argmin(pain))]
+
+
+def main():
+    for n_contracts in (3, 12):
+        today, prev = make_oi_chain(n_contracts, seed=1), make_oi_chain(n_contracts, seed=0)
+        t0 = time.perf_counter()
+        ref = legacy(today)
+        t_legacy = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        walls = compute_oi_walls("2026-10-16", strike_oi(today), strike_oi(prev))
+        t_new = time.perf_counter() - t0
+        assert walls.max_pain == ref
+
+        tracker = OIWallTracker()
+        tracker.walls("2026-10-16", today, prev_day="2026-10-15", load_day=lambda d: prev)
+        t0 = time.perf_counter()
+        tracker.walls("2026-10-16", today, prev_day="2026-10-15", load_day=lambda d: prev)
+        t_cached = time.perf_counter() - t0
+        print(f"rows={len(today):>6,}  pivot+迴圈痛點 {t_legacy * 1e3:8.1f} ms | 向量化 {t_new * 1e3:6.2f} ms | 同一交易日再取 {t_cached * 1e3:5.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
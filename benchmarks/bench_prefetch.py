@@ -0,0 +1,57 @@
+"""
+冷啟動測速：逐一呼叫 vs core.prefetch 並行，對象是本地假 FinMind 伺服器
+執行：python -m benchmarks.bench_prefetch
+"""
+
+import time
+from datetime import date, timedelta
+
+from benchmarks.fake_finmind import FakeFinMind
+from core.finmind_client import FinMindClient
+from core.prefetch import prefetch
+
+DELAYS = {"TaiwanStockPrice": 0.4, "TaiwanOptionDaily": 0.8, "TaiwanStockNews": 0.3,
+          "TaiwanStockTotalInstitutionalInvestors": 0.5}
+
+
+def startup_jobs(client):
+    ago = lambda n: (date.today() - timedelta(days=n)).strftime("%Y-%m-%d")
+    return {
+        "taiex": lambda: client.fetch("", "taiwan_stock_daily", stock_id="TAIEX", start_date=ago(100)),
+        "txo": lambda: client.fetch("", "taiwan_option_daily", option_id="TXO", start_date=ago(3)),
+        "news": lambda: client.fetch("", "taiwan_stock_news", stock_id="TAIEX", start_date=ago(3)),
+        "institutional": lambda: client.fetch("", "taiwan_stock_institutional_investors_total", start_date=ago(10)),
+    }
+
+
+def main():
+    with FakeFinMind(DELAYS) as fake:
+        client = FinMindClient(api_url=fake.api_url)
+        jobs = startup_jobs(client)
+
+        t0 = time.perf_counter()
+        for fn in jobs.values(): fn()
+        serial = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        res = prefetch(jobs, timeout=5.0)
+        parallel = time.perf_counter() - t0
+
+        slowest, total = max(DELAYS.values()), sum(DELAYS.values())
+        print(f"serial   {serial:.2f}s  (sum of delays {total:.2f}s)")
+        print(f"parallel {parallel:.2f}s  (slowest single call {slowest:.2f}s)")
+        for r in res.values():
+            print(f"  {r.name:<14} {r.seconds:.2f}s ok={r.ok} rows={0 if r.value is None else len(r.value)}")
+        assert all(r.ok for r in res.values())
+        assert parallel < slowest + 0.5 * (total - slowest), "並行冷啟動應接近最慢單一請求"
+
+        # 其中一個來源卡住：只有它逾時退回預設值，其他照常
+        fake.delays["TaiwanStockNews"] = 3.0
+        t0 = time.perf_counter()
+        res = prefetch({**jobs, "news": (jobs["news"], 1.0)}, timeout=5.0, fallbacks={"news": None})
+        print(f"one slow source: {time.perf_counter() - t0:.2f}s, news ok={res['news'].ok} ({res['news'].error})")
+        assert not res["news"].ok and res["txo"].ok
+
+
+if __name__ == "__main__":
+    main()
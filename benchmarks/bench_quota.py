@@ -0,0 +1,76 @@
+"""
+每日額度測試：查詢延遲 (LRU 命中 / 冷查 SQLite) 與多行程、多執行緒同時扣額度不超扣
+執行：python -m benchmarks.bench_quota
+"""
+
+import multiprocessing as mp
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from core.quota import QuotaStore
+
+USERS, LIMIT = 2000, 3
+
+
+def hammer(path, n_threads, attempts, out):
+    # 一個行程 = 一個 Streamlit 副本；每個執行緒 = 一個 session，每位使用者狂按回測
+    store = QuotaStore(path, limit=LIMIT)
+    granted = [0] * n_threads
+
+    def run(k):
+        for _ in range(attempts):
+            for u in range(k % 7, USERS, 7):
+                ok, _ = store.try_consume(f"user{u}@x.tw", day="2026-01-02")
+                granted[k] += ok
+
+    threads = [threading.Thread(target=run, args=(k,)) for k in range(n_threads)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    out.put(sum(granted))
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "quota.sqlite")
+        store = QuotaStore(path, limit=LIMIT)
+        emails = [f"user{u}@x.tw" for u in range(USERS)]
+
+        cold = []
+        for e in emails:
+            t0 = time.perf_counter()
+            store.remaining(e)
+            cold.append(time.perf_counter() - t0)
+        hot = []
+        for _ in range(5):
+            for e in emails:
+                t0 = time.perf_counter()
+                store.remaining(e)
+                hot.append(time.perf_counter() - t0)
+        consume = []
+        for e in emails:
+            t0 = time.perf_counter()
+            store.try_consume(e)
+            consume.append(time.perf_counter() - t0)
+        ms = lambda xs, q: float(np.percentile(np.asarray(xs) * 1e3, q))
+        print(f"remaining() LRU 命中  p50 {ms(hot, 50):.4f} ms  p99 {ms(hot, 99):.4f} ms")
+        print(f"remaining() 冷查      p50 {ms(cold, 50):.4f} ms  p99 {ms(cold, 99):.4f} ms")
+        print(f"try_consume()         p50 {ms(consume, 50):.4f} ms  p99 {ms(consume, 99):.4f} ms")
+
+        # 4 個行程 × 8 執行緒，每位使用者被搶著扣很多次：總共只能成功 USERS × LIMIT 次
+        out = mp.get_context("spawn").Queue()
+        t0 = time.perf_counter()
+        procs = [mp.get_context("spawn").Process(target=hammer, args=(path, 8, 2, out)) for _ in range(4)]
+        for p in procs: p.start()
+        granted = sum(out.get() for _ in procs)
+        for p in procs: p.join()
+        print(f"4 行程 × 8 執行緒搶額度：成功 {granted} 次 (上限 {USERS * LIMIT})，{time.perf_counter() - t0:.2f}s")
+        assert granted == USERS * LIMIT
+        assert all(QuotaStore(path).remaining(e, day="2026-01-02") == 0 for e in emails[:50])
+
+
+if __name__ == "__main__":
+    main()
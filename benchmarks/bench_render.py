@@ -0,0 +1,91 @@
+"""
+重跑時的畫面衍生物：每次重建 (舊做法) vs core.render_cache 以 (快照版本, 元件參數) 記憶
+面板越多，舊做法每次重跑的成本線性變大；記憶化之後未變的面板只剩一次 dict 查詢
+另外量 Plotly Figure → JSON (Streamlit 每畫一次圖都要做)，這部分靠 st.fragment 讓沒變的面板不重跑來省
+執行：python -m benchmarks.bench_render
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+from benchmarks.bench_iv import AS_OF, S, make_full_chain
+from benchmarks.bench_oi_walls import make_oi_chain
+from benchmarks.synthetic import make_history
+from core.oi_walls import compute_oi_walls, strike_oi
+from core.render_cache import RenderCache
+from core.scan_index import ScanIndex
+from core.strategy import legs_from_scan, strategy_pnl
+from core.sweep import sweep_leverage_horizon
+from services.charts import plot_oi_walls, plot_strategy, plot_sweep_heatmap
+
+FIGURES = ("oi_walls", "sweep_heatmap", "strategy")
+
+
+def top15_table(records):
+    # 原本 app 裡的寫法：逐格 lambda
+    df_display = pd.DataFrame(records).copy()
+    df_display['權利金'] = df_display['價格'].round(0).astype(int)
+    df_display['槓桿'] = df_display['槓桿'].apply(lambda x: f"{x:.1f}x")
+    df_display['Delta'] = df_display['Delta'].apply(lambda x: f"{x:.3f}")
+    df_display['勝率'] = df_display['勝率'].apply(lambda x: f"{x:.1f}%")
+    df_display['天數'] = df_display['天數'].astype(int)
+    return df_display[["合約", "履約價", "類型", "權利金", "槓桿", "勝率", "Delta", "天數", "狀態"]]
+
+
+def strategy_view(records):
+    grid = strategy_pnl(legs_from_scan(records[:2], [1, -1]), np.linspace(S * 0.85, S * 1.15, 301))
+    return grid, plot_strategy(grid)
+
+
+def median_ms(fn, repeat=15):
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t0)
+    return np.median(runs) * 1e3
+
+
+def main():
+    records = ScanIndex(make_full_chain(), S, AS_OF).scan_all(5.0, top=15).to_dict("records")
+    walls = compute_oi_walls(AS_OF, strike_oi(make_oi_chain(7, seed=1)), strike_oi(make_oi_chain(7, seed=0)))
+    sweep = sweep_leverage_horizon(make_history(years=3)[0])
+    panels = {
+        "top15": lambda: top15_table(records),
+        "oi_walls": lambda: plot_oi_walls(walls, S),
+        "sweep_heatmap": lambda: plot_sweep_heatmap(sweep),
+        "strategy": lambda: strategy_view(records),
+        "header": lambda: {"change_pct": (S - S * 0.98) / (S * 0.98) * 100},
+    }
+    snap = f"{AS_OF:%Y%m%d}:2800:{S:.2f}"
+    cache = RenderCache()
+
+    print(f"{'panel':<14} {'rebuild ms':>10} {'memo hit ms':>12} {'to_json ms':>11}")
+    total_rebuild = total_hit = 0.0
+    for name, build in panels.items():
+        first = cache.get(name, snap, (5.0,), build)
+        rebuild = median_ms(build)
+        hit = median_ms(lambda: cache.get(name, snap, (5.0,), build), repeat=200)
+        fig = first[1] if name == "strategy" else first
+        to_json = median_ms(lambda: pio.to_json(fig.to_dict(), validate=False)) if name in FIGURES else float("nan")
+        total_rebuild += rebuild
+        total_hit += hit
+        print(f"{name:<14} {rebuild:>10.2f} {hit:>12.4f} {to_json:>11.2f}")
+        assert cache.get(name, snap, (5.0,), build) is first
+    print(f"{'per rerun':<14} {total_rebuild:>10.2f} {total_hit:>12.4f}")
+
+    # 內容與重建一致；參數或快照版本一變就重建
+    pd.testing.assert_frame_equal(cache.get("top15", snap, (5.0,), panels["top15"]), top15_table(records))
+    misses = cache.misses
+    cache.get("top15", snap, (5.5,), panels["top15"])
+    cache.get("top15", snap + "x", (5.0,), panels["top15"])
+    assert cache.misses == misses + 2
+    assert total_hit * 100 < total_rebuild, "記憶化後每次重跑的衍生物成本應小兩個數量級以上"
+    print(cache.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+智慧掃描測速：舊版 iterrows() 迴圈 vs core.scanner.scan_chain
+執行：python -m benchmarks.bench_scan
+"""
+
+import time
+
+import numpy as np
+from scipy.stats import norm
+
+from benchmarks.synthetic import make_chain
+from core.scanner import scan_chain
+
+S, T_YEARS, DAYS, TARGET_LEV, OP = 23000.0, 60 / 365.0, 60, 5.0, "CALL"
+
+
+def calculate_raw_score_v191(delta, days, volume, S, K, op_type):
+    s_delta = abs(delta) * 100.0
+    m = (S - K) / S if op_type == "CALL" else (K - S) / S
+    s_money = max(-10, min(m * 100 * 2, 10)) + 50
+    s_time = min(days / 90.0 * 100, 100)
+    s_vol = min(volume / 5000.0 * 100, 100)
+    return s_delta * 0.4 + s_money * 0.2 + s_time * 0.2 + s_vol * 0.2
+
+
+def micro_expand_scores_v191(results):
+    if not results: return []
+    results.sort(key=lambda x: x['raw_score'], reverse=True)
+    n = len(results)
+    top_n = max(1, int(n * 0.4))
+    for i in range(n):
+        if i < top_n:
+            score = 95.0 - (i / (top_n - 1) * 5.0) if top_n > 1 else 95.0
+        else:
+            remain = n - top_n
+            idx = i - top_n
+            score = 85.0 - (idx / (remain - 1) * 70.0) if remain > 1 else 15.0
+        results[i]['勝率'] = round(score, 1)
+    return results
+
+
+def legacy_scan(tdf, S_current, T_years, days_to_exp, target_lev, op_type, sel_con):
+    """v19.1 app.py 原始迴圈 (逐字保留作為基準)"""
+    raw_results = []
+    for _, row in tdf.iterrows():
+        try:
+            strike = float(row["strike_price"])
+            volume = float(row["volume"])
+            close_price = float(row["close"])
+            if strike <= 0: continue
+            try:
+                r, vola = 0.02, 0.2
+                d1 = (np.log(S_current / strike) + (r + 0.5 * vola**2) * T_years) / (vola * np.sqrt(T_years))
+                delta = norm.cdf(d1) if op_type == "CALL" else -norm.cdf(-d1)
+            except:
+                delta = 0.5
+            bs_price = (abs(delta) * S_current) / target_lev
+            price = close_price if volume > 0 else bs_price
+            if price <= 0.5 or abs(delta) < 0.1: continue
+            leverage = (abs(delta) * S_current) / price
+            score = calculate_raw_score_v191(delta, days_to_exp, volume, S_current, strike, op_type)
+            raw_results.append({
+                "履約價": int(strike), "價格": round(price, 1),
+                "狀態": "🟢成交" if volume > 0 else "🔵合理價",
+                "槓桿": leverage, "Delta": round(delta, 3),
+                "raw_score": score, "Vol": int(volume),
+                "差距": abs(leverage - target_lev),
+                "合約": sel_con, "類型": op_type, "天數": days_to_exp
+            })
+        except:
+            continue
+    final_results = micro_expand_scores_v191(raw_results)
+    final_results.sort(key=lambda x: (x['差距'], -x['勝率'], -x['天數']))
+    return final_results
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main():
+    print(f"{'rows':>8} {'legacy (ms)':>12} {'vectorized (ms)':>16} {'speedup':>8}")
+    for n in (100, 1_000, 100_000):
+        tdf = make_chain(n, S=S, op_type=OP, T_years=T_YEARS)
+        repeat = 1 if n >= 100_000 else 5
+        t_old, old = best_of(lambda: legacy_scan(tdf, S, T_YEARS, DAYS, TARGET_LEV, OP, "202612"), repeat)
+        t_new, new = best_of(lambda: scan_chain(tdf, S, T_YEARS, TARGET_LEV, OP, days_to_exp=DAYS), repeat * 3)
+        assert len(old) == len(new)
+        assert [r["履約價"] for r in old[:15]] == new["履約價"].head(15).tolist()
+        print(f"{n:>8} {t_old * 1e3:>12.2f} {t_new * 1e3:>16.2f} {t_old / t_new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
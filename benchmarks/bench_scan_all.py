@@ -0,0 +1,64 @@
+"""
+全月份 × CALL/PUT 掃描測速：逐組 ScanIndex.scan 串接再排序 vs ScanIndex.scan_all 一次向量化
+結果逐欄比對必須完全相同；scan_all 的耗時應與單一月份的 scan 同一量級
+執行：python -m benchmarks.bench_scan_all
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_iv import AS_OF, S, make_full_chain
+from core.scan_index import ScanIndex, scan_underlyings
+from core.scanner import SCAN_COLUMNS
+
+LEVERAGES = np.arange(2.0, 20.0 + 1e-9, 0.5)
+
+
+def reference(index, lev, top):
+    parts = [index.scan(con, cp, lev, top=10**9) for con, cp in index.groups]
+    out = pd.concat([p for p in parts if not p.empty], ignore_index=True)
+    order = np.lexsort((-out["天數"].to_numpy(), -out["勝率"].to_numpy(), out["差距"].to_numpy()))
+    return out.iloc[order[:top]].reset_index(drop=True)
+
+
+def median_ms(fn, repeat=20):
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t0)
+    return np.median(runs) * 1e3
+
+
+def main():
+    for strikes in (100, 400, 2000):
+        rng = np.random.default_rng(strikes)
+        chain = make_full_chain(strikes).sample(frac=1, random_state=0).reset_index(drop=True)
+        chain.loc[rng.random(len(chain)) < 0.3, "volume"] = 0
+        index = ScanIndex(chain, S, AS_OF)
+        for lev in LEVERAGES:
+            pd.testing.assert_frame_equal(reference(index, lev, 15), index.scan_all(lev, 15), check_dtype=False)
+        con = index.contracts("CALL")[-1]
+        one = median_ms(lambda: index.scan(con, "CALL", 5.0))
+        loop = median_ms(lambda: reference(index, 5.0, 15), 5)
+        index.scan_all(5.0)  # 第一次會攤平索引
+        everything = median_ms(lambda: index.scan_all(5.0))
+        print(f"rows={len(chain):>7,}  單一月份 scan {one:5.2f} ms | 逐組 {len(index.groups)} 次再排序 {loop:6.2f} ms"
+              f" → scan_all {everything:5.2f} ms")
+
+    # 多標的：各自 scan_all 取前 15 再合併 == 全部攤平一起排
+    other = make_full_chain(150, seed=1).assign(strike_price=lambda d: d["strike_price"] / 40)
+    indexes = {"TXO": ScanIndex(make_full_chain(200), S, AS_OF), "TEO": ScanIndex(other, S / 40, AS_OF)}
+    for lev in (3.0, 8.0, 15.0):
+        merged = scan_underlyings(indexes, lev)
+        flat = pd.concat([reference(idx, lev, 10**9).assign(標的=name) for name, idx in indexes.items()], ignore_index=True)
+        order = np.lexsort((-flat["天數"].to_numpy(), -flat["勝率"].to_numpy(), flat["差距"].to_numpy()))
+        expect = flat.iloc[order[:15]][["標的", *SCAN_COLUMNS]].reset_index(drop=True)
+        pd.testing.assert_frame_equal(expect, merged, check_dtype=False)
+    print("多標的合併排名 == 全部攤平排名 ✅", merged["標的"].value_counts().to_dict())
+
+
+if __name__ == "__main__":
+    main()
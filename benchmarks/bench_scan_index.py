@@ -0,0 +1,49 @@
+"""
+掃描索引測速：每次點擊重新篩選 + 評分 (scan_chain) vs 快照索引查表 (ScanIndex.scan)
+兩者的前 15 名逐欄比對必須完全相同
+執行：python -m benchmarks.bench_scan_index
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_iv import AS_OF, MONTHS, S, make_full_chain
+from core.iv import chain_sigma, solve_chain_iv
+from core.scan_index import ScanIndex
+from core.scanner import contract_days_to_expiry, scan_chain
+
+LEVERAGES = np.arange(2.0, 20.0 + 1e-9, 0.5)
+
+
+def main():
+    for strikes in (100, 400, 2000):
+        rng = np.random.default_rng(strikes)
+        chain = make_full_chain(strikes).sample(frac=1, random_state=0).reset_index(drop=True)
+        chain.loc[rng.random(len(chain)) < 0.3, "volume"] = 0
+        smile = solve_chain_iv(chain, S, AS_OF)
+
+        t0 = time.perf_counter()
+        index = ScanIndex(chain, S, AS_OF, sigma=chain_sigma(chain, smile, S))
+        build = time.perf_counter() - t0
+
+        legacy, lookup = [], []
+        for con in MONTHS:
+            for op in ("CALL", "PUT"):
+                days = int(contract_days_to_expiry([con], AS_OF)[0])
+                for lev in LEVERAGES:
+                    t0 = time.perf_counter()
+                    tdf = chain[(chain["contract_date"].astype(str) == con) & (chain["call_put"].str.upper().str.strip() == op)]
+                    ref = scan_chain(tdf, S, days / 365.0, lev, op, days_to_exp=days, sigma=chain_sigma(tdf, smile, S)).head(15)
+                    legacy.append(time.perf_counter() - t0)
+                    t0 = time.perf_counter()
+                    got = index.scan(con, op, lev)
+                    lookup.append(time.perf_counter() - t0)
+                    pd.testing.assert_frame_equal(ref.reset_index(drop=True), got, check_dtype=False)
+        print(f"rows={len(chain):>7,}  建索引 {build * 1e3:6.1f} ms  每次掃描：重算 {np.median(legacy) * 1e3:6.2f} ms"
+              f" → 查表 {np.median(lookup) * 1e3:5.2f} ms ({np.median(legacy) / np.median(lookup):4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
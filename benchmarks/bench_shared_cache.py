@@ -0,0 +1,88 @@
+"""
+快取踩踏測試：多個副本 × 多個 session 同時在 TTL 到期的瞬間要同一份行情
+比較「各自 TTL 快取」(現況 st.cache_data，每個 session 各自回填) 與 core.shared_cache 三種後端的上游請求數
+執行：python -m benchmarks.bench_shared_cache
+"""
+
+import tempfile
+import threading
+import time
+
+from benchmarks.fake_redis import FakeRedis
+from core.shared_cache import DiskBackend, MemoryBackend, RedisBackend, SharedCache
+
+REPLICAS, SESSIONS, ROUNDS = 4, 25, 5
+UPSTREAM_DELAY = 0.2
+TTL = 0.5
+
+
+class Upstream:
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            self.calls += 1
+        time.sleep(UPSTREAM_DELAY)
+        return {"S": 23000.0, "rows": list(range(1000))}
+
+
+def naive_cache(upstream):
+    """每個 session 看到過期就自己回填 (沒有合併)"""
+    state = {"at": 0.0, "value": None}
+    def get():
+        if time.time() - state["at"] >= TTL:
+            state["value"], state["at"] = upstream.load(), time.time()
+        return state["value"]
+    return get
+
+
+def storm(getters):
+    """每一輪等 TTL 過期後，所有副本的所有 session 同時要資料；回傳每次請求的延遲"""
+    latencies, lock = [], threading.Lock()
+    def session(get):
+        t0 = time.perf_counter()
+        get()
+        with lock:
+            latencies.append(time.perf_counter() - t0)
+    for _ in range(ROUNDS):
+        threads = [threading.Thread(target=session, args=(get,)) for get in getters for _ in range(SESSIONS)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        time.sleep(TTL + 0.05)
+    return sorted(latencies)
+
+
+def report(label, upstream, latencies):
+    p50 = latencies[len(latencies) // 2] * 1e3
+    p95 = latencies[int(len(latencies) * 0.95)] * 1e3
+    print(f"{label:<24} 上游請求 {upstream.calls:4d}  p50 {p50:7.1f} ms  p95 {p95:7.1f} ms")
+    return upstream.calls
+
+
+def main():
+    print(f"{REPLICAS} 副本 × {SESSIONS} session × {ROUNDS} 輪 (TTL {TTL}s, 上游 {UPSTREAM_DELAY * 1e3:.0f} ms)")
+    up = Upstream()
+    naive = report("各自 TTL 快取", up, storm([naive_cache(up) for _ in range(REPLICAS)]))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fake_redis = FakeRedis()
+        shared_backends = {
+            # 記憶體後端只能在同一行程共用：每個副本各一份
+            "memory (每副本)": lambda: MemoryBackend(),
+            "disk (共用目錄)": lambda: DiskBackend(tmp),
+            "redis (本地替身)": lambda: RedisBackend(fake_redis),
+        }
+        for label, make in shared_backends.items():
+            up = Upstream()
+            caches = [SharedCache(make()) for _ in range(REPLICAS)]
+            getters = [lambda c=c: c.get("market", up.load, ttl=TTL, stale_ttl=60) for c in caches]
+            calls = report(label, up, storm(getters))
+            limit = ROUNDS * (REPLICAS if label.startswith("memory") else 1)  # 共用後端：整個叢集每輪一次
+            assert calls <= limit, f"{label}: 上游請求 {calls} 次，超過 {limit}"
+    print(f"(各自 TTL 快取的上游請求 {naive} 次)")
+
+
+if __name__ == "__main__":
+    main()
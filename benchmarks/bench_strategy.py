@@ -0,0 +1,62 @@
+"""
+策略損益測速：舊 plot_payoff 的逐點 Python 迴圈 vs core.strategy 一次廣播
+舊版只能畫單腳到期損益；新版同時算 (時間 × 指數) 整張網格的 BS 估值
+執行：python -m benchmarks.bench_strategy
+"""
+
+import time
+
+import numpy as np
+
+from core.strategy import Leg, expiry_payoff, strategy_pnl
+
+S = 23000.0
+
+
+def legacy_payoff(legs, x_range):
+    """舊 plot_payoff 的迴圈逐腳相加 (乘數寫死 50)"""
+    profit = []
+    for spot in x_range:
+        total = 0.0
+        for leg in legs:
+            val = (max(0, spot - leg.strike) - leg.premium) if leg.call_put == "CALL" else (max(0, leg.strike - spot) - leg.premium)
+            total += val * 50 * leg.qty
+        profit.append(total)
+    return profit
+
+
+def make_legs(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [Leg(float(S + 100 * rng.integers(-20, 21)), "CALL" if i % 2 == 0 else "PUT", int(rng.choice([-2, -1, 1, 2])),
+                float(rng.uniform(50, 500)), int(rng.choice([30, 60, 90])), 0.2) for i in range(n)]
+
+
+def timed(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    # 單腳 100 點：結果必須與舊版完全相同
+    leg = [Leg(23000.0, "CALL", 1, 320.0)]
+    x = np.linspace(23000 * 0.9, 23000 * 1.1, 100)
+    np.testing.assert_allclose(expiry_payoff(leg, x), legacy_payoff(leg, x))
+
+    for n_legs in (1, 4, 12):
+        legs = make_legs(n_legs)
+        for n_spots in (100, 2000):
+            spots = np.linspace(S * 0.8, S * 1.2, n_spots)
+            t_loop = timed(lambda: legacy_payoff(legs, spots))
+            t_exp = timed(lambda: expiry_payoff(legs, spots))
+            t_grid = timed(lambda: strategy_pnl(legs, spots, n_times=50))
+            print(f"{n_legs:2d} 腳 × {n_spots:5d} 點  迴圈(到期) {t_loop * 1e3:8.2f} ms | 向量化(到期) {t_exp * 1e3:6.3f} ms"
+                  f" | 整張網格 50×{n_spots} BS {t_grid * 1e3:6.2f} ms")
+            assert t_grid < 0.25, "互動用途：整張網格應在 250 ms 內"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+盤中串流：回放檔吞吐量、每次發布的增量重算 vs 全部重算 vs 整份重建 ScanIndex (整頁重跑的做法)、發布節流
+最後的快照必須與「用最新報價從頭算一次」完全一致
+執行：python -m benchmarks.bench_stream
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.bench_iv import AS_OF, S, make_full_chain
+from benchmarks.fake_quotes import make_replay
+from core.quote_stream import INDEX_SYMBOL, LiveRepricer, Quote, QueueSource, QuoteStreamer, ReplaySource
+from core.scan_index import ScanIndex
+
+
+def median_ms(fn, repeat=20):
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t0)
+    return np.median(runs) * 1e3
+
+
+def run_streamer(source, chain, push_interval):
+    streamer = QuoteStreamer(source, push_interval=push_interval)
+    t0 = time.perf_counter()
+    streamer.seed("bench", lambda: LiveRepricer(chain, S, AS_OF))
+    assert streamer.done.wait(120), "回放應該跑完"
+    return streamer, time.perf_counter() - t0
+
+
+def main():
+    chain = make_full_chain().drop(columns="true_iv")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "replay.jsonl")
+        n = make_replay(chain, S, AS_OF, path, seconds=120, option_rate=300)
+        quotes = [Quote(float(r["ts"]), r["symbol"], float(r["price"]), float(r.get("volume", 0)))
+                  for r in map(json.loads, open(path, encoding="utf-8"))]
+
+        # 1) 吞吐量 + 正確性：不等待地灌完整個回放檔
+        streamer, secs = run_streamer(ReplaySource(path, speed=0), chain, push_interval=0.05)
+        stats = streamer.stats()
+        print(f"replay {n} quotes in {secs:.2f}s ({n / secs:,.0f} quotes/s), pushes {stats['pushes']}, "
+              f"repriced rows {stats['repriced_rows']:,} (full reprice every push would be {stats['pushes'] * len(chain):,})")
+        assert stats["ticks"] == n and stats["unmatched"] == 0 and stats["errors"] == 0
+
+        live = chain.copy()
+        last = {}
+        for q in quotes: last[q.symbol] = q.price
+        ref = LiveRepricer(live, S, AS_OF)
+        for sym, i in ref.symbols.items():
+            if sym in last: ref.close[i] = last[sym]
+        ref.on_quote(Quote(0.0, INDEX_SYMBOL, last[INDEX_SYMBOL]))
+        ref._full = True
+        ref.reprice()
+        snap = streamer.snapshot()
+        assert snap.S == ref.S
+        np.testing.assert_array_equal(snap.lev, ref.lev)
+        np.testing.assert_array_equal(snap.delta, ref.delta)
+        print("final snapshot == full recompute from latest quotes")
+
+        # 2) 每次發布的重算成本：一秒份的報價 (約 300 筆選擇權) 合併一次
+        per_push = [q for q in quotes if q.ts - quotes[0].ts < 1.0 and q.symbol != INDEX_SYMBOL]
+        book = LiveRepricer(chain, S, AS_OF)
+
+        def incremental():
+            for q in per_push: book.on_quote(q)
+            book.reprice()
+
+        def full():
+            for q in per_push: book.on_quote(q)
+            book._full = True
+            book.reprice()
+
+        t_inc, t_full = median_ms(incremental), median_ms(full)
+        t_rebuild = median_ms(lambda: ScanIndex(chain, S, AS_OF), repeat=5)
+        print(f"per push ({len(per_push)} option quotes): incremental {t_inc:.3f} ms | full reprice {t_full:.3f} ms | "
+              f"rebuild ScanIndex {t_rebuild:.1f} ms")
+        assert t_inc < t_full
+
+        # 3) 節流：二十倍速播 40 秒 → 約 2 秒，每 0.25 秒最多發布一次
+        short = os.path.join(tmp, "short.jsonl")
+        make_replay(chain, S, AS_OF, short, seconds=40, option_rate=100)
+        streamer, secs = run_streamer(ReplaySource(short, speed=20), chain, push_interval=0.25)
+        pushes = streamer.stats()["pushes"]
+        print(f"paced replay {secs:.2f}s, pushes {pushes} (interval 0.25s)")
+        assert pushes <= secs / 0.25 + 3
+        print(streamer.tail(3).to_string(index=False))
+
+    # 4) 其他執行緒 (券商 callback) 推報價
+    source = QueueSource()
+    streamer = QuoteStreamer(source, push_interval=0.05)
+    streamer.seed("queue", lambda: LiveRepricer(chain, S, AS_OF))
+    sym = next(iter(streamer._repricer.symbols))
+
+    def producer():
+        for i in range(1000): source.push(Quote(time.time(), sym, 100.0 + i % 7))
+        source.close()
+
+    threading.Thread(target=producer).start()
+    assert streamer.done.wait(10)
+    assert streamer.stats()["ticks"] == 1000
+    print(f"queue source: {streamer.stats()}")
+
+
+if __name__ == "__main__":
+    main()
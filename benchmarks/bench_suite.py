@@ -0,0 +1,327 @@
+"""
+離線效能基準：不需要 Streamlit 與 FinMind token，對錄製或合成的 TAIEX / TXO fixture 在 1× / 10× / 100× 規模下測
+get_data (load_market)、bs_price_delta、raw_score、micro_expand、回測、智慧掃描 (單月 / 全部月份)，回報吞吐量、延遲百分位與峰值記憶體
+執行：
+    python -m benchmarks.bench_suite                       # 全部，合成 fixture
+    python -m benchmarks.bench_suite --save                # 存成基準線
+    python -m benchmarks.bench_suite --compare             # 與基準線比較，退步超過 --tolerance 就以 exit 1 結束
+    python -m benchmarks.bench_suite --fixtures DIR        # 用 benchmarks.fixtures 錄下來的真實資料
+    python -m benchmarks.bench_suite --only scan --sizes 1,100 --legacy
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from typing import Callable, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.fixtures import load, scale_chain, shift_to_today
+from core.storage import data_path
+
+R, SIGMA, TARGET_LEV = 0.02, 0.2, 5.0
+
+
+class Case(NamedTuple):
+    name: str
+    setup: Callable   # setup(fixture, scale) -> (fn, items, cleanup 或 None)
+    max_scale: int = 100
+    legacy: bool = False
+
+
+# ── 各測項 ─────────────────────────────────────────────────────────────────
+def _chain_arrays(fx, scale):
+    from core.scanner import contract_days_to_expiry
+    chain = scale_chain(fx.chain, scale)
+    K = chain["strike_price"].to_numpy(dtype=float)
+    days = contract_days_to_expiry(chain["contract_date"], fx.as_of)
+    is_call = chain["call_put"].astype(str).str.upper().eq("CALL").to_numpy()
+    return chain, K, days, is_call
+
+
+def _one_contract(fx, scale):
+    chain = scale_chain(fx.chain, scale)
+    calls = chain[chain["call_put"].astype(str).str.upper() == "CALL"]
+    con = sorted(calls["contract_date"].astype(str).unique())[-1]
+    tdf = calls[calls["contract_date"].astype(str) == con]
+    days = max((pd.Timestamp(f"{con}15") - fx.as_of).days, 1)
+    return tdf, con, days
+
+
+def _get_data_server(fx, scale):
+    from benchmarks.fake_finmind import FakeFinMind
+    fake = FakeFinMind(fixtures={"TaiwanStockPrice": shift_to_today(fx.taiex, fx.as_of),
+                                 "TaiwanOptionDaily": shift_to_today(scale_chain(fx.chain, scale), fx.as_of)})
+    return fake.__enter__()
+
+
+def setup_get_data_cold(fx, scale):
+    """空的本地封存：TAIEX + TXO 都從 (假) FinMind 下載、解析、寫 Parquet、再讀最新一天"""
+    from core.finmind_client import FinMindClient
+    from core.market import load_market
+    from core.option_archive import OptionArchive
+    from core.taiex_store import TaiexHistory
+    fake = _get_data_server(fx, scale)
+    client = FinMindClient(api_url=fake.api_url)
+    tmp = tempfile.mkdtemp(prefix="bench-getdata-")
+
+    def run():
+        root = tempfile.mkdtemp(dir=tmp)
+        out = load_market("", TaiexHistory(client, path=os.path.join(root, "taiex.parquet")),
+                          OptionArchive(client, root=os.path.join(root, "txo")))
+        shutil.rmtree(root)
+        return out
+    return run, len(fx.chain) * scale, lambda: (fake.__exit__(), shutil.rmtree(tmp, ignore_errors=True))
+
+
+def setup_get_data_warm(fx, scale):
+    """本地封存已是最新 (refresh_interval 內)：快照過期時真正的成本 = 讀 Parquet + 均線"""
+    from core.finmind_client import FinMindClient
+    from core.market import load_market
+    from core.option_archive import OptionArchive
+    from core.taiex_store import TaiexHistory
+    fake = _get_data_server(fx, scale)
+    client = FinMindClient(api_url=fake.api_url)
+    tmp = tempfile.mkdtemp(prefix="bench-getdata-")
+    taiex = TaiexHistory(client, path=os.path.join(tmp, "taiex.parquet"))
+    archive = OptionArchive(client, root=os.path.join(tmp, "txo"))
+    load_market("", taiex, archive)
+    return (lambda: load_market("", taiex, archive)), len(fx.chain) * scale, \
+        lambda: (fake.__exit__(), shutil.rmtree(tmp, ignore_errors=True))
+
+
+def setup_bs_price_delta(fx, scale):
+    """逐筆相容介面 (app 舊呼叫方式)"""
+    from core.pricing import bs_price_delta
+    chain, K, days, is_call = _chain_arrays(fx, scale)
+    T = days / 365.0
+    cp = np.where(is_call, "CALL", "PUT")
+    return (lambda: [bs_price_delta(fx.S, k, t, R, SIGMA, c) for k, t, c in zip(K, T, cp)]), len(K), None
+
+
+def setup_bs_greeks(fx, scale):
+    from core.pricing import bs_greeks
+    chain, K, days, is_call = _chain_arrays(fx, scale)
+    return (lambda: bs_greeks(fx.S, K, days / 365.0, R, SIGMA, is_call)), len(K), None
+
+
+def setup_raw_score(fx, scale):
+    from core.pricing import bs_greeks
+    from core.scanner import calculate_raw_score_array
+    chain, K, days, is_call = _chain_arrays(fx, scale)
+    delta = bs_greeks(fx.S, K, days / 365.0, R, SIGMA, True).delta
+    vol = chain["volume"].to_numpy(dtype=float)
+    return (lambda: calculate_raw_score_array(delta, days, vol, fx.S, K, "CALL")), len(K), None
+
+
+def setup_micro_expand(fx, scale):
+    from core.scanner import micro_expand_scores_array
+    raw = np.random.default_rng(0).uniform(0, 100, len(fx.chain) * scale)
+    return (lambda: micro_expand_scores_array(raw)), len(raw), None
+
+
+def setup_scan_chain(fx, scale):
+    from core.scanner import scan_chain
+    tdf, con, days = _one_contract(fx, scale)
+    return (lambda: scan_chain(tdf, fx.S, days / 365.0, TARGET_LEV, "CALL", days_to_exp=days)), len(tdf), None
+
+
+def setup_index_build(fx, scale):
+    from core.scan_index import ScanIndex
+    chain = scale_chain(fx.chain, scale)
+    return (lambda: ScanIndex(chain, fx.S, fx.as_of)), len(chain), None
+
+
+def setup_index_query(fx, scale):
+    from core.scan_index import ScanIndex
+    idx = ScanIndex(scale_chain(fx.chain, scale), fx.S, fx.as_of)
+    con = idx.contracts("CALL")[-1]
+    return (lambda: idx.scan(con, "CALL", TARGET_LEV)), len(idx.groups[(con, "CALL")].strike), None
+
+
+def setup_scan_all(fx, scale):
+    """全部月份 × CALL/PUT 一次掃 (索引已建好、已攤平)"""
+    from core.scan_index import ScanIndex
+    idx = ScanIndex(scale_chain(fx.chain, scale), fx.S, fx.as_of)
+    idx.scan_all(TARGET_LEV)
+    return (lambda: idx.scan_all(TARGET_LEV)), len(fx.chain) * scale, None
+
+
+def setup_backtest_replay(fx, scale):
+    """純回測引擎 (run_option_backtest)，歷史鏈每天的履約價加密 scale 倍"""
+    from core.backtest import run_option_backtest
+    hist = scale_chain(fx.history, scale, step=100.0)
+    return (lambda: run_option_backtest(hist, fx.taiex, TARGET_LEV)), len(hist), None
+
+
+def setup_backtest_leverage(fx, scale):
+    """付費回測按鈕的完整路徑 (leverage_backtest)：封存已回補過，只剩讀歷史分區 + 重播"""
+    from core.finmind_client import FinMindClient
+    from core.market import backtest_window, leverage_backtest
+    from core.option_archive import OptionArchive
+    from core.taiex_store import TaiexHistory
+    from benchmarks.fake_finmind import FakeFinMind
+    hist = shift_to_today(scale_chain(fx.history, scale, step=100.0), fx.history["date"].max())
+    fake = FakeFinMind(fixtures={"TaiwanStockPrice": shift_to_today(fx.taiex, fx.history["date"].max()),
+                                 "TaiwanOptionDaily": hist}).__enter__()
+    client = FinMindClient(api_url=fake.api_url)
+    tmp = tempfile.mkdtemp(prefix="bench-backtest-")
+    taiex = TaiexHistory(client, path=os.path.join(tmp, "taiex.parquet"))
+    archive = OptionArchive(client, root=os.path.join(tmp, "txo"))
+    run = lambda: leverage_backtest("", TARGET_LEV, 180, archive, taiex)
+    _, metrics = run()
+    assert "rolls" not in metrics, "還沒回補就不應該在按鈕路徑上打 API 重播"
+    archive.backfill("", date.today() - timedelta(days=backtest_window(180)))  # app 裡由 warm_option_archive 在背景做
+    _, metrics = run()
+    assert "rolls" in metrics, "應走真實 TXO 重播而不是近似 / 模擬"
+    return run, len(hist), lambda: (fake.__exit__(), shutil.rmtree(tmp, ignore_errors=True))
+
+
+def setup_legacy_raw_score(fx, scale):
+    from benchmarks.bench_scan import calculate_raw_score_v191
+    from core.pricing import bs_greeks
+    chain, K, days, is_call = _chain_arrays(fx, scale)
+    delta = bs_greeks(fx.S, K, days / 365.0, R, SIGMA, True).delta
+    vol = chain["volume"].to_numpy(dtype=float)
+    rows = list(zip(delta.tolist(), days.tolist(), vol.tolist(), K.tolist()))
+    return (lambda: [calculate_raw_score_v191(d, t, v, fx.S, k, "CALL") for d, t, v, k in rows]), len(rows), None
+
+
+def setup_legacy_micro_expand(fx, scale):
+    from benchmarks.bench_scan import micro_expand_scores_v191
+    raw = np.random.default_rng(0).uniform(0, 100, len(fx.chain) * scale).tolist()
+    return (lambda: micro_expand_scores_v191([{"raw_score": x} for x in raw])), len(raw), None
+
+
+def setup_legacy_scan(fx, scale):
+    from benchmarks.bench_scan import legacy_scan
+    tdf, con, days = _one_contract(fx, scale)
+    return (lambda: legacy_scan(tdf, fx.S, days / 365.0, days, TARGET_LEV, "CALL", con)), len(tdf), None
+
+
+CASES = [
+    Case("get_data.cold", setup_get_data_cold, max_scale=10),
+    Case("get_data.warm", setup_get_data_warm),
+    Case("pricing.bs_price_delta", setup_bs_price_delta, max_scale=10),
+    Case("pricing.bs_greeks", setup_bs_greeks),
+    Case("scanner.raw_score", setup_raw_score),
+    Case("scanner.micro_expand", setup_micro_expand),
+    Case("scan.scan_chain", setup_scan_chain),
+    Case("scan.index_build", setup_index_build),
+    Case("scan.index_query", setup_index_query),
+    Case("scan.scan_all", setup_scan_all),
+    Case("backtest.replay", setup_backtest_replay, max_scale=10),
+    Case("backtest.leverage", setup_backtest_leverage, max_scale=1),
+    Case("legacy.raw_score", setup_legacy_raw_score, max_scale=10, legacy=True),
+    Case("legacy.micro_expand", setup_legacy_micro_expand, max_scale=10, legacy=True),
+    Case("legacy.scan", setup_legacy_scan, max_scale=10, legacy=True),
+]
+
+
+# ── 量測 ───────────────────────────────────────────────────────────────────
+def measure(fn, items, min_time=1.0, min_repeats=3, max_repeats=50):
+    """暖機一次 → 重複到 min_time 秒 (至少 min_repeats 次) 取延遲分佈 → 另跑一次 tracemalloc 量峰值記憶體"""
+    fn()
+    times = []
+    t_start = time.perf_counter()
+    while len(times) < min_repeats or (time.perf_counter() - t_start < min_time and len(times) < max_repeats):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    ms = np.asarray(times) * 1e3
+    p50 = float(np.percentile(ms, 50))
+    return {"items": int(items), "repeats": len(times), "p50_ms": p50, "p95_ms": float(np.percentile(ms, 95)),
+            "p99_ms": float(np.percentile(ms, 99)), "mean_ms": float(ms.mean()),
+            "throughput": items / (p50 / 1e3) if p50 > 0 else float("inf"), "peak_mb": peak / 2**20}
+
+
+def run(cases, sizes, fx, min_time):
+    results = {}
+    print(f"{'case':<24}{'scale':>6}{'items':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'items/s':>12}{'peak MB':>9}")
+    for case in cases:
+        for scale in sizes:
+            if scale > case.max_scale: continue
+            fn, items, cleanup = case.setup(fx, scale)
+            try:
+                r = measure(fn, items, min_time)
+            finally:
+                if cleanup: cleanup()
+            results[f"{case.name}@{scale}x"] = r
+            print(f"{case.name:<24}{scale:>5}x{r['items']:>10,}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+                  f"{r['throughput']:>12,.0f}{r['peak_mb']:>9.1f}")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """延遲 p50 或峰值記憶體超過基準 (1 + tolerance) 倍即為退步 (記憶體另有 1 MB 的絕對容忍)"""
+    regressions = []
+    print(f"\n{'case':<30}{'p50 now/base':>16}{'peak now/base':>16}")
+    for key, r in results.items():
+        b = baseline.get(key)
+        if b is None:
+            print(f"{key:<30}{'(new)':>16}")
+            continue
+        t_ratio = r["p50_ms"] / b["p50_ms"] if b["p50_ms"] > 0 else 1.0
+        m_ratio = r["peak_mb"] / b["peak_mb"] if b["peak_mb"] > 0 else 1.0
+        slow = t_ratio > 1 + tolerance
+        fat = m_ratio > 1 + tolerance and r["peak_mb"] - b["peak_mb"] > 1.0
+        flag = "  ❌ REGRESSION" if slow or fat else ""
+        print(f"{key:<30}{t_ratio:>15.2f}x{m_ratio:>15.2f}x{flag}")
+        if slow or fat: regressions.append(key)
+    return regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default="1,10,100", help="規模倍率，逗號分隔")
+    ap.add_argument("--only", default="", help="只跑名稱以此開頭的測項 (逗號分隔)")
+    ap.add_argument("--legacy", action="store_true", help="一併跑 v19.1 逐列舊版 (最多 10×)")
+    ap.add_argument("--fixtures", default=None, help="benchmarks.fixtures 錄製的目錄 (預設合成資料)")
+    ap.add_argument("--baseline", default=data_path("bench", "baseline.json"))
+    ap.add_argument("--save", action="store_true", help="結果寫成基準線")
+    ap.add_argument("--compare", action="store_true", help="與基準線比較，退步則 exit 1")
+    ap.add_argument("--tolerance", type=float, default=0.3)
+    ap.add_argument("--min-time", type=float, default=1.0, help="每個測項至少量測的秒數")
+    args = ap.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    prefixes = tuple(p for p in args.only.split(",") if p)
+    cases = [c for c in CASES if (args.legacy or not c.legacy) and (not prefixes or c.name.startswith(prefixes))]
+    fx = load(args.fixtures)
+    print(f"fixture: {fx.source} | TXO {len(fx.chain):,} 列 | 回測歷史 {len(fx.history):,} 列 | TAIEX {len(fx.taiex)} 天\n")
+
+    results = run(cases, sizes, fx, args.min_time)
+    meta = {"python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+            "machine": platform.machine(), "node": platform.node(), "fixture": fx.source, "ts": time.time()}
+
+    status = 0
+    if args.compare:
+        with open(args.baseline, encoding="utf-8") as f:
+            base = json.load(f)
+        regressions = compare(results, base["results"], args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} 項退步超過 {args.tolerance:.0%}：{', '.join(regressions)}")
+            status = 1
+        else:
+            print(f"\n沒有超過 {args.tolerance:.0%} 的退步 (基準線 {args.baseline})")
+    if args.save:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": results}, f, ensure_ascii=False, indent=1)
+        print(f"\n基準線已存到 {args.baseline}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+"""
+參數掃描測速：整張 槓桿 × 天數 表一次廣播 vs 每格各跑一次近似法回測
+執行：python -m benchmarks.bench_sweep
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_history
+from core.sweep import HORIZONS, LEVERAGES, sweep_leverage_horizon
+
+TODAY = pd.Timestamp("2026-10-16")
+
+
+def proxy_backtest(taiex, lev, days):
+    """app.py 原本的單次近似法回測"""
+    df = taiex[taiex["date"] >= TODAY - pd.Timedelta(days=max(days * 2, 180))].reset_index(drop=True)
+    ret = df["close"].pct_change().fillna(0)
+    lev_returns = (ret * lev * 0.8 - 0.0003).clip(lower=-0.95)
+    cum_lev = (1 + lev_returns).cumprod()
+    return cum_lev.iloc[-1] - 1, lev_returns.mean() / lev_returns.std() * np.sqrt(252), (cum_lev / cum_lev.cummax() - 1).min()
+
+
+def main():
+    taiex, _ = make_history(years=4)
+    t0 = time.perf_counter()
+    grid = {(lev, h): proxy_backtest(taiex, lev, h) for lev in LEVERAGES for h in HORIZONS}
+    loop = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    sweep = sweep_leverage_horizon(taiex, today=TODAY)
+    batched = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for _ in range(1000): sweep.lookup(7.5, 240)
+    lookup = (time.perf_counter() - t0) / 1000
+
+    worst = max(abs(sweep.total[i, j] - grid[(lev, h)][0])
+                for i, lev in enumerate(LEVERAGES) for j, h in enumerate(HORIZONS))
+    print(f"{len(grid)} combos  loop={loop * 1e3:.0f} ms  sweep={batched * 1e3:.0f} ms  ({loop / batched:.0f}x)")
+    print(f"slider lookup = {lookup * 1e6:.0f} µs   max |total diff| = {worst:.1e}")
+
+
+if __name__ == "__main__":
+    main()
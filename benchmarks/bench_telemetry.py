@@ -0,0 +1,51 @@
+"""
+觀測層額外成本：裸呼叫 vs timed / span 關閉 vs 開啟，以及真實工作負載 (智慧掃描一次) 上的相對開銷
+執行：python -m benchmarks.bench_telemetry
+"""
+
+import time
+
+from core.telemetry import Telemetry
+
+
+def per_call_ns(fn, n=200_000):
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) / n * 1e9
+
+
+def main():
+    tel = Telemetry(enabled=False)
+
+    def work():
+        return None
+
+    timed = tel.timed("work")(work)
+
+    def with_span():
+        with tel.span("work"):
+            return None
+
+    base = per_call_ns(work)
+    off_timed, off_span = per_call_ns(timed), per_call_ns(with_span)
+    tel.enabled = True
+    on_timed, on_span = per_call_ns(timed), per_call_ns(with_span)
+    print(f"裸呼叫                {base:7.0f} ns")
+    print(f"timed  關閉 / 開啟     {off_timed:7.0f} / {on_timed:7.0f} ns")
+    print(f"span   關閉 / 開啟     {off_span:7.0f} / {on_span:7.0f} ns")
+
+    # 相對真實負載：一次索引掃描 (~1 ms)
+    from benchmarks.bench_iv import AS_OF, S, make_full_chain
+    from core.scan_index import ScanIndex
+    idx = ScanIndex(make_full_chain(), S, AS_OF)
+    con = idx.contracts("CALL")[-1]
+    scan = lambda: idx.scan(con, "CALL", 5.0)
+    t_scan = per_call_ns(scan, 300)
+    print(f"一次掃描 {t_scan / 1e6:.2f} ms；開啟量測的額外成本約 {(on_span - base) / t_scan:.3%}，關閉約 {(off_span - base) / t_scan:.4%}")
+    print(tel.prometheus().splitlines()[1])
+    assert tel.summary()[0]["count"] > 0
+
+
+if __name__ == "__main__":
+    main()
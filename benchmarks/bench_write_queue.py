@@ -0,0 +1,87 @@
+"""
+VIP 寫入測試：同步 insert (舊按鈕) vs write-behind 佇列，對象是本地假 Supabase (有延遲、會隨機失敗)
+檢查：按鈕延遲、一波註冊全部送達且不重複、同 email 的欄位合併、行程重啟後未送出的列不遺失
+執行：python -m benchmarks.bench_write_queue
+"""
+
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+from supabase import create_client
+
+from benchmarks.fake_supabase import FAKE_KEY, FakeSupabase
+from core.write_queue import SupabaseSink, WriteBehindQueue
+
+USERS, THREADS = 500, 20
+
+
+def pct(xs, q):
+    return float(np.percentile(np.asarray(xs) * 1e3, q))
+
+
+def main():
+    with FakeSupabase(delay=0.05, fail_rate=0.3) as fake, tempfile.TemporaryDirectory() as tmp:
+        client = create_client(fake.url, FAKE_KEY)
+
+        # 舊版：按鈕裡同步 insert，失敗被 except: pass 吞掉
+        sync, lost = [], 0
+        for i in range(30):
+            t0 = time.perf_counter()
+            try:
+                client.table("vips_sync").insert({"email": f"sync{i}@x.tw", "uses": 0, "source": "v19.1"}).execute()
+            except Exception:
+                lost += 1
+            sync.append(time.perf_counter() - t0)
+        print(f"同步 insert    p50 {pct(sync, 50):6.1f} ms  p99 {pct(sync, 99):6.1f} ms  遺失 {lost}/30")
+
+        # 新版：enqueue 只寫本機 SQLite；每位使用者先開通、再記一次使用 (同 email 合併)
+        queue = WriteBehindQueue(os.path.join(tmp, "outbox.sqlite"), SupabaseSink(lambda: client),
+                                 flush_interval=0.05, base_backoff=0.05, max_backoff=0.5)
+        lat, lock = [], threading.Lock()
+
+        def burst(ids):
+            for i in ids:
+                for payload in ({"email": f"u{i}@x.tw", "uses": 0, "source": "v19.1"}, {"email": f"u{i}@x.tw", "uses": 1}):
+                    t0 = time.perf_counter()
+                    queue.enqueue("vips", payload["email"], payload)
+                    with lock:
+                        lat.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        threads = [threading.Thread(target=burst, args=(range(k, USERS, THREADS),)) for k in range(THREADS)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        burst_s = time.perf_counter() - t0
+        deadline = time.monotonic() + 30
+        while queue.pending() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        drained = time.perf_counter() - t0
+        stats = queue.stats()
+        queue.close()
+        print(f"write-behind  p50 {pct(lat, 50):6.2f} ms  p99 {pct(lat, 99):6.2f} ms  ({len(lat)} 筆 / {burst_s:.2f}s 寫完佇列，"
+              f"{drained:.2f}s 全部送達；{stats['batches']} 批、失敗重試 {stats['failures']} 次)")
+
+        vips = fake.tables["vips"]
+        users = [v for k, v in vips.items() if k.startswith("u")]
+        assert len(users) == USERS, f"送達 {len(users)}/{USERS}"
+        assert all(v["uses"] == 1 and v["source"] == "v19.1" for v in users), "同 email 的欄位應合併"
+        assert stats["pending"] == 0
+
+        # 持久性：佇列沒送就「當掉」，重開同一個檔案後照樣送達
+        path = os.path.join(tmp, "crash.sqlite")
+        q1 = WriteBehindQueue(path, SupabaseSink(lambda: client), start=False)
+        for i in range(100):
+            q1.enqueue("vips", f"c{i}@x.tw", {"email": f"c{i}@x.tw", "uses": 0})
+        del q1
+        fake.fail_rate = 0.0
+        q2 = WriteBehindQueue(path, SupabaseSink(lambda: client), start=False)
+        assert q2.flush() == 0
+        assert sum(k.startswith("c") for k in vips) == 100
+        print("重啟後補送 100/100 ✅")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+本地假 FinMind 伺服器：依 dataset 延遲回應，離線測試 / 測速用
+"""
+
+import json
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+
+def _fixture_rows(df, params):
+    """錄製 / 合成的 fixture 依 start_date ~ end_date 切出來回傳 (同 FinMind 的日期過濾)"""
+    text = df["date"].astype(str)
+    day = text.str[:10]
+    keep = day >= (params.get("start_date") or "0000")
+    if params.get("end_date"): keep &= day <= params["end_date"]
+    out = df[keep].copy()
+    out["date"] = text[keep].str.replace(" 00:00:00", "", regex=False)  # 日線只留日期，新聞保留時間
+    return out.to_dict("records")
+
+
+def _rows(dataset, params):
+    start = date.fromisoformat(params.get("start_date") or str(date.today() - timedelta(days=30)))
+    days = [start + timedelta(days=i) for i in range((date.today() - start).days + 1)]
+    days = [d for d in days if d.weekday() < 5]
+    rng = np.random.default_rng(len(days))
+    if dataset == "TaiwanStockPrice":
+        close = 23000 * np.cumprod(1 + rng.normal(0.0004, 0.01, len(days)))
+        return [{"date": str(d), "stock_id": params.get("data_id", ""), "open": c, "max": c * 1.01, "min": c * 0.99, "close": c}
+                for d, c in zip(days, close)]
+    if dataset == "TaiwanOptionDaily":
+        strikes = np.arange(20000, 26000, 100)
+        return [{"date": str(d), "option_id": "TXO", "contract_date": "202612", "strike_price": float(k),
+                 "call_put": cp, "close": float(max(23000 - k, 0) + 150) if cp == "call" else float(max(k - 23000, 0) + 150),
+                 "volume": 10, "open_interest": 1000}
+                for d in days[-3:] for k in strikes for cp in ("call", "put")]
+    if dataset == "TaiwanStockNews":
+        return [{"date": f"{d} 09:00:00", "stock_id": params.get("data_id", ""), "title": f"news {d}",
+                 "description": "", "link": f"https://example.com/{d}", "source": "fake"} for d in days]
+    if dataset == "TaiwanStockTotalInstitutionalInvestors":
+        return [{"date": str(d), "name": n, "buy": 5e9, "sell": 4e9} for d in days for n in ("Foreign_Investor", "Investment_Trust")]
+    return []
+
+
+class FakeFinMind:
+    """
+    with FakeFinMind(delays={"TaiwanOptionDaily": 0.8}) as fake:
+        FinMindClient(api_url=fake.api_url)
+    fixtures: {dataset: DataFrame (含 date 欄)}，有給的 dataset 改回傳 fixture 而不是內建的假資料
+    """
+
+    def __init__(self, delays=None, fixtures=None):
+        self.delays = delays or {}
+        self.fixtures = fixtures or {}
+        self.requests = []
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+                dataset = params.get("dataset", "")
+                fake.requests.append(dataset)
+                time.sleep(fake.delays.get(dataset, 0.0))
+                fixture = fake.fixtures.get(dataset)
+                rows = _fixture_rows(fixture, params) if fixture is not None else _rows(dataset, params)
+                body = json.dumps({"msg": "success", "status": 200, "data": rows}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.api_url = f"http://127.0.0.1:{self.server.server_port}/api"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,48 @@
+"""
+合成盤中回放檔：指數走隨機漫步，選擇權成交集中在價平附近、價格用 BS 依當下指數重算再加雜訊
+產生：python -m benchmarks.fake_quotes <輸出.jsonl> [秒數] [每秒選擇權筆數]
+"""
+
+import json
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.bench_iv import AS_OF, S, make_full_chain
+from core.pricing import bs_greeks
+from core.quote_stream import INDEX_SYMBOL, LiveRepricer
+
+
+def make_replay(chain, S0, as_of, path, seconds=300, option_rate=200, index_every=1.0, sigma=0.2, seed=0, t0=None):
+    """寫出 JSONL 回放檔，回傳筆數；index_every 秒一筆指數、每秒約 option_rate 筆選擇權成交"""
+    rng = np.random.default_rng(seed)
+    book = LiveRepricer(chain, S0, as_of, sigma=sigma)
+    symbols = np.asarray(list(book.symbols), dtype=object)
+    rows = np.fromiter(book.symbols.values(), dtype=int)
+    weight = np.exp(-0.5 * ((book.strike[rows] - S0) / (0.05 * S0)) ** 2)   # 價平附近成交多
+    weight /= weight.sum()
+    t0 = time.time() if t0 is None else t0
+    n, S_now, next_index = 0, S0, 0.0
+    with open(path, "w", encoding="utf-8") as f:
+        n_opt = rng.poisson(option_rate * seconds)
+        for t in np.sort(rng.uniform(0, seconds, n_opt)):
+            while next_index <= t:
+                S_now *= 1 + rng.normal(0, 0.0004)
+                f.write(json.dumps({"ts": t0 + next_index, "symbol": INDEX_SYMBOL, "price": round(S_now, 2)}) + "\n")
+                next_index += index_every
+                n += 1
+            k = rng.choice(len(rows), p=weight)
+            i = rows[k]
+            fair = float(bs_greeks(S_now, book.strike[i], book.days[i] / 365.0, 0.02, sigma, book.is_call[i]).price)
+            price = max(round(fair * (1 + rng.normal(0, 0.02)), 1), 0.1)
+            f.write(json.dumps({"ts": t0 + float(t), "symbol": symbols[k], "price": price, "volume": int(rng.integers(1, 20))}) + "\n")
+            n += 1
+    return n
+
+
+if __name__ == "__main__":
+    chain = make_full_chain().drop(columns="true_iv")
+    n = make_replay(chain, S, AS_OF, sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 300,
+                    int(sys.argv[3]) if len(sys.argv) > 3 else 200)
+    print(f"{n} quotes → {sys.argv[1]}")
@@ -0,0 +1,34 @@
+"""
+本地 Redis 替身：只實作 RedisBackend 用到的 get / set(ex, nx) / delete，語意同 redis-py (值一律存 bytes)
+"""
+
+import threading
+import time
+
+
+class FakeRedis:
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _alive(self, key):
+        item = self._data.get(key)
+        if item is not None and item[1] is not None and item[1] <= time.time():
+            del self._data[key]
+            return None
+        return item
+
+    def get(self, key):
+        with self._lock:
+            item = self._alive(key)
+            return None if item is None else item[0]
+
+    def set(self, key, value, ex=None, nx=False):
+        with self._lock:
+            if nx and self._alive(key) is not None: return None
+            self._data[key] = (bytes(value), time.time() + ex if ex else None)
+            return True
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(self._data.pop(k, None) is not None for k in keys)
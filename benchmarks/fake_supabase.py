@@ -0,0 +1,79 @@
+"""
+本地假 Supabase (PostgREST) 伺服器：只實作 POST /rest/v1/<table> (insert) 與 ?on_conflict=<col> 的批次 upsert
+可設定延遲與失敗率 (503)；on_conflict 欄位是 null 的請求整批回 400 (23502)，離線測試 write-behind 佇列用
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FAKE_KEY = "fake.supabase.key"  # supabase-py 只檢查格式 (三段式)
+
+
+class FakeSupabase:
+    """
+    with FakeSupabase(delay=0.05, fail_rate=0.2) as fake:
+        create_client(fake.url, FAKE_KEY)
+    fake.tables[table][key] 為合併後的列；fake.requests 記錄每次請求的列數 (失敗為負數)
+    """
+
+    def __init__(self, delay=0.0, fail_rate=0.0, seed=0):
+        self.delay = delay
+        self.fail_rate = fail_rate
+        self.tables = {}
+        self.requests = []
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _reply(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                table = url.path.rsplit("/", 1)[-1]
+                conflict = parse_qs(url.query).get("on_conflict", [None])[0]
+                rows = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"[]")
+                rows = rows if isinstance(rows, list) else [rows]
+                time.sleep(fake.delay)
+                with fake._lock:
+                    if fake._rng.random() < fake.fail_rate:
+                        fake.requests.append(-len(rows))
+                        return self._reply(503, {"message": "service unavailable", "code": "503"})
+                    if conflict is not None and any(row.get(conflict) is None for row in rows):
+                        fake.requests.append(-len(rows))  # PostgREST 一個請求是一個交易：一列違反約束整批被拒
+                        return self._reply(400, {"message": f'null value in column "{conflict}" violates not-null constraint',
+                                                 "code": "23502", "hint": None, "details": None})
+                    store = fake.tables.setdefault(table, {})
+                    for row in rows:
+                        if conflict is None:  # 一般 insert：沒有主鍵衝突處理，直接新增
+                            store[len(store)] = row
+                            continue
+                        store[row[conflict]] = {**store.get(row[conflict], {}), **row}
+                    fake.requests.append(len(rows))
+                self._reply(201, rows)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
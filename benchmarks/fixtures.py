@@ -0,0 +1,95 @@
+"""
+bench_suite 的離線 fixture：錄製一次真實 FinMind 的 TAIEX / TXO (需要 token)，或用合成資料；再依倍率加密履約價放大
+錄製：FINMIND_TOKEN=... python -m benchmarks.fixtures <輸出目錄> [TXO 天數]
+"""
+
+import os
+import sys
+from datetime import date, timedelta
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_iv import AS_OF, S, make_full_chain
+from benchmarks.synthetic import make_history
+
+
+class Fixture(NamedTuple):
+    taiex: pd.DataFrame     # TAIEX 日線 (date, stock_id, open, max, min, close)
+    chain: pd.DataFrame     # 最新一個交易日的完整 TXO 鏈 (同 OptionArchive.latest() 的欄位)
+    history: pd.DataFrame   # 多日 TXO 鏈 (回測用)
+    S: float
+    as_of: pd.Timestamp
+    source: str
+
+
+def _ohlc(taiex):
+    close = taiex["close"].to_numpy(dtype=float)
+    return pd.DataFrame({"date": pd.to_datetime(taiex["date"]), "stock_id": "TAIEX",
+                         "open": close, "max": close * 1.005, "min": close * 0.995, "close": close})
+
+
+def synthetic():
+    """TAIEX 一年 + 7 個月份 × 買賣權 × 200 檔 (約 2800 列，接近真實 TXO 一天) + 一年期回測鏈"""
+    taiex, history = make_history(years=1)
+    taiex = taiex.assign(close=taiex["close"] * S / taiex["close"].iloc[-1])  # 指數最後一天對齊合約鏈的 S
+    chain = make_full_chain().drop(columns="true_iv")
+    chain.insert(0, "date", AS_OF)
+    chain.insert(1, "option_id", "TXO")
+    chain["open_interest"] = np.random.default_rng(1).integers(0, 20000, len(chain))
+    return Fixture(_ohlc(taiex), chain, history, S, AS_OF, "synthetic")
+
+
+def recorded(path):
+    """record() 存下來的目錄"""
+    taiex = pd.read_parquet(os.path.join(path, "taiex.parquet"))
+    history = pd.read_parquet(os.path.join(path, "txo.parquet"))
+    taiex["date"], history["date"] = pd.to_datetime(taiex["date"]), pd.to_datetime(history["date"])
+    as_of = history["date"].max()
+    chain = history[history["date"] == as_of].reset_index(drop=True)
+    S = float(taiex.loc[taiex["date"] <= as_of, "close"].iloc[-1])
+    return Fixture(_ohlc(taiex), chain, history, S, as_of, f"recorded:{path}")
+
+
+def record(token, path, txo_days=60):
+    """線上錄製一次：TAIEX 約 600 個日曆天 + 最近 txo_days 天的 TXO 日線，之後全部離線重播"""
+    from core.finmind_client import FinMindClient
+    fm = FinMindClient()
+    os.makedirs(path, exist_ok=True)
+    today = date.today()
+    taiex = fm.fetch(token, "taiwan_stock_daily", stock_id="TAIEX", start_date=str(today - timedelta(days=600)))
+    parts = []
+    lo = today - timedelta(days=txo_days)
+    while lo <= today:
+        hi = min(lo + timedelta(days=30), today)
+        parts.append(fm.fetch(token, "taiwan_option_daily", option_id="TXO", start_date=str(lo), end_date=str(hi)))
+        lo = hi + timedelta(days=1)
+    taiex.to_parquet(os.path.join(path, "taiex.parquet"), index=False)
+    pd.concat(parts, ignore_index=True).to_parquet(os.path.join(path, "txo.parquet"), index=False)
+
+
+def scale_chain(chain, factor, step=50.0):
+    """
+    放大 factor 倍：每個履約價之間再插 factor - 1 檔 (同一價格區間、同月份)，
+    列數 × factor 而價平附近的分佈不變；factor = 1 回傳原表
+    """
+    if factor <= 1: return chain
+    parts = [chain.assign(strike_price=chain["strike_price"] + j * step / factor) for j in range(factor)]
+    return pd.concat(parts, ignore_index=True)
+
+
+def shift_to_today(df, as_of):
+    """日期整段平移，讓 as_of 落在今天之前最近的交易日 (假 FinMind 伺服器依今天的日期過濾)"""
+    target = pd.Timestamp(date.today())
+    while target.weekday() >= 5:
+        target -= pd.Timedelta(days=1)
+    return df.assign(date=pd.to_datetime(df["date"]) + (target - pd.Timestamp(as_of).normalize()))
+
+
+def load(path=None):
+    return recorded(path) if path else synthetic()
+
+
+if __name__ == "__main__":
+    record(os.environ["FINMIND_TOKEN"], sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 60)
@@ -0,0 +1 @@
+# 讓 pytest 從 repo 根目錄 import core / services / benchmarks
@@ -0,0 +1,3 @@
+"""
+🔰 貝伊果屋 - 核心運算模組 (不依賴 Streamlit，可獨立測速)
+"""
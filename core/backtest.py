@@ -0,0 +1,151 @@
+"""
+真實 TXO 歷史回測：用封存的每日合約收盤價重播，到期前換倉、依目標槓桿選約 (同智慧掃描)
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from core.iv import implied_vol
+from core.metrics_stream import RunningMetrics
+from core.pricing import TXO_MULTIPLIER
+from core.scanner import scan_chain
+
+
+class CostModel(NamedTuple):
+    slippage_points: float = 1.0  # 每邊滑價 (點)
+    fee_twd: float = 25.0         # 每口每邊手續費 (元)
+    tax_rate: float = 0.001       # 期交稅 (權利金 × 稅率)
+
+    def buy(self, price):
+        return price + self.slippage_points + self.fee_twd / TXO_MULTIPLIER + price * self.tax_rate
+
+    def sell(self, price):
+        return np.maximum(price - self.slippage_points - self.fee_twd / TXO_MULTIPLIER - price * self.tax_rate, 0.0)
+
+
+def prepare_chain(chain, op_type):
+    """
+    保留單一買賣權的月合約，加上整數合約鍵 (YYYYMM * 1e6 + 履約價) 與到期剩餘天數
+    字串處理只做在類別 (月份 / 買賣權) 的唯一值上，幾十萬列的歷史鏈也只要幾十毫秒
+    """
+    cp = chain["call_put"].astype("category")
+    con = chain["contract_date"].astype("category")
+    con_str = con.cat.categories.astype(str)
+    monthly = np.asarray(con_str.str.fullmatch(r"\d{6}"), dtype=bool)
+    cp_ok = np.asarray(cp.cat.categories.astype(str).str.upper().str.strip() == op_type, dtype=bool)
+    cp_codes, con_codes = cp.cat.codes.to_numpy(), con.cat.codes.to_numpy()
+    keep = (cp_codes >= 0) & (con_codes >= 0)
+    keep[keep] = cp_ok[cp_codes[keep]] & monthly[con_codes[keep]]
+
+    df = chain.iloc[np.flatnonzero(keep)][["date", "strike_price", "close", "volume"]].reset_index(drop=True)
+    codes = con_codes[keep]
+    df["date"] = pd.to_datetime(df["date"])
+    for col in ["strike_price", "close", "volume"]:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    valid = df[["strike_price", "close"]].notna().all(axis=1).to_numpy()
+    df, codes = df[valid].reset_index(drop=True), codes[valid]
+
+    month_str = con_str.where(monthly, "000001")
+    month_int = month_str.astype(np.int64).to_numpy()
+    expiry = pd.to_datetime(month_str + "15", format="%Y%m%d").to_numpy()
+    df["contract_date"] = np.asarray(con_str)[codes]
+    df["key"] = month_int[codes] * 1_000_000 + df["strike_price"].to_numpy().astype(np.int64)
+    df["dte"] = (expiry[codes] - df["date"].to_numpy()) // np.timedelta64(1, "D")
+    return df.sort_values(["date", "key"], kind="stable").reset_index(drop=True)
+
+
+def pick_contract(rows, S, lev, op_type, min_dte, r=0.02):
+    """某一天的可交易合約中，照智慧掃描的排序挑最接近目標槓桿的那一口；沒有就回傳 None"""
+    rows = rows[(rows["volume"] > 0) & (rows["dte"] >= min_dte)]
+    if rows.empty: return None
+    T = rows["dte"].to_numpy(dtype=float) / 365.0
+    iv, ok = implied_vol(rows["close"].to_numpy(), S, rows["strike_price"].to_numpy(), T, r, op_type == "CALL")
+    sigma = np.where(ok, iv, 0.2)
+    ranked = scan_chain(rows, S, T, lev, op_type, days_to_exp=rows["dte"].to_numpy(), sigma=sigma, r=r)
+    if ranked.empty: return None
+    best = ranked.iloc[0]
+    return int(best["合約"]) * 1_000_000 + int(best["履約價"])
+
+
+def run_option_backtest(chain, taiex, lev, op_type="CALL", min_dte=60, roll_dte=10, costs=CostModel(), start=None, min_fill=0.6):
+    """
+    chain: 多日 TXO 日線 (OptionArchive.history())；taiex: date, close
+    換倉規則：剩餘天數 <= roll_dte 或合約停止報價時，賣出舊倉並以當日收盤選新約買進
+    選約只在換倉日做 (一年約十幾次)，逐日損益則是 (日期 × 持有合約) 收盤價矩陣的向量運算
+    回傳 (chart_df[date, cum_tai, cum_lev], metrics)，格式同 backtest_taiex_leverage_v191；
+    metrics['state'] 是 RunningMetrics 狀態，之後的新交易日可直接 update 接續
+    start: 要求的回測起日；重播的交易日不到 start 之後工作日的 min_fill 就丟 ValueError (讓呼叫端退回近似法)
+    """
+    df = prepare_chain(chain, op_type)
+    idx = taiex[["date", "close"]].copy()
+    idx["date"] = pd.to_datetime(idx["date"])
+    dates = np.intersect1d(idx["date"].to_numpy(), df["date"].unique())
+    if len(dates) < 2: raise ValueError("歷史選擇權資料不足")
+    if start is not None:
+        expected = len(pd.bdate_range(pd.Timestamp(start).normalize(), pd.Timestamp(dates[-1])))
+        if len(dates) < expected * min_fill:
+            raise ValueError(f"歷史選擇權資料只涵蓋 {len(dates)}/{expected} 個交易日")
+    spot = idx.set_index("date")["close"].reindex(dates).to_numpy(dtype=float)
+    day_start = np.searchsorted(df["date"].to_numpy(), dates, side="left")
+    day_end = np.searchsorted(df["date"].to_numpy(), dates, side="right")
+
+    # 1) 換倉迴圈：次數 = 換倉次數，不是天數
+    keys, entries, exits = [], [], []  # 第 k 段：entries[k] 收盤買進 keys[k]，exits[k] 收盤賣出
+    t, n = 0, len(dates)
+    key_dates = df.groupby("key")["date"].max()
+    while t < n - 1:
+        pick = pick_contract(df.iloc[day_start[t]:day_end[t]], spot[t], lev, op_type, min_dte)
+        if pick is None:
+            t += 1
+            continue
+        # 持有到剩餘天數 <= roll_dte 或最後報價日 (以較早者為準)，換倉日當天再選新約
+        expiry = pd.Timestamp(f"{pick // 1_000_000}15")
+        roll_at = min(expiry - pd.Timedelta(days=roll_dte), key_dates[pick])
+        t_exit = min(max(t + 1, int(np.searchsorted(dates, np.datetime64(roll_at), side="right")) - 1), n - 1)
+        keys.append(pick)
+        entries.append(t)
+        exits.append(t_exit)
+        t = t_exit
+    if not keys: raise ValueError("找不到符合目標槓桿的合約")
+
+    # 2) 持有合約的 (日期 × 合約) 收盤價矩陣，缺價沿用前一日
+    held = df[df["key"].isin(keys)]
+    mat = held.pivot_table(index="date", columns="key", values="close", aggfunc="last").reindex(dates)
+    mat = mat.ffill().reindex(columns=list(dict.fromkeys(keys)))
+    col = {k: i for i, k in enumerate(mat.columns)}
+    px = mat.to_numpy(dtype=float)
+
+    # 3) 每一天持有哪一口 (-1 = 空手)
+    pos = np.full(n, -1)
+    for key, t_in, t_out in zip(keys, entries, exits):
+        pos[t_in:t_out] = col[key]
+
+    # 4) 逐日報酬：前一日持有的合約今天的價值 / 前一日基準價；換倉日賣出扣成本、新倉以含成本買價當基準
+    prev = pos[:-1]
+    rows = np.arange(1, n)
+    held_prev = prev >= 0
+    p_prev_col = np.where(held_prev, prev, 0)
+    today_px = px[rows, p_prev_col]
+    sold = held_prev & (pos[1:] != prev)
+    value_today = np.where(sold, costs.sell(today_px), today_px)
+    base = np.full(n, np.nan)
+    has = pos >= 0
+    base[has] = px[np.arange(n)[has], pos[has]]
+    bought = has & np.r_[True, pos[1:] != pos[:-1]]
+    base[bought] = costs.buy(base[bought])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lev_ret = np.where(held_prev, value_today / base[:-1] - 1.0, 0.0)
+    lev_ret = np.clip(np.nan_to_num(lev_ret), -1.0, None)
+    tai_ret = np.diff(spot) / spot[:-1]
+
+    chart_df = pd.DataFrame({
+        "date": pd.to_datetime(dates),
+        "cum_tai": np.r_[1.0, np.cumprod(1 + tai_ret)],
+        "cum_lev": np.r_[1.0, np.cumprod(1 + lev_ret)],
+    })
+    acc = RunningMetrics().update_batch(lev_ret, tai_ret)
+    metrics = acc.metrics(lev)
+    metrics.update({'rolls': len(keys), 'engine': 'txo', 'state': acc.to_dict()})  # trades = 累加器的報酬天數
+    return chart_df, metrics
@@ -0,0 +1,127 @@
+"""
+共用 FinMind 連線層：每個 token 只登入一次、HTTP 連線池重複使用、認證失敗自動重登
+"""
+
+import re
+import threading
+import time
+
+from requests.adapters import HTTPAdapter
+
+# FinMind 的 request_get 失敗時丟 Exception("Final response status: 401, text: ...")
+# 只認 401/403 與「token 無效 / 過期」的訊息；訊息裡剛好提到 token 的其他錯誤 (例如超過流量上限) 不重登
+_AUTH_ERROR = re.compile(r"status:\s*(401|403)\b|(invalid|wrong|expired)\s+token|token\s+(is\s+)?(invalid|wrong|expired)",
+                         re.IGNORECASE)
+
+
+def is_auth_error(exc):
+    return bool(_AUTH_ERROR.search(str(exc)))
+
+
+class FinMindClient:
+    """
+    app 以 st.cache_resource 保存單一實例，所有 fetcher 共用
+    token_provider: 認證失敗時呼叫以取得最新 token (例如重讀 st.secrets)，None 表示沿用原 token
+    api_url: 覆寫 FinMind API 位址 (離線測試指向本地假伺服器)
+    換掉的 DataLoader 先留著，retire_grace 秒後才關它的連線池：別的執行緒可能還拿著舊的在送請求
+    """
+
+    def __init__(self, token_provider=None, pool_maxsize=16, api_url=None, retire_grace=120.0):
+        self.token_provider = token_provider
+        self.pool_maxsize = pool_maxsize
+        self.api_url = api_url
+        self.retire_grace = retire_grace
+        self._loader = None
+        self._retired = []  # [(換掉的時間, DataLoader)]
+        self._token = None
+        self._lock = threading.Lock()
+        self._stats = {"logins": 0, "requests": 0, "bytes": 0, "auth_retries": 0}
+        self._closed_connections = 0
+        self._mark = None
+
+    # ── 連線 ────────────────────────────────────────────────────────────────
+    def loader(self, token):
+        """回傳已登入 token 的 DataLoader；token 換了才重建 (舊的過了 retire_grace 才關)"""
+        with self._lock:
+            if self._retired: self._close_retired()
+            if self._loader is None or token != self._token:
+                self._replace_loader(token)
+            return self._loader
+
+    def _close_retired(self):
+        now, keep = time.monotonic(), []
+        for retired_at, dl in self._retired:
+            if now - retired_at < self.retire_grace:
+                keep.append((retired_at, dl))
+                continue
+            self._closed_connections += self._pool_connections(dl)
+            self._session(dl).close()
+        self._retired = keep
+
+    def _replace_loader(self, token):
+        if self._loader is not None: self._retired.append((time.monotonic(), self._loader))
+        from FinMind.data import DataLoader  # 約 1 秒的 import，延到第一次真正要連線才付
+        dl = DataLoader()
+        if self.api_url: dl._FinMindApi__api_url = self.api_url
+        session = self._session(dl)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_maxsize)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.hooks["response"].append(self._on_response)
+        if token:
+            dl.login_by_token(api_token=token)
+            self._stats["logins"] += 1
+        self._loader, self._token = dl, token
+
+    def fetch(self, token, method, **kwargs):
+        """dl.<method>(**kwargs)；遇到認證錯誤就重新登入 (必要時換新 token) 再試一次"""
+        dl = self.loader(token)
+        try:
+            return getattr(dl, method)(**kwargs)
+        except Exception as e:
+            if not is_auth_error(e): raise
+            fresh = self.token_provider() if self.token_provider else token
+            with self._lock:
+                self._stats["auth_retries"] += 1
+                if self._loader is dl: self._replace_loader(fresh or token)  # 別的執行緒已經重登過就直接用它的
+                dl = self._loader
+            return getattr(dl, method)(**kwargs)
+
+    @staticmethod
+    def _session(dl):
+        return dl._FinMindApi__session
+
+    @staticmethod
+    def _pool_connections(dl):
+        adapters = set(FinMindClient._session(dl).adapters.values())
+        total = 0
+        for adapter in adapters:
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None: total += pool.num_connections
+        return total
+
+    def _on_response(self, response, *args, **kwargs):
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["bytes"] += len(response.content or b"")
+        return response
+
+    # ── 觀測 ────────────────────────────────────────────────────────────────
+    def stats(self):
+        """累計的登入 / 新建 TCP 連線 / 請求數 / 下載位元組"""
+        with self._lock:
+            out = dict(self._stats)
+            live = [dl for _, dl in self._retired] + ([self._loader] if self._loader else [])
+            out["connections"] = self._closed_connections + sum(self._pool_connections(dl) for dl in live)
+        return out
+
+    def begin_rerun(self):
+        """每次 Streamlit rerun 開頭呼叫，之後用 rerun_stats() 看這次重跑的增量"""
+        self._mark = self.stats()
+
+    def rerun_stats(self):
+        now = self.stats()
+        base = self._mark or {k: 0 for k in now}
+        return {k: now[k] - base.get(k, 0) for k in now}
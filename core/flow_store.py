@@ -0,0 +1,194 @@
+"""
+三大法人買賣超與新聞的本地歷史：以已存的最後日期為水位只抓新資料，追加進 Parquet (投資人 / 來源欄為 categorical)
+面板讀記憶體裡預先切好的最新一段，不再每 30 分鐘重抓整段再丟掉大半
+"""
+
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import date, timedelta
+
+import pandas as pd
+
+from core.storage import data_path, write_parquet_atomic
+
+
+class _IncrementalHistory(ABC):
+    """
+    子類別定義 columns / categoricals / integers / key 與 _start / _fetch / _slice (最新切片，每次有新資料才重算)
+    refresh() 照 refresh_interval 節流；別的 session 正在抓而本地已有資料時直接用舊的，不排隊等
+    """
+
+    columns = ()
+    categoricals = ()
+    integers = ()
+    key = ()
+
+    retry_after = 60
+
+    def __init__(self, client, path, refresh_interval=1800, lookback_days=10):
+        self.client = client
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.lookback_days = lookback_days
+        self._lock = threading.Lock()
+        self._last_refresh = 0.0
+        self.fetched_rows = 0
+        self._df = self._load()
+        self._latest = self._slice(self._df)
+
+    def _load(self):
+        if os.path.exists(self.path):
+            try:
+                return self._normalize(pd.read_parquet(self.path))
+            except Exception:
+                pass
+        return self._normalize(pd.DataFrame(columns=list(self.columns)))
+
+    def _normalize(self, df):
+        df = df.reindex(columns=list(self.columns)).copy()
+        df["date"] = pd.to_datetime(df["date"])
+        for col in self.categoricals:
+            df[col] = df[col].astype(str).astype("category")
+        for col in self.integers:
+            df[col] = pd.to_numeric(df[col]).astype("int64")
+        df = df.drop_duplicates(list(self.key), keep="last")
+        return df.sort_values(["date", *self.key], kind="stable").reset_index(drop=True)
+
+    def watermark(self):
+        """本地最後一筆的日期；沒有資料回傳 None"""
+        return self._df["date"].iloc[-1] if len(self._df) else None
+
+    @abstractmethod
+    def _start(self):
+        """這次要從哪一天抓起"""
+
+    @abstractmethod
+    def _fetch(self, token, start):
+        """抓 start 之後的資料，沒有新資料回傳 None 或空表"""
+
+    @abstractmethod
+    def _slice(self, df):
+        """面板用的最新切片"""
+
+    def _prepare(self, new):
+        return new.reindex(columns=list(self.columns))
+
+    def refresh(self, token, force=False):
+        """從水位往後抓，回傳新增列數"""
+        due = force or time.monotonic() - self._last_refresh >= self.refresh_interval
+        if not due: return 0
+        if not self._lock.acquire(blocking=self._df.empty): return 0
+        try:
+            if not force and time.monotonic() - self._last_refresh < self.refresh_interval: return 0  # 等鎖時別人剛抓完
+            try:
+                new = self._fetch(token, self._start())
+            except Exception:
+                # 上游掛掉時 retry_after 秒後再試，不要每次重跑都卡在逾時上
+                self._last_refresh = time.monotonic() - self.refresh_interval + min(self.retry_after, self.refresh_interval)
+                raise
+            self._last_refresh = time.monotonic()
+            if new is None or new.empty: return 0
+            self.fetched_rows += len(new)
+            before = len(self._df)
+            df = self._normalize(pd.concat([self._df.astype({c: object for c in self.categoricals}),
+                                            self._prepare(new)], ignore_index=True))
+            added = len(df) - before
+            if added:
+                write_parquet_atomic(df, self.path)
+                self._df, self._latest = df, self._slice(df)
+            return added
+        finally:
+            self._lock.release()
+
+    def latest(self, token=None):
+        """有 token 就先照節流補抓；回傳記憶體裡的最新切片，呼叫端請勿原地修改"""
+        if token is not None: self.refresh(token)
+        return self._latest
+
+    def history(self, start=None):
+        df = self._df
+        return df if start is None else df.iloc[df["date"].searchsorted(pd.Timestamp(start)):]
+
+
+class InstitutionalHistory(_IncrementalHistory):
+    """
+    taiwan_stock_institutional_investors_total：每個交易日一批 (外資、投信、自營商…)，整天收盤後才公布
+    水位的隔天起抓；第一次抓 lookback_days 天，之後歷史一路累積給趨勢用
+    """
+
+    columns = ("date", "name", "buy", "sell")
+    categoricals = ("name",)
+    integers = ("buy", "sell")
+    key = ("date", "name")
+
+    def __init__(self, client, path=None, refresh_interval=1800, lookback_days=10):
+        super().__init__(client, path or data_path("institutional.parquet"), refresh_interval, lookback_days)
+
+    def _start(self):
+        wm = self.watermark()
+        return wm + timedelta(days=1) if wm is not None else pd.Timestamp(date.today() - timedelta(days=self.lookback_days))
+
+    def _fetch(self, token, start):
+        if start.date() > date.today(): return None
+        return self.client.fetch(token, "taiwan_stock_institutional_investors_total", start_date=start.strftime("%Y-%m-%d"))
+
+    def _slice(self, df):
+        if df.empty: return df.assign(net=pd.Series(dtype=float))
+        out = df.iloc[df["date"].searchsorted(df["date"].iloc[-1]):].copy()
+        out["net"] = (out["buy"] - out["sell"]) / 100000000
+        return out.reset_index(drop=True)
+
+    def net_flows(self, start=None):
+        """每日各法人買賣超 (億元)，列 = 日期、欄 = 法人"""
+        df = self.history(start)
+        net = (df["buy"] - df["sell"]) / 100000000
+        return net.groupby([df["date"], df["name"]], observed=True).sum().unstack("name")
+
+
+class NewsHistory(_IncrementalHistory):
+    """
+    taiwan_stock_news：先抓 TAIEX，沒有就抓 2330 (同原本邏輯)
+    FinMind 只能用日期過濾，水位當天要重抓一次；以 (日期, 標題, 連結) 的雜湊去重，重複的不會再寫入
+    """
+
+    columns = ("date", "stock_id", "title", "description", "link", "source", "hash")
+    categoricals = ("stock_id", "source")
+    integers = ("hash",)
+    key = ("hash",)
+
+    def __init__(self, client, path=None, refresh_interval=1800, lookback_days=3, stock_ids=("TAIEX", "2330"), n=10):
+        self.stock_ids = stock_ids
+        self.n = n
+        super().__init__(client, path or data_path("news.parquet"), refresh_interval, lookback_days)
+
+    def _prepare(self, new):
+        new = super()._prepare(new)
+        new["date"] = pd.to_datetime(new["date"])
+        # hash_pandas_object 用固定金鑰，跨行程 / 重啟結果一致；轉成 int64 存 (Parquet 對有號整數支援最好)
+        h = pd.util.hash_pandas_object(new[["date", "title", "link"]].astype(str), index=False)
+        new["hash"] = h.to_numpy().view("int64")
+        return new
+
+    def _start(self):
+        wm = self.watermark()
+        return wm.normalize() if wm is not None else pd.Timestamp(date.today() - timedelta(days=self.lookback_days))
+
+    def _fetch(self, token, start):
+        for stock_id in self.stock_ids:
+            news = self.client.fetch(token, "taiwan_stock_news", stock_id=stock_id, start_date=start.strftime("%Y-%m-%d"))
+            if not news.empty: return news
+        return None
+
+    def _slice(self, df):
+        return df.iloc[::-1].head(self.n).reset_index(drop=True)
+
+    def purge(self, keep_days=90):
+        """新聞文字佔空間，只留最近 keep_days 天"""
+        with self._lock:
+            cutoff = pd.Timestamp(date.today() - timedelta(days=keep_days))
+            df = self.history(cutoff).reset_index(drop=True)
+            if len(df) < len(self._df):
+                write_parquet_atomic(df, self.path)
+                self._df = df
@@ -0,0 +1,145 @@
+"""
+隱含波動率：整條 TXO 鏈一次反推 (向量化 Newton + 二分法保底)
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from core.pricing import bs_greeks
+from core.scanner import contract_days_to_expiry
+
+SIGMA_LO, SIGMA_HI = 1e-4, 5.0
+
+
+def implied_vol(price, S, K, T, r, is_call, n_iter=40, tol=1e-4):
+    """
+    回傳 (iv, converged)，所有參數可廣播
+    每輪對整個陣列同時做一步 Newton；跳出 [lo, hi] 區間或 vega 太小的位置改走二分法，
+    固定跑 n_iter 輪 (全部收斂就提早結束)。價格違反無套利上下界的合約不求解，iv 為 NaN
+    """
+    price, S, K, T, is_call = np.broadcast_arrays(
+        np.asarray(price, dtype=float), np.asarray(S, dtype=float), np.asarray(K, dtype=float),
+        np.asarray(T, dtype=float), np.asarray(is_call, dtype=bool))
+    disc_K = K * np.exp(-r * np.where(np.isfinite(T), T, 0.0))
+    lower = np.where(is_call, np.maximum(S - disc_K, 0.0), np.maximum(disc_K - S, 0.0))
+    upper = np.where(is_call, S, disc_K)
+    with np.errstate(invalid="ignore"):
+        solvable = (np.isfinite(price) & np.isfinite(S) & np.isfinite(K) & np.isfinite(T)
+                    & (S > 0) & (K > 0) & (T > 0) & (price > lower) & (price < upper))
+
+    lo = np.full(price.shape, SIGMA_LO)
+    hi = np.full(price.shape, SIGMA_HI)
+    # Brenner-Subrahmanyam 近似當起點
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sigma = np.sqrt(2.0 * np.pi / T) * price / S
+    sigma = np.clip(np.where(np.isfinite(sigma), sigma, 0.3), 0.05, 2.0)
+    converged = ~solvable
+
+    for _ in range(n_iter):
+        g = bs_greeks(S, K, T, r, sigma, is_call)
+        diff = g.price - price
+        converged |= np.abs(diff) < tol
+        if converged.all(): break
+        active = ~converged
+        hi = np.where(active & (diff > 0), sigma, hi)
+        lo = np.where(active & (diff < 0), sigma, lo)
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            newton = sigma - diff / g.vega
+        use_newton = np.isfinite(newton) & (newton > lo) & (newton < hi)
+        sigma = np.where(active, np.where(use_newton, newton, 0.5 * (lo + hi)), sigma)
+
+    converged &= solvable
+    return np.where(converged, sigma, np.nan), converged
+
+
+def solve_chain_iv(chain, S, as_of, r=0.02):
+    """
+    chain: get_data 回傳的單日 TXO 合約 (含 contract_date, strike_price, call_put, close, volume)
+    回傳 smile DataFrame：contract_date, call_put, strike_price, close, volume, T, iv, converged
+    只反推有成交 (volume > 0) 的合約，沒成交的 close 不可信
+    """
+    cols = ["contract_date", "call_put", "strike_price", "close", "volume"]
+    smile = chain[cols].copy()
+    smile["contract_date"] = smile["contract_date"].astype(str)
+    smile["call_put"] = smile["call_put"].astype(str).str.upper().str.strip()
+    for col in ["strike_price", "close", "volume"]:
+        smile[col] = pd.to_numeric(smile[col], errors="coerce")
+    smile["T"] = contract_days_to_expiry(smile["contract_date"], as_of) / 365.0
+
+    price = np.where(smile["volume"].to_numpy() > 0, smile["close"].to_numpy(), np.nan)
+    iv, ok = implied_vol(price, S, smile["strike_price"].to_numpy(), smile["T"].to_numpy(), r,
+                         smile["call_put"].to_numpy() == "CALL")
+    smile["iv"] = iv
+    smile["converged"] = ok
+    return smile.sort_values(["contract_date", "call_put", "strike_price"]).reset_index(drop=True)
+
+
+def iv_surface(smile, S):
+    """價外 (OTM) 一側的 iv 組成 strike × contract_date 波動率曲面"""
+    otm = smile["converged"] & (
+        ((smile["call_put"] == "CALL") & (smile["strike_price"] >= S))
+        | ((smile["call_put"] == "PUT") & (smile["strike_price"] < S)))
+    return smile[otm].pivot_table(index="strike_price", columns="contract_date", values="iv", aggfunc="mean")
+
+
+def chain_sigma(tdf, smile, S, fallback=0.2):
+    """
+    給掃描用：每筆合約自己的 iv；沒收斂的依履約價在同月份的 OTM 微笑曲線上內插，
+    整月都解不出來才退回 fallback
+    """
+    strike = pd.to_numeric(tdf["strike_price"], errors="coerce").to_numpy(dtype=float)
+    if smile.empty: return np.full(strike.shape, fallback)
+    key = pd.MultiIndex.from_arrays([tdf["contract_date"].astype(str), tdf["call_put"].astype(str).str.upper().str.strip(), strike])
+    own = smile.set_index(["contract_date", "call_put", "strike_price"])["iv"]
+    own = own[~own.index.duplicated()].reindex(key).to_numpy(dtype=float)
+
+    sigma = own.copy()
+    contracts = tdf["contract_date"].astype(str).to_numpy()
+    for con in np.unique(contracts):
+        curve = iv_surface(smile[smile["contract_date"] == con], S)
+        rows = (contracts == con) & ~np.isfinite(sigma)
+        if not rows.any(): continue
+        if curve.empty:
+            sigma[rows] = fallback
+        else:
+            sigma[rows] = np.interp(strike[rows], curve.index.to_numpy(dtype=float), curve.iloc[:, 0].to_numpy(dtype=float))
+    return np.where(np.isfinite(sigma), sigma, fallback)
+
+
+class IVCache:
+    """
+    以 (資料日期, contract_date) 為鍵的 smile 快取，同一份 get_data 快照內重複掃描不再重解
+    執行緒安全 (Streamlit 每個 session 跑在不同執行緒)
+    """
+
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self._store = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def smile(self, chain, S, as_of, contract_dates, r=0.02):
+        as_of = pd.Timestamp(as_of).normalize()
+        contract_dates = [str(c) for c in contract_dates]
+        found = {}
+        with self._lock:
+            for con in contract_dates:
+                if (as_of, con) in self._store:
+                    self._store.move_to_end((as_of, con))
+                    found[con] = self._store[(as_of, con)]
+            missing = [c for c in contract_dates if c not in found]
+            self.hits += len(found)
+            self.misses += len(missing)
+        if missing:
+            part = chain[chain["contract_date"].astype(str).isin(missing)]
+            solved = solve_chain_iv(part, S, as_of, r)
+            with self._lock:
+                for con in missing:
+                    found[con] = self._store[(as_of, con)] = solved[solved["contract_date"] == con].reset_index(drop=True)
+                while len(self._store) > self.maxsize:
+                    self._store.popitem(last=False)
+        return pd.concat([found[c] for c in contract_dates], ignore_index=True)
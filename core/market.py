@@ -0,0 +1,91 @@
+"""
+行情快照與付費回測的純邏輯 (不 import streamlit)：services 包上快取給 app 用，benchmarks 直接離線呼叫
+"""
+
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from core.prefetch import prefetch
+from core.telemetry import TELEMETRY
+
+
+@TELEMETRY.timed("load.market")
+def load_market(token, taiex, archive, sources=None):
+    """
+    taiex: TaiexHistory；archive: OptionArchive。回傳 (S, 最新交易日合約鏈, 資料日期, ma20, ma60)
+    sources: 給 dict 就把各來源這次的 FetchResult (不含資料本身) 寫進去，給畫面顯示各來源延遲
+    """
+    # TAIEX 與 TXO 兩個請求互不相依，同時發出；背景刷新沒有 ScriptRunContext，所以不碰 st.*
+    fetched = prefetch({
+        "taiex": lambda: taiex.window(token, 100),
+        "txo": lambda: archive.update(token),  # 失敗就沿用本地已封存的最新交易日
+    }, timeout=20.0)
+    if sources is not None: sources.update({name: r._replace(value=None) for name, r in fetched.items()})
+    if not fetched["taiex"].ok: raise RuntimeError(f"TAIEX: {fetched['taiex'].error}")
+    index_df = fetched["taiex"].value
+    S = float(index_df["close"].iloc[-1]) if not index_df.empty else 23000.0
+    ma20 = index_df['close'].rolling(20).mean().iloc[-1] if len(index_df) > 20 else S * 0.98
+    ma60 = index_df['close'].rolling(60).mean().iloc[-1] if len(index_df) > 60 else S * 0.95
+
+    df = archive.latest()
+    if df.empty: raise RuntimeError("TXO: 本地沒有任何交易日")
+    return S, df, df["date"].iloc[0], ma20, ma60
+
+
+def fallback_market(archive):
+    """連快照都拿不到時：指數用預設值，合約鏈用本地封存的最新一天 (沒有就空表)"""
+    df = archive.latest()
+    if df.empty: return 23000.0, pd.DataFrame(), pd.to_datetime(date.today()), 22800.0, 22500.0
+    return 23000.0, df, df["date"].iloc[0], 22800.0, 22500.0
+
+
+def backtest_window(days):
+    """回測天數 → TXO 重播需要的歷史天數"""
+    return max(days * 2, 180)
+
+
+def leverage_backtest(token, lev, days, archive, taiex, sweep=None):
+    """
+    付費回測：真實 TXO 歷史重播 → 拿不到就查 sweep() 回傳的 槓桿 × 天數 近似表 → 再不行用固定種子的模擬報酬
+    sweep: 回傳 SweepResult 的函式 (app 傳快取版；None 表示跳過這一層)
+    按鈕路徑不回補：封存由背景暖機 (archive.backfill) 補齊，還沒涵蓋回測窗口就先用近似表
+    """
+    window_days = backtest_window(days)
+    try:
+        from core.backtest import run_option_backtest
+        start = pd.Timestamp(date.today() - timedelta(days=window_days))
+        if not archive.covers(start): raise RuntimeError(f"TXO 封存尚未回補到 {start:%Y-%m-%d}")
+        return run_option_backtest(archive.history(start=start), taiex.window(token, window_days), lev, start=start)
+    except Exception as e:
+        TELEMETRY.error("backtest.options", e)  # 歷史選擇權資料拿不到就退回指數 × 槓桿的近似法
+    try:
+        if sweep is None: raise RuntimeError("no sweep")
+        return sweep().lookup(lev, days)
+    except Exception as e:
+        TELEMETRY.error("backtest.sweep", e)
+        return mock_backtest(lev, days)
+
+
+def mock_backtest(lev, days):
+    rng = np.random.RandomState(42)
+    n_days = min(days * 2, 365)
+    dates = pd.date_range(end=date.today(), periods=n_days, freq='B')
+    mock_daily_ret = rng.normal(0.0005, 0.012, n_days)
+    mock_lev_ret = mock_daily_ret * lev * 0.8 - 0.0003
+    mock_df = pd.DataFrame({
+        'date': dates,
+        'cum_tai': (1 + pd.Series(mock_daily_ret)).cumprod(),
+        'cum_lev': (1 + pd.Series(mock_lev_ret)).cumprod()
+    })
+    mock_avg = mock_lev_ret.mean()
+    mock_std = mock_lev_ret.std()
+    return (mock_df, {
+        'total_lev': mock_df['cum_lev'].iloc[-1] - 1,
+        'total_tai': mock_df['cum_tai'].iloc[-1] - 1,
+        'win_rate': round((pd.Series(mock_lev_ret) > 0).mean() * 100, 1),
+        'sharpe': round((mock_avg / mock_std * np.sqrt(252)) if mock_std > 0 else 0, 2),
+        'maxdd': round((mock_df['cum_lev'] / mock_df['cum_lev'].cummax() - 1).min() * 100, 1),
+        'trades': n_days, 'lev': lev, 'avg_ret': round(mock_avg * 100, 2)
+    })
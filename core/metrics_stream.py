@@ -0,0 +1,109 @@
+"""
+回測績效的串流累加器：新的一根 K 棒 O(1) 更新，不必整段重算 cumprod / cummax / std
+"""
+
+import json
+
+import numpy as np
+
+_FIELDS = ("n", "mean", "m2", "wins", "cum", "peak", "maxdd", "cum_bench")
+
+
+class RunningMetrics:
+    """
+    保存：筆數、Welford 平均 / 平方差和、上漲天數、累積淨值、歷史高點、最大回撤、大盤累積淨值
+    update() 一次一筆；update_batch() 一次一段 NumPy 陣列 (結果與逐筆完全相同)
+    to_dict()/from_dict() 可存進 JSON，隔天載回來接著 update 新的報酬即可
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.wins = 0
+        self.cum = 1.0
+        self.peak = 1.0    # 起始淨值 1.0 也算高點 (同圖上前面補的 1.0)，第一天就虧也算回撤
+        self.maxdd = 0.0
+        self.cum_bench = 1.0
+
+    def update(self, ret, bench_ret=0.0):
+        ret = float(ret)
+        self.n += 1
+        delta = ret - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (ret - self.mean)
+        self.wins += ret > 0
+        self.cum *= 1 + ret
+        self.peak = max(self.peak, self.cum)
+        self.maxdd = min(self.maxdd, self.cum / self.peak - 1)
+        self.cum_bench *= 1 + float(bench_ret)
+        return self
+
+    def update_batch(self, rets, bench_rets=None):
+        """一段報酬一次併入 (Chan 平行變異數合併)，長歷史分段餵入記憶體用量固定"""
+        rets = np.asarray(rets, dtype=float)
+        if rets.size == 0: return self
+        k = rets.size
+        b_mean = rets.mean()
+        b_m2 = ((rets - b_mean) ** 2).sum()
+        delta = b_mean - self.mean
+        total = self.n + k
+        self.m2 += b_m2 + delta**2 * self.n * k / total
+        self.mean += delta * k / total
+        self.n = total
+        self.wins += int((rets > 0).sum())
+
+        path = self.cum * np.cumprod(1 + rets)
+        peaks = np.maximum.accumulate(np.maximum(path, self.peak))
+        self.maxdd = min(self.maxdd, float((path / peaks - 1).min()))
+        self.cum, self.peak = float(path[-1]), float(peaks[-1])
+        if bench_rets is not None:
+            self.cum_bench *= float(np.prod(1 + np.asarray(bench_rets, dtype=float)))
+        return self
+
+    def consume(self, bars, chunk=4096):
+        """
+        bars: (策略報酬, 大盤報酬) 的產生器，可無限長；每 chunk 筆做一次批次更新
+        只保留固定大小的暫存，適合整段歷史讀不進記憶體的情況
+        """
+        buf, bench = [], []
+        for ret, bench_ret in bars:
+            buf.append(ret)
+            bench.append(bench_ret)
+            if len(buf) >= chunk:
+                self.update_batch(buf, bench)
+                buf, bench = [], []
+        return self.update_batch(buf, bench)
+
+    @property
+    def std(self):
+        return (self.m2 / (self.n - 1)) ** 0.5 if self.n > 1 else 0.0
+
+    def metrics(self, lev):
+        """同 backtest_taiex_leverage_v191 的 metrics 欄位"""
+        std = self.std
+        return {
+            'total_lev': self.cum - 1, 'total_tai': self.cum_bench - 1,
+            'win_rate': round(self.wins / self.n * 100, 1) if self.n else 0.0,
+            'sharpe': round((self.mean / std * np.sqrt(252)) if std > 0 else 0, 2),
+            'maxdd': round(self.maxdd * 100, 1),
+            'trades': self.n, 'lev': lev, 'avg_ret': round(self.mean * 100, 2),
+        }
+
+    def to_dict(self):
+        return {f: getattr(self, f) for f in _FIELDS}
+
+    @classmethod
+    def from_dict(cls, state):
+        obj = cls()
+        for f in _FIELDS:
+            setattr(obj, f, state[f])
+        if obj.peak is None: obj.peak = 1.0  # 舊格式還沒 update 過的狀態
+        return obj
+
+    def to_json(self):
+        return json.dumps(self.to_dict())
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.from_dict(json.loads(text))
@@ -0,0 +1,133 @@
+"""
+未平倉籌碼牆 (OI Walls)：依履約價 × 買賣權彙總全部合約的未平倉量，找壓力 / 支撐、最大痛點與日增減
+"""
+
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+
+class StrikeOI(NamedTuple):
+    """某一交易日依履約價排序的 CALL / PUT 未平倉量 (所有選定合約加總)"""
+    strikes: np.ndarray
+    call_oi: np.ndarray
+    put_oi: np.ndarray
+
+
+class OIWalls(NamedTuple):
+    date: pd.Timestamp
+    strikes: np.ndarray
+    call_oi: np.ndarray
+    put_oi: np.ndarray
+    call_chg: np.ndarray    # 與前一交易日相比的增減；沒有前一日則為 NaN
+    put_chg: np.ndarray
+    call_wall: float        # CALL 未平倉最大的履約價 (壓力)
+    put_wall: float         # PUT 未平倉最大的履約價 (支撐)
+    max_pain: float         # 到期結算在此價位時買方總內含價值最小
+    pcr: float              # PUT / CALL 未平倉比
+
+    def window(self, S, width=1000):
+        """現價 ±width 的部分 (畫圖用)"""
+        keep = np.abs(self.strikes - S) <= width
+        return self._replace(strikes=self.strikes[keep], call_oi=self.call_oi[keep], put_oi=self.put_oi[keep],
+                             call_chg=self.call_chg[keep], put_chg=self.put_chg[keep])
+
+
+def strike_oi(chain, contract_dates=None):
+    """
+    chain: 單日 TXO 合約 (含 contract_date, strike_price, call_put, open_interest)
+    call_put 轉類別只處理唯一值，(履約價, 買賣權) 用 np.unique + bincount 一次樞紐，不用 groupby
+    沒有 open_interest 欄位或沒有資料時回傳 None
+    """
+    if chain.empty or "open_interest" not in chain.columns: return None
+    if contract_dates is not None:
+        chain = chain[chain["contract_date"].astype(str).isin([str(c) for c in contract_dates])]
+    cp = chain["call_put"].astype("category")
+    side = pd.Series(cp.cat.categories.astype(str).str.upper().str.strip()).map({"CALL": 0, "PUT": 1}).to_numpy()
+    codes = cp.cat.codes.to_numpy()
+    strike = pd.to_numeric(chain["strike_price"], errors="coerce").to_numpy(dtype=float)
+    oi = pd.to_numeric(chain["open_interest"], errors="coerce").fillna(0).to_numpy(dtype=float)
+
+    side_row = np.where(codes >= 0, side[np.maximum(codes, 0)], np.nan)
+    ok = np.isfinite(strike) & (strike > 0) & np.isfinite(side_row)
+    if not ok.any(): return None
+    strikes, idx = np.unique(strike[ok], return_inverse=True)
+    table = np.bincount(idx * 2 + side_row[ok].astype(int), weights=oi[ok], minlength=2 * len(strikes)).reshape(-1, 2)
+    return StrikeOI(strikes, table[:, 0], table[:, 1])
+
+
+def max_pain(strikes, call_oi, put_oi):
+    """對每個候選結算價算買方總內含價值 (履約價 × 履約價矩陣)，取最小者"""
+    settle = strikes[:, None]
+    pain = (call_oi[None, :] * np.maximum(settle - strikes[None, :], 0.0)).sum(axis=1) \
+        + (put_oi[None, :] * np.maximum(strikes[None, :] - settle, 0.0)).sum(axis=1)
+    return float(strikes[int(np.argmin(pain))])
+
+
+def _aligned(prev, strikes):
+    """前一日的 OI 對齊到今天的履約價；前一日沒有的履約價視為 0 (新掛牌)"""
+    pos = np.searchsorted(prev.strikes, strikes)
+    pos = np.minimum(pos, len(prev.strikes) - 1)
+    hit = prev.strikes[pos] == strikes
+    return np.where(hit, prev.call_oi[pos], 0.0), np.where(hit, prev.put_oi[pos], 0.0)
+
+
+def compute_oi_walls(day, today, prev=None):
+    """today / prev: StrikeOI；prev 為 None 時日增減為 NaN"""
+    if prev is None:
+        call_chg = put_chg = np.full(len(today.strikes), np.nan)
+    else:
+        prev_call, prev_put = _aligned(prev, today.strikes)
+        call_chg, put_chg = today.call_oi - prev_call, today.put_oi - prev_put
+    total_call = today.call_oi.sum()
+    return OIWalls(
+        pd.Timestamp(day), today.strikes, today.call_oi, today.put_oi, call_chg, put_chg,
+        float(today.strikes[int(np.argmax(today.call_oi))]), float(today.strikes[int(np.argmax(today.put_oi))]),
+        max_pain(today.strikes, today.call_oi, today.put_oi),
+        float(today.put_oi.sum() / total_call) if total_call > 0 else float("nan"),
+    )
+
+
+class OIWallTracker:
+    """
+    以交易日為鍵保存 StrikeOI (LRU)：新的交易日進來只樞紐那一天，日增減拿快取裡的前一日相減
+    前一日不在快取時呼叫 load_day(日期) 讀一次 (例如 OptionArchive 的單一分區)
+    """
+
+    def __init__(self, maxsize=8):
+        self.maxsize = maxsize
+        self._days = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, day):
+        with self._lock:
+            if day in self._days:
+                self._days.move_to_end(day)
+                return self._days[day]
+        return None
+
+    def _put(self, day, value):
+        with self._lock:
+            self._days[day] = value
+            while len(self._days) > self.maxsize:
+                self._days.popitem(last=False)
+
+    def walls(self, day, chain, prev_day=None, load_day=None, contract_dates=None):
+        day = pd.Timestamp(day).normalize()
+        key = (day, tuple(contract_dates) if contract_dates is not None else None)
+        today = self._get(key)
+        if today is None:
+            today = strike_oi(chain, contract_dates)
+            if today is None: return None
+            self._put(key, today)
+        prev = None
+        if prev_day is not None:
+            prev_key = (pd.Timestamp(prev_day).normalize(), key[1])
+            prev = self._get(prev_key)
+            if prev is None and load_day is not None:
+                prev = strike_oi(load_day(prev_key[0]), contract_dates)
+                if prev is not None: self._put(prev_key, prev)
+        return compute_oi_walls(day, today, prev)
@@ -0,0 +1,167 @@
+"""
+TXO 日線本地封存：依交易日分區的 Parquet，只追加還沒存過的日期
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+
+from core.storage import DATA_DIR
+
+PARTITIONING = ds.partitioning(pa.schema([("date", pa.date32())]), flavor="hive")
+
+
+class OptionArchive:
+    """
+    目錄結構：<root>/date=YYYY-MM-DD/part-0.parquet
+    update() 只抓最後一個已存日期之後的資料；FinMind 掛掉時 latest()/history() 仍可讀本地
+    讀取一律走 pyarrow.dataset 的分區過濾 (只打開需要的日期檔) + memory map
+    """
+
+    def __init__(self, client, root=None, option_id="TXO", lookback_days=30, refresh_interval=300):
+        self.client = client
+        self.option_id = option_id
+        self.root = root or os.path.join(DATA_DIR, option_id.lower())
+        self.lookback_days = lookback_days
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._last_refresh = 0.0
+        os.makedirs(self.root, exist_ok=True)
+
+    def stored_dates(self):
+        out = []
+        for name in os.listdir(self.root):
+            if name.startswith("date=") and os.path.exists(os.path.join(self.root, name, "part-0.parquet")):
+                out.append(pd.Timestamp(name[5:]))
+        return sorted(out)
+
+    def update(self, token, force=False):
+        """補抓缺少的交易日並寫入分區，回傳新增的日期；refresh_interval 秒內不重複打 API"""
+        with self._lock:
+            if not force and time.monotonic() - self._last_refresh < self.refresh_interval:
+                return []
+            stored = self.stored_dates()
+            start = stored[-1] + timedelta(days=1) if stored else pd.Timestamp(date.today() - timedelta(days=self.lookback_days))
+            self._last_refresh = time.monotonic()
+            if start.date() > date.today(): return []
+            df = self.client.fetch(token, "taiwan_option_daily", option_id=self.option_id, start_date=start.strftime("%Y-%m-%d"))
+            if df is None or df.empty: return []
+            df = df.copy()
+            df["date"] = pd.to_datetime(df["date"])
+            added = []
+            for day, part in df.groupby("date"):
+                if day in stored: continue
+                self._write_partition(day, part.drop(columns="date"))
+                added.append(day)
+            return added
+
+    def covered_from(self, stored=None):
+        """已回補到哪一天 (_covered_from 標記，沒有就是最早分區)；什麼都沒存回傳 None"""
+        marker = os.path.join(self.root, "_covered_from")
+        if os.path.exists(marker): return pd.Timestamp(open(marker).read().strip())
+        stored = self.stored_dates() if stored is None else stored
+        return stored[0] if stored else None
+
+    def covers(self, start, slack_days=7, min_fill=0.6):
+        """
+        本地封存是否已涵蓋 start 之後的歷史 (只讀本地，不打 API)
+        最早分區要在 start 後 slack_days 天內，且分區數至少是期間工作日的 min_fill (交易日約佔工作日九成五)
+        """
+        start = pd.Timestamp(start).normalize()
+        stored = self.stored_dates()
+        covered = self.covered_from(stored)
+        if covered is None or not stored: return False
+        if max(covered, stored[0]) > start + timedelta(days=slack_days): return False
+        expected = len(pd.bdate_range(start, date.today()))
+        return sum(d >= start for d in stored) >= expected * min_fill
+
+    def backfill(self, token, start, chunk_days=31):
+        """
+        回補 start 到目前最早分區之間的歷史：由近往遠分段下載 (一段 31 天一定有交易日)，遇到空段就停
+        _covered_from 只記到真的有資料的最早一天，上游沒回資料的區間不會被當成已回補
+        """
+        start = pd.Timestamp(start).normalize()
+        with self._lock:
+            stored = self.stored_dates()
+            marker = os.path.join(self.root, "_covered_from")
+            covered = self.covered_from(stored)
+            if covered is not None and start >= covered: return []
+            end = (covered - timedelta(days=1)) if covered is not None else pd.Timestamp(date.today())
+            stored = set(stored)
+            added, earliest, hi = [], None, end
+            while hi >= start:
+                lo = max(hi - timedelta(days=chunk_days - 1), start)
+                df = self.client.fetch(token, "taiwan_option_daily", option_id=self.option_id,
+                                       start_date=lo.strftime("%Y-%m-%d"), end_date=hi.strftime("%Y-%m-%d"))
+                if df is None or df.empty: break
+                df = df.copy()
+                df["date"] = pd.to_datetime(df["date"])
+                for day, part in df.groupby("date"):
+                    if day in stored: continue
+                    self._write_partition(day, part.drop(columns="date"))
+                    stored.add(day)
+                    added.append(day)
+                earliest = df["date"].min() if earliest is None else min(earliest, df["date"].min())
+                hi = lo - timedelta(days=1)
+            if earliest is not None:
+                with open(marker, "w") as f:
+                    f.write(earliest.strftime("%Y-%m-%d"))
+            return sorted(added)
+
+    def _write_partition(self, day, part):
+        final = os.path.join(self.root, f"date={day:%Y-%m-%d}")
+        tmp = tempfile.mkdtemp(dir=self.root, prefix=".tmp-")
+        try:
+            pq.write_table(pa.Table.from_pandas(part.reset_index(drop=True), preserve_index=False),
+                           os.path.join(tmp, "part-0.parquet"))
+            if os.path.exists(final): shutil.rmtree(final)
+            os.replace(tmp, final)
+        finally:
+            if os.path.exists(tmp): shutil.rmtree(tmp)
+
+    def _dataset(self):
+        return ds.dataset(self.root, format="parquet", partitioning=PARTITIONING,
+                          filesystem=pafs.LocalFileSystem(use_mmap=True), ignore_prefixes=[".", "_"])
+
+    def _read(self, expr, columns=None):
+        df = self._dataset().to_table(filter=expr, columns=columns).to_pandas()
+        if "date" in df: df["date"] = pd.to_datetime(df["date"])
+        return df
+
+    def latest(self):
+        """最新交易日的完整合約鏈 (只讀那一個分區)"""
+        stored = self.stored_dates()
+        if not stored: return pd.DataFrame()
+        return self.read_day(stored[-1])
+
+    def read_day(self, day):
+        """單一交易日的完整合約鏈；沒有這一天回傳空表"""
+        day = pd.Timestamp(day)
+        path = os.path.join(self.root, f"date={day:%Y-%m-%d}", "part-0.parquet")
+        if not os.path.exists(path): return pd.DataFrame()
+        df = pq.read_table(path, memory_map=True).to_pandas()
+        df.insert(0, "date", day)
+        return df
+
+    def previous_date(self, day):
+        """day 之前最近的已封存交易日；沒有則 None"""
+        stored = [d for d in self.stored_dates() if d < pd.Timestamp(day).normalize()]
+        return stored[-1] if stored else None
+
+    def history(self, start=None, end=None, columns=None):
+        """start ~ end 之間的日線 (分區過濾，不掃描範圍外的檔案)"""
+        expr = None
+        if start is not None: expr = ds.field("date") >= pd.Timestamp(start).date()
+        if end is not None:
+            cond = ds.field("date") <= pd.Timestamp(end).date()
+            expr = cond if expr is None else expr & cond
+        return self._read(expr, columns)
@@ -0,0 +1,55 @@
+"""
+並行預抓：互不相依的 FinMind 請求同時發出，各自逾時、各自退回預設值
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, NamedTuple
+
+
+class FetchResult(NamedTuple):
+    name: str
+    value: Any
+    ok: bool
+    seconds: float
+    error: str = ""
+
+
+def prefetch(jobs, timeout=10.0, fallbacks=None, wrap=None):
+    """
+    jobs: {名稱: callable 或 (callable, 個別逾時秒數)}
+    fallbacks: {名稱: 失敗或逾時時回傳的值}
+    wrap: 在工作執行緒內包住 callable (app 用來掛上 Streamlit 的 ScriptRunContext)
+    回傳 {名稱: FetchResult}；總耗時約等於最慢的那一個，而不是全部相加
+    逾時的工作不會被取消，會在背景跑完 (結果丟棄)，下一次 rerun 通常就命中快取
+    """
+    fallbacks = fallbacks or {}
+    specs = {name: job if isinstance(job, tuple) else (job, timeout) for name, job in jobs.items()}
+    pool = ThreadPoolExecutor(max_workers=max(1, len(specs)), thread_name_prefix="prefetch")
+    t0 = time.perf_counter()
+    started, finished = {}, {}
+
+    def _run(name, fn):
+        started[name] = time.perf_counter()
+        try:
+            return (wrap(fn) if wrap else fn)()
+        finally:
+            finished[name] = time.perf_counter()
+
+    futures = {name: pool.submit(_run, name, fn) for name, (fn, _) in specs.items()}
+    results = {}
+    try:
+        for name in sorted(specs, key=lambda n: specs[n][1]):
+            fut, limit = futures[name], specs[name][1]
+            remaining = max(0.0, t0 + limit - time.perf_counter())
+            try:
+                value = fut.result(timeout=remaining)
+                results[name] = FetchResult(name, value, True, finished[name] - started[name])
+            except TimeoutError:
+                results[name] = FetchResult(name, fallbacks.get(name), False, time.perf_counter() - t0, "timeout")
+            except Exception as e:
+                elapsed = finished.get(name, time.perf_counter()) - started.get(name, t0)
+                results[name] = FetchResult(name, fallbacks.get(name), False, elapsed, f"{type(e).__name__}: {e}"[:120])
+    finally:
+        pool.shutdown(wait=False)
+    return {name: results[name] for name in specs}
@@ -0,0 +1,104 @@
+"""
+Black-Scholes 陣列定價核心：一次廣播算出整條鏈的價格與 Greeks
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+from scipy.special import ndtr
+
+_INV_SQRT_2PI = 1.0 / np.sqrt(2.0 * np.pi)
+TXO_MULTIPLIER = 50  # 台指選擇權每點 50 元
+
+
+class Greeks(NamedTuple):
+    price: np.ndarray
+    delta: np.ndarray
+    gamma: np.ndarray
+    vega: np.ndarray   # 每 1.00 波動度 (100%) 的價格變化
+    theta: np.ndarray  # 每年的時間價值變化 (除以 365 即每日)
+    rho: np.ndarray    # 每 1.00 利率的價格變化
+    valid: np.ndarray  # True = 正常 BS 定價；False = 已到期或輸入無效
+
+
+def bs_greeks(S, K, T, r, sigma, is_call):
+    """
+    S/K/T/sigma/is_call 皆可為純量或可廣播的陣列，is_call 為布林遮罩 (True=CALL)
+    到期 (T<=0) 的合約回傳內含價值與 ±1/0 的 Delta，其餘 Greeks 為 0；
+    S/K/sigma 非正數或非有限值則全部為 NaN，一律以 valid 遮罩標示，不拋例外
+    """
+    S, K, T, sigma, is_call = np.broadcast_arrays(
+        np.asarray(S, dtype=float), np.asarray(K, dtype=float), np.asarray(T, dtype=float),
+        np.asarray(sigma, dtype=float), np.asarray(is_call, dtype=bool))
+    r = float(r)
+
+    inputs_ok = np.isfinite(S) & np.isfinite(K) & np.isfinite(T) & np.isfinite(sigma) & (S > 0) & (K > 0)
+    valid = inputs_ok & (T > 0) & (sigma > 0)
+    expired = inputs_ok & (T <= 0)
+
+    # 無效位置先填安全值，算完再用遮罩蓋回，避免 log(0) / 除以 0 的警告
+    S_ = np.where(valid, S, 1.0)
+    K_ = np.where(valid, K, 1.0)
+    T_ = np.where(valid, T, 1.0)
+    v_ = np.where(valid, sigma, 1.0)
+
+    sqrt_T = np.sqrt(T_)
+    vol_sqrt_T = v_ * sqrt_T
+    d1 = (np.log(S_ / K_) + (r + 0.5 * v_**2) * T_) / vol_sqrt_T
+    d2 = d1 - vol_sqrt_T
+    pdf_d1 = np.exp(-0.5 * d1**2) * _INV_SQRT_2PI
+    cdf_d1, cdf_d2 = ndtr(d1), ndtr(d2)
+    disc_K = K_ * np.exp(-r * T_)
+
+    call_price = S_ * cdf_d1 - disc_K * cdf_d2
+    price = np.where(is_call, call_price, call_price - S_ + disc_K)  # put-call parity
+    delta = np.where(is_call, cdf_d1, cdf_d1 - 1.0)
+    gamma = pdf_d1 / (S_ * vol_sqrt_T)
+    vega = S_ * pdf_d1 * sqrt_T
+    theta_common = -S_ * pdf_d1 * v_ / (2.0 * sqrt_T)
+    theta = np.where(is_call, theta_common - r * disc_K * cdf_d2, theta_common + r * disc_K * (1.0 - cdf_d2))
+    rho = np.where(is_call, T_ * disc_K * cdf_d2, -T_ * disc_K * (1.0 - cdf_d2))
+
+    intrinsic = np.where(is_call, np.maximum(S - K, 0.0), np.maximum(K - S, 0.0))
+    step_delta = np.where(is_call, (S > K).astype(float), -(S < K).astype(float))
+
+    def _mask(x, at_expiry):
+        return np.where(valid, x, np.where(expired, at_expiry, np.nan))
+
+    return Greeks(
+        price=_mask(price, intrinsic), delta=_mask(delta, step_delta),
+        gamma=_mask(gamma, 0.0), vega=_mask(vega, 0.0),
+        theta=_mask(theta, 0.0), rho=_mask(rho, 0.0), valid=valid,
+    )
+
+
+def bs_price(S, K, T, r, sigma, is_call):
+    """
+    只要價格時的快速版 (策略損益網格用)：輸入不先展開，與 S 無關的項在小陣列上算好再廣播
+    S/K 須為正數 (不做 valid 檢查)；T<=0 或 sigma<=0 回傳內含價值
+    """
+    S, K, T, sigma = (np.asarray(x, dtype=float) for x in (S, K, T, sigma))
+    is_call = np.asarray(is_call, dtype=bool)
+    r = float(r)
+    live = (T > 0) & (sigma > 0)
+    T_ = np.where(live, T, 1.0)
+    v_ = np.where(live, sigma, 1.0)
+    vol_sqrt_T = v_ * np.sqrt(T_)
+    shift = np.log(K) - (r + 0.5 * v_**2) * T_
+    disc_K = K * np.exp(-r * T_)
+    d1 = (np.log(S) - shift) / vol_sqrt_T
+    call = S * ndtr(d1) - disc_K * ndtr(d1 - vol_sqrt_T)
+    price = np.where(is_call, call, call - S + disc_K)
+    intrinsic = np.where(is_call, np.maximum(S - K, 0.0), np.maximum(K - S, 0.0))
+    return np.where(live, price, intrinsic)
+
+
+def bs_price_delta(S, K, T, r, sigma, cp):
+    """單筆相容介面 (cp = "CALL"/"PUT")，回傳 (價格, Delta)；整條鏈請直接呼叫 bs_greeks"""
+    g = bs_greeks(S, K, T, r, sigma, cp == "CALL")
+    if not g.valid: return 0.0, 0.5
+    return float(g.price), float(g.delta)
+
+
+def calculate_win_rate(delta, days):
+    return min(max((abs(delta)*0.7 + 0.8*0.3)*100, 1), 99)
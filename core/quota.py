@@ -0,0 +1,104 @@
+"""
+每日回測額度：以 (email, 交易日) 為鍵存在本機 SQLite (WAL)，前面一層 LRU 讓查詢不碰磁碟
+扣額度是一條 SQL 的原子「檢查 + 加一」，多個 session / 多個行程同時按也不會超扣
+"""
+
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+TAIPEI = timezone(timedelta(hours=8))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS quota (
+    email TEXT NOT NULL,
+    day TEXT NOT NULL,
+    used INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (email, day)
+) WITHOUT ROWID
+"""
+
+
+def trading_day(now=None):
+    """額度以台北時間的日期計 (雲端主機多半是 UTC，不能用本機日期)"""
+    now = now or datetime.now(TAIPEI)
+    return now.astimezone(TAIPEI).date().isoformat()
+
+
+class QuotaStore:
+    """
+    path: SQLite 檔；limit: 每日次數；on_change(email, day, used): 扣 / 退額度後呼叫 (例如丟進 write-behind 佇列同步 vips)
+    remaining() 命中 LRU 是一次 dict 查詢；LRU 只是這個行程看到的值，真正的扣額度永遠以 SQLite 為準
+    """
+
+    def __init__(self, path, limit=3, cache_size=4096, on_change=None):
+        self.path = path
+        self.limit = limit
+        self.cache_size = cache_size
+        self.on_change = on_change
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._conn().execute(_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key, used):
+        with self._lock:
+            self._cache[key] = used
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def used(self, email, day=None):
+        key = (email.strip().lower(), day or trading_day())
+        with self._lock:
+            used = self._cache.get(key)
+            if used is not None:
+                self._cache.move_to_end(key)
+                return used
+        row = self._conn().execute("SELECT used FROM quota WHERE email = ? AND day = ?", key).fetchone()
+        used = row[0] if row else 0
+        self._remember(key, used)
+        return used
+
+    def remaining(self, email, day=None):
+        return max(self.limit - self.used(email, day), 0)
+
+    def try_consume(self, email, day=None):
+        """原子扣一次：回傳 (成功與否, 剩餘次數)；LRU 已知用完時不碰磁碟直接拒絕"""
+        key = (email.strip().lower(), day or trading_day())
+        with self._lock:
+            if self._cache.get(key, 0) >= self.limit: return False, 0
+        row = self._conn().execute(
+            "INSERT INTO quota (email, day, used) VALUES (?, ?, 1) "
+            "ON CONFLICT (email, day) DO UPDATE SET used = used + 1 WHERE used < ? RETURNING used",
+            (*key, self.limit)).fetchone()
+        if row is None:  # 已達上限 (可能是別的行程扣的)
+            self._remember(key, self.limit)
+            return False, 0
+        self._remember(key, row[0])
+        if self.on_change is not None: self.on_change(*key, row[0])
+        return True, self.limit - row[0]
+
+    def refund(self, email, day=None):
+        """回測失敗時退回一次"""
+        key = (email.strip().lower(), day or trading_day())
+        row = self._conn().execute(
+            "UPDATE quota SET used = used - 1 WHERE email = ? AND day = ? AND used > 0 RETURNING used", key).fetchone()
+        if row is None: return
+        self._remember(key, row[0])
+        if self.on_change is not None: self.on_change(*key, row[0])
+
+    def purge(self, keep_days=7):
+        """刪掉 keep_days 天以前的紀錄"""
+        cutoff = (datetime.now(TAIPEI) - timedelta(days=keep_days)).date().isoformat()
+        self._conn().execute("DELETE FROM quota WHERE day < ?", (cutoff,))
@@ -0,0 +1,351 @@
+"""
+盤中串流模式：非同步讀報價來源 → 環形緩衝存最近的逐筆 → 只重算輸入有變的合約槓桿 → 依固定節奏發布快照給 UI
+來源可替換：ReplaySource 讀本機回放檔 (測試 / 展示)，QueueSource 給券商行情 API 的 callback 塞報價
+"""
+
+import asyncio
+import json
+import threading
+import time
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from core.pricing import bs_greeks
+from core.scanner import calculate_raw_score_array, contract_days_to_expiry, micro_expand_scores_array
+
+INDEX_SYMBOL = "TAIEX"
+
+
+class Quote(NamedTuple):
+    ts: float          # epoch 秒
+    symbol: str        # "TAIEX" 或 option_symbol(...)
+    price: float
+    volume: float = 0.0
+
+
+def option_symbol(contract_date, call_put, strike):
+    """TXO + 月份 + C/P + 履約價，例如 TXO202611C23000"""
+    return f"TXO{contract_date}{'C' if str(call_put).upper().strip() == 'CALL' else 'P'}{int(round(float(strike)))}"
+
+
+# ── 來源 ──────────────────────────────────────────────────────────────────────
+class ReplaySource:
+    """
+    回放檔：每行一筆 JSON {"ts", "symbol", "price", "volume"}，依 ts 排序
+    speed: 1 = 照原始間隔、10 = 十倍速、0 = 不等待 (測速用)
+    """
+
+    def __init__(self, path, speed=1.0):
+        self.path = path
+        self.speed = speed
+
+    async def stream(self):
+        t_first = wall_first = None
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip(): continue
+                row = json.loads(line)
+                q = Quote(float(row["ts"]), row["symbol"], float(row["price"]), float(row.get("volume", 0.0)))
+                if self.speed > 0:
+                    if t_first is None: t_first, wall_first = q.ts, time.monotonic()
+                    wait = wall_first + (q.ts - t_first) / self.speed - time.monotonic()
+                    if wait > 0: await asyncio.sleep(wait)
+                yield q
+
+
+class QueueSource:
+    """
+    給其他執行緒 (券商 SDK 的 callback) 推報價：push() 執行緒安全，stream() 在串流的事件迴圈裡讀
+    事件迴圈還沒起來前 push 的先暫存；close() 後串流結束
+    """
+
+    _CLOSED = object()
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = []
+        self._loop = self._queue = None
+
+    def push(self, quote):
+        with self._lock:
+            if self._loop is None:
+                self._pending.append(quote)
+                return
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, quote)
+
+    def close(self):
+        self.push(self._CLOSED)
+
+    async def stream(self):
+        with self._lock:
+            self._loop, self._queue = asyncio.get_running_loop(), asyncio.Queue()
+            for q in self._pending: self._queue.put_nowait(q)
+            self._pending.clear()
+        while True:
+            q = await self._queue.get()
+            if q is self._CLOSED: return
+            yield q
+
+
+# ── 環形緩衝 ──────────────────────────────────────────────────────────────────
+class QuoteRing:
+    """
+    最近 capacity 筆逐筆報價 (固定記憶體的 NumPy 陣列)；symbol 轉成整數編號存
+    另外每檔保留最後一筆 (latest)，環形緩衝被蓋過也不會遺失，重新 seed 時整份套回去
+    """
+
+    def __init__(self, capacity=65536):
+        self.capacity = capacity
+        self.ts = np.zeros(capacity)
+        self.sym = np.zeros(capacity, dtype=np.int32)
+        self.price = np.zeros(capacity)
+        self.volume = np.zeros(capacity)
+        self.count = 0
+        self._ids = {}
+        self._names = []
+        self._latest = {}
+
+    def append(self, q):
+        sid = self._ids.get(q.symbol)
+        if sid is None:
+            sid = self._ids[q.symbol] = len(self._names)
+            self._names.append(q.symbol)
+        i = self.count % self.capacity
+        self.ts[i], self.sym[i], self.price[i], self.volume[i] = q.ts, sid, q.price, q.volume
+        self.count += 1
+        self._latest[q.symbol] = q
+
+    def latest(self, since=None):
+        """每檔最後一筆報價 (含指數)；給 since (epoch 秒) 只取之後的"""
+        return [q for q in self._latest.values() if since is None or q.ts >= since]
+
+    def tail(self, n=100, symbol=None):
+        """最近 n 筆 (舊 → 新)；給 symbol 只取該檔"""
+        size = min(self.count, self.capacity)
+        idx = (np.arange(self.count - size, self.count) % self.capacity)
+        if symbol is not None:
+            sid = self._ids.get(symbol)
+            idx = idx[self.sym[idx] == sid] if sid is not None else idx[:0]
+        idx = idx[-n:]
+        names = np.asarray(self._names, dtype=object)
+        return pd.DataFrame({"ts": pd.to_datetime(self.ts[idx], unit="s"), "symbol": names[self.sym[idx]] if len(idx) else [],
+                             "price": self.price[idx], "volume": self.volume[idx]})
+
+
+# ── 增量重算 ──────────────────────────────────────────────────────────────────
+class LiveSnapshot(NamedTuple):
+    """發布給 UI 的不可變快照：version 每次發布加一；陣列與 LiveRepricer 的合約順序相同"""
+    version: int
+    ts: float
+    S: float
+    close: np.ndarray
+    delta: np.ndarray
+    lev: np.ndarray
+    updated: np.ndarray     # 每檔最後一筆盤中報價的時間 (NaN = 還是收盤價)
+    contract: np.ndarray
+    strike: np.ndarray
+    is_call: np.ndarray
+    days: np.ndarray
+    volume: np.ndarray      # 收盤鏈的成交量 (raw_score 用，同掃描)
+
+    def rank(self, target_lev, op_type="CALL", top=15):
+        """
+        即時槓桿最接近 target_lev 的合約 (同掃描的基本門檻：|Delta| ≥ 0.1、權利金 > 0.5)
+        勝率同掃描：用即時 Delta 算 raw_score，各月份組內依名次微觀展開 (micro_expand_scores_array)
+        """
+        ok = (self.is_call == (op_type == "CALL")) & (np.abs(self.delta) >= 0.1) & (self.close > 0.5) & np.isfinite(self.lev)
+        rows = np.flatnonzero(ok)
+        raw = calculate_raw_score_array(self.delta[rows], self.days[rows], self.volume[rows], self.S, self.strike[rows], op_type)
+        win = np.empty(len(rows))
+        for con in np.unique(self.contract[rows]):
+            part = np.flatnonzero(self.contract[rows] == con)
+            order, w = micro_expand_scores_array(raw[part])
+            win[part[order]] = w
+        best = np.lexsort((self.strike[rows], np.abs(self.lev[rows] - target_lev)))[:top]
+        rows, win = rows[best], win[best]
+        return pd.DataFrame({
+            "合約": self.contract[rows], "履約價": self.strike[rows].astype(int), "類型": op_type,
+            "價格": self.close[rows], "槓桿": self.lev[rows], "Delta": self.delta[rows].round(3),
+            "天數": self.days[rows].astype(int),
+            "勝率": win,
+            "即時": np.isfinite(self.updated[rows]),
+        })
+
+
+class LiveRepricer:
+    """
+    以收盤的合約鏈 (+ 各合約 iv) 起算，盤中報價進來只標記：
+    選擇權成交只改該檔價格 → 只重算那幾檔的槓桿；指數跳動 → Delta 全部重算 (每檔輸入都變了)
+    reprice() 才真的算，兩次發布之間的多筆報價合併成一次
+    """
+
+    def __init__(self, chain, S, as_of, sigma=0.2, r=0.02):
+        cp = chain["call_put"].astype(str).str.upper().str.strip().to_numpy()
+        days = contract_days_to_expiry(chain["contract_date"].astype(str).to_numpy(), as_of)
+        strike = pd.to_numeric(chain["strike_price"], errors="coerce").to_numpy(dtype=float)
+        keep = np.isin(cp, ["CALL", "PUT"]) & np.isfinite(days) & np.isfinite(strike)
+        self.contract = chain["contract_date"].astype(str).to_numpy()[keep]
+        self.strike = strike[keep]
+        self.is_call = cp[keep] == "CALL"
+        self.days = days[keep]
+        self.sigma = np.broadcast_to(np.asarray(sigma, dtype=float), strike.shape)[keep].copy()
+        self.close = pd.to_numeric(chain["close"], errors="coerce").to_numpy(dtype=float)[keep].copy()
+        self.volume = pd.to_numeric(chain["volume"], errors="coerce").fillna(0).to_numpy(dtype=float)[keep]
+        self.r = r
+        self.S = float(S)
+        # 收盤資料日隔天 0 點 (台北) 之後的盤中報價才比這份收盤價新
+        self.fresh_after = (pd.Timestamp(as_of).normalize() + pd.Timedelta(days=1)).tz_localize("Asia/Taipei").timestamp()
+        self.symbols = {option_symbol(c, "CALL" if k else "PUT", s): i
+                        for i, (c, k, s) in enumerate(zip(self.contract, self.is_call, self.strike))}
+        n = len(self.strike)
+        self.delta = np.zeros(n)
+        self.lev = np.full(n, np.nan)
+        self.updated = np.full(n, np.nan)
+        self._dirty = np.zeros(n, dtype=bool)
+        self._full = True
+        self.repriced_rows = 0
+        self.reprice()
+
+    def on_quote(self, q):
+        """回傳 True 表示這筆報價有對應到 (指數或鏈上的合約)"""
+        if q.symbol == INDEX_SYMBOL:
+            if q.price > 0 and q.price != self.S:
+                self.S = q.price
+                self._full = True
+            return True
+        i = self.symbols.get(q.symbol)
+        if i is None: return False
+        self.close[i] = q.price
+        self.updated[i] = q.ts
+        self._dirty[i] = True
+        return True
+
+    def reprice(self):
+        """回傳這次重算的合約數"""
+        if self._full:
+            g = bs_greeks(self.S, self.strike, self.days / 365.0, self.r, self.sigma, self.is_call)
+            self.delta = np.where(g.valid, g.delta, 0.5)
+            rows = slice(None)
+            n = len(self.strike)
+        else:
+            rows = np.flatnonzero(self._dirty)
+            n = len(rows)
+            if not n: return 0
+        close = self.close[rows]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.lev[rows] = np.where(close > 0, np.abs(self.delta[rows]) * self.S / close, np.nan)
+        self._dirty[:] = False
+        self._full = False
+        self.repriced_rows += n
+        return n
+
+    def snapshot(self, version, ts):
+        return LiveSnapshot(version, ts, self.S, self.close.copy(), self.delta.copy(), self.lev.copy(), self.updated.copy(),
+                            self.contract, self.strike, self.is_call, self.days, self.volume)
+
+
+# ── 串流 ──────────────────────────────────────────────────────────────────────
+class QuoteStreamer:
+    """
+    背景執行緒跑一個 asyncio 迴圈：一個 task 消化來源，另一個每 push_interval 秒重算 + 發布一次快照
+    UI 用 snapshot() 讀最新發布的版本 (st.fragment(run_every=...) 輪詢記憶體，不必整頁重跑)
+    seed(version, build)：資料快照換了才用 build() 重建 LiveRepricer，盤中已收到的指數與各合約最新報價會套回去
+    """
+
+    def __init__(self, source, push_interval=1.0, capacity=65536):
+        self.source = source
+        self.push_interval = push_interval
+        self.ring = QuoteRing(capacity)
+        self._lock = threading.Lock()
+        self._repricer = None
+        self._seed_version = None
+        self._snapshot = None
+        self._version = 0
+        self._pending = False
+        self._last_push = 0.0
+        self._thread = None
+        self._loop = None
+        self._tasks = ()
+        self.done = threading.Event()
+        self._stats = {"ticks": 0, "unmatched": 0, "pushes": 0, "repriced_rows": 0, "errors": 0}
+        self.last_error = ""
+
+    def seed(self, version, build):
+        with self._lock:
+            if version == self._seed_version: return
+        repricer = build()
+        with self._lock:
+            # 盤中已收到、且比新收盤資料新的報價 (指數 + 每檔選擇權最後一筆) 全部套回去，不必等每檔再成交一次
+            for q in self.ring.latest(since=repricer.fresh_after): repricer.on_quote(q)
+            repricer.reprice()
+            self._repricer, self._seed_version = repricer, version
+            self._publish()
+        self.start()
+
+    def start(self):
+        if self._thread is not None: return
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._run()), name="quote-stream", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        if self._loop is not None:
+            for task in self._tasks: self._loop.call_soon_threadsafe(task.cancel)
+        if self._thread is not None: self._thread.join(timeout)
+
+    async def _run(self):
+        self._loop = asyncio.get_running_loop()
+        consume = asyncio.create_task(self._consume())
+        push = asyncio.create_task(self._push_loop())
+        self._tasks = (consume, push)
+        try:
+            await consume
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            self._stats["errors"] += 1
+            self.last_error = f"{type(e).__name__}: {e}"[:200]
+        finally:
+            push.cancel()
+            with self._lock:
+                if self._pending: self._publish()
+            self.done.set()
+
+    async def _consume(self):
+        async for q in self.source.stream():
+            with self._lock:
+                self.ring.append(q)
+                self._stats["ticks"] += 1
+                if self._repricer is not None and not self._repricer.on_quote(q): self._stats["unmatched"] += 1
+                self._pending = True
+                # 報價密集時 (或來源不讓出事件迴圈) 在這裡照節奏發布；安靜時交給 _push_loop 補發
+                if time.monotonic() - self._last_push >= self.push_interval: self._publish()
+
+    async def _push_loop(self):
+        while True:
+            await asyncio.sleep(max(self._last_push + self.push_interval - time.monotonic(), 0.01))
+            with self._lock:
+                if self._pending and time.monotonic() - self._last_push >= self.push_interval: self._publish()
+
+    def _publish(self):
+        # 呼叫端持有 _lock
+        if self._repricer is None: return
+        self._stats["repriced_rows"] += self._repricer.reprice()
+        self._version += 1
+        self._snapshot = self._repricer.snapshot(self._version, time.time())
+        self._stats["pushes"] += 1
+        self._pending = False
+        self._last_push = time.monotonic()
+
+    def snapshot(self):
+        """最新發布的 LiveSnapshot (還沒 seed 時為 None)"""
+        return self._snapshot
+
+    def tail(self, n=100, symbol=None):
+        with self._lock:
+            return self.ring.tail(n, symbol)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
@@ -0,0 +1,46 @@
+"""
+畫面衍生物的記憶化：以 (快照版本, 名稱, 元件參數) 為鍵，存整理好的顯示用 DataFrame 與 Plotly Figure
+重跑時參數沒變就直接拿現成物件，不再逐格格式化、重建圖表
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class RenderCache:
+    """
+    get(name, version, params, build)：version 是資料快照版本 (資料日期、列數…)，params 是影響畫面的元件值
+    鍵要可雜湊 (數字 / 字串 / tuple)；回傳的物件跨 session 共用，呼叫端請勿原地修改
+    執行緒安全；build 在鎖外執行，兩個 session 同時未命中頂多各算一次
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._store = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name, version, params, build):
+        key = (name, version, params)
+        with self._lock:
+            if key in self._store:
+                self._store.move_to_end(key)
+                self.hits += 1
+                return self._store[key]
+            self.misses += 1
+        value = build()
+        with self._lock:
+            self._store[key] = value
+            self._store.move_to_end(key)
+            while len(self._store) > self.maxsize:
+                self._store.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._store.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._store)}
@@ -0,0 +1,228 @@
+"""
+智慧掃描索引：每份 get_data 快照只正規化、定價、評分一次，之後任何目標槓桿的掃描都只是查表 + top-k
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from core.pricing import bs_greeks
+from core.scanner import SCAN_COLUMNS, calculate_raw_score_array, contract_days_to_expiry
+
+
+class ContractSlice(NamedTuple):
+    """單一 (月份, 買賣權) 依履約價排序的陣列；與目標槓桿無關的欄位全部先算好"""
+    strike: np.ndarray
+    volume: np.ndarray
+    close: np.ndarray
+    delta: np.ndarray
+    traded: np.ndarray
+    raw: np.ndarray          # raw_score (與目標槓桿無關)
+    base_ok: np.ndarray      # 與目標槓桿無關的篩選條件
+    lev_traded: np.ndarray   # 有成交者的槓桿 = |Delta| × S / 收盤價
+    order: np.ndarray        # raw_score 由高到低 (同分依原始列順序，同 scan_chain 的穩定排序)
+    cap_sorted: np.ndarray   # 沒成交者：合理價 > 0.5 ⇔ 目標槓桿 < |Delta| × S / 0.5，遞增排序供 searchsorted
+    cap_rows: np.ndarray     # cap_sorted 對應的列
+    days: int
+
+
+class ScanIndex:
+    """
+    chain: get_data 回傳的單日 TXO 合約；sigma: 與 chain 等長的波動度 (chain_sigma 的結果) 或純量
+    call_put / contract_date 轉成類別，字串處理只做在唯一值上；每組合約依履約價排序存成 NumPy 陣列
+    scan() 的結果與 scan_chain(...).head(top) 完全相同；scan_all() 一次掃全部月份 × 買賣權並全域排名
+    """
+
+    def __init__(self, chain, S, as_of, sigma=0.2, r=0.02):
+        self.S = float(S)
+        self.as_of = pd.Timestamp(as_of).normalize()
+        self.groups = {}
+        self._flat = None
+        if chain.empty: return
+
+        cp = chain["call_put"].astype("category")
+        con = chain["contract_date"].astype("category")
+        cp_names = cp.cat.categories.astype(str).str.upper().str.strip().to_numpy()
+        con_names = con.cat.categories.astype(str).to_numpy()
+        con_days = contract_days_to_expiry(con_names, self.as_of)
+        cp_codes, con_codes = cp.cat.codes.to_numpy(), con.cat.codes.to_numpy()
+
+        strike = pd.to_numeric(chain["strike_price"], errors="coerce").to_numpy(dtype=float)
+        volume = pd.to_numeric(chain["volume"], errors="coerce").to_numpy(dtype=float)
+        close = pd.to_numeric(chain["close"], errors="coerce").to_numpy(dtype=float)
+        sigma = np.broadcast_to(np.asarray(sigma, dtype=float), strike.shape)
+
+        keep = (cp_codes >= 0) & (con_codes >= 0)
+        keep[keep] = np.isin(cp_names[cp_codes[keep]], ["CALL", "PUT"]) & np.isfinite(con_days[con_codes[keep]])
+        rows = np.flatnonzero(keep)
+        group = con_codes[rows].astype(np.int64) * len(cp_names) + cp_codes[rows]
+        rows = rows[np.lexsort((strike[rows], group))]        # 先分組、組內依履約價
+        group = con_codes[rows].astype(np.int64) * len(cp_names) + cp_codes[rows]
+        bounds = np.flatnonzero(np.diff(group)) + 1
+
+        for part in np.split(rows, bounds):
+            if part.size == 0: continue
+            part_orig = np.sort(part)                           # 原始列順序 (排名同分時的次序)
+            op_type = cp_names[cp_codes[part[0]]]
+            days = int(con_days[con_codes[part[0]]])
+            self.groups[(con_names[con_codes[part[0]]], op_type)] = self._build(
+                part, part_orig, strike, volume, close, sigma, days, op_type, r)
+
+    def _build(self, part, part_orig, strike, volume, close, sigma, days, op_type, r):
+        S = self.S
+        K, vol, px = strike[part], volume[part], close[part]
+        g = bs_greeks(S, K, days / 365.0, r, sigma[part], op_type == "CALL")
+        delta = np.where(g.valid, g.delta, 0.5)
+        abs_delta = np.abs(delta)
+        traded = vol > 0
+        base_ok = np.isfinite(K) & (K > 0) & np.isfinite(vol) & np.isfinite(px) & (abs_delta >= 0.1)
+        base_ok &= ~traded | (px > 0.5)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            lev_traded = np.where(traded, abs_delta * S / px, np.nan)
+        raw = calculate_raw_score_array(delta, days, vol, S, K, op_type)
+
+        orig_pos = np.searchsorted(part_orig, part)             # 每列在原始順序中的位置
+        order = np.lexsort((orig_pos, -np.where(base_ok, raw, -np.inf)))
+        untraded = np.flatnonzero(base_ok & ~traded)
+        cap = abs_delta[untraded] * S / 0.5
+        by_cap = np.argsort(cap, kind="stable")
+        return ContractSlice(K, vol, px, delta, traded, raw, base_ok, lev_traded, order,
+                             cap[by_cap], untraded[by_cap], days)
+
+    def contracts(self, op_type):
+        """可掃描的月份 (遞增)"""
+        return sorted(con for con, cp in self.groups if cp == op_type)
+
+    def scan(self, contract_date, op_type, target_lev, top=15):
+        g = self.groups.get((str(contract_date), op_type))
+        if g is None: return pd.DataFrame(columns=SCAN_COLUMNS)
+        S = self.S
+
+        # 1) 篩選：有成交者固定；沒成交者只有 cap > 目標槓桿 的那一段 (searchsorted)
+        ok = g.base_ok & g.traded
+        ok[g.cap_rows[np.searchsorted(g.cap_sorted, target_lev, side="right"):]] = True
+        ranked = g.order[ok[g.order]]                          # raw_score 名次
+        n = len(ranked)
+        if n == 0: return pd.DataFrame(columns=SCAN_COLUMNS)
+
+        # 2) 微觀勝率 (同 micro_expand_scores_array)
+        i = np.arange(n, dtype=float)
+        top_n = max(1, int(n * 0.4))
+        remain = n - top_n
+        win = np.where(i < top_n, 95.0 - (i / (top_n - 1) * 5.0) if top_n > 1 else 95.0,
+                       85.0 - ((i - top_n) / (remain - 1) * 70.0) if remain > 1 else 15.0)
+        win = np.round(win, 1)
+
+        # 3) 槓桿與差距：沒成交者以合理價計 (槓桿 ≈ 目標)
+        abs_delta = np.abs(g.delta[ranked])
+        traded = g.traded[ranked]
+        price = np.where(traded, g.close[ranked], (abs_delta * S) / target_lev)
+        leverage = np.where(traded, g.lev_traded[ranked], (abs_delta * S) / price)
+        gap = np.abs(leverage - target_lev)
+
+        # 4) top-k：np.partition 找第 k 小的差距，只留不超過它的候選 (含邊界同值)，只對候選做 (差距, -勝率) 排序
+        if n > top:
+            kth = np.partition(gap, top - 1)[top - 1]
+            cand = np.flatnonzero(gap <= kth)
+        else:
+            cand = np.arange(n)
+        cand = cand[np.lexsort((-win[cand], gap[cand]))][:top]
+
+        rows = ranked[cand]
+        return pd.DataFrame({
+            "履約價": g.strike[rows].astype(int), "價格": np.round(price[cand], 1),
+            "狀態": np.where(traded[cand], "🟢成交", "🔵合理價"),
+            "槓桿": leverage[cand], "Delta": np.round(g.delta[rows], 3),
+            "raw_score": g.raw[rows], "Vol": g.volume[rows].astype(int),
+            "差距": gap[cand], "合約": str(contract_date), "類型": op_type,
+            "天數": g.days, "勝率": win[cand],
+        }, columns=SCAN_COLUMNS)
+
+    def _flatten(self):
+        """全部切片串成一條陣列 (第一次 scan_all 時建立)；order 依組別分段、組內依 raw_score 名次"""
+        if self._flat is None:
+            keys = list(self.groups)
+            gs = [self.groups[k] for k in keys]
+            sizes = np.array([len(g.strike) for g in gs], dtype=np.int64)
+            offset = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+            cat = lambda field: np.concatenate([getattr(g, field) for g in gs])
+            delta = cat("delta")
+            self._flat = {
+                "keys": keys, "strike": cat("strike"), "volume": cat("volume"), "close": cat("close"),
+                "delta": delta, "traded": cat("traded"), "raw": cat("raw"), "base_ok": cat("base_ok"),
+                "lev_traded": cat("lev_traded"), "cap": np.abs(delta) * self.S / 0.5,
+                "gid": np.repeat(np.arange(len(gs)), sizes),
+                "order": np.concatenate([g.order + o for g, o in zip(gs, offset)]),
+                "days": np.array([g.days for g in gs], dtype=np.int64),
+                "con": np.array([k[0] for k in keys], dtype=object), "cp": np.array([k[1] for k in keys], dtype=object),
+            }
+        return self._flat
+
+    def scan_all(self, target_lev, top=15, op_types=("CALL", "PUT"), contracts=None):
+        """
+        全部月份 × 買賣權一次掃：每組各自算勝率 (同 scan)，再依 (差距, -勝率, -天數) 全域排名取前 top
+        結果等於把每組 scan(..., top=全部) 串起來再排序，但只有一次向量化計算，不逐組呼叫
+        """
+        if not self.groups: return pd.DataFrame(columns=SCAN_COLUMNS)
+        f = self._flatten()
+        S = self.S
+        use = np.array([cp in op_types and (contracts is None or con in contracts) for con, cp in f["keys"]])
+
+        # 1) 篩選：有成交者固定；沒成交者合理價 > 0.5 ⇔ cap > 目標槓桿
+        ok = f["base_ok"] & (f["traded"] | (f["cap"] > target_lev)) & use[f["gid"]]
+        ranked = f["order"][ok[f["order"]]]                     # 組別分段、組內 raw_score 名次
+        if len(ranked) == 0: return pd.DataFrame(columns=SCAN_COLUMNS)
+
+        # 2) 組內名次與微觀勝率 (同 micro_expand_scores_array，每組各自的 n)
+        gid = f["gid"][ranked]
+        n_g = np.bincount(gid, minlength=len(f["keys"]))
+        start = np.cumsum(n_g) - n_g
+        i = np.arange(len(ranked)) - start[gid]
+        n = n_g[gid]
+        top_n = np.maximum(1, (n * 0.4).astype(np.int64))
+        remain = n - top_n
+        with np.errstate(divide="ignore", invalid="ignore"):
+            win = np.where(i < top_n,
+                           np.where(top_n > 1, 95.0 - (i / (top_n - 1) * 5.0), 95.0),
+                           np.where(remain > 1, 85.0 - ((i - top_n) / (remain - 1) * 70.0), 15.0))
+        win = np.round(win, 1)
+
+        # 3) 槓桿與差距
+        abs_delta = np.abs(f["delta"][ranked])
+        traded = f["traded"][ranked]
+        price = np.where(traded, f["close"][ranked], (abs_delta * S) / target_lev)
+        leverage = np.where(traded, f["lev_traded"][ranked], (abs_delta * S) / price)
+        gap = np.abs(leverage - target_lev)
+        days = f["days"][gid]
+
+        # 4) 全域 top-k
+        if len(ranked) > top:
+            kth = np.partition(gap, top - 1)[top - 1]
+            cand = np.flatnonzero(gap <= kth)
+        else:
+            cand = np.arange(len(ranked))
+        cand = cand[np.lexsort((-days[cand], -win[cand], gap[cand]))][:top]
+
+        rows, g = ranked[cand], gid[cand]
+        return pd.DataFrame({
+            "履約價": f["strike"][rows].astype(int), "價格": np.round(price[cand], 1),
+            "狀態": np.where(traded[cand], "🟢成交", "🔵合理價"),
+            "槓桿": leverage[cand], "Delta": np.round(f["delta"][rows], 3),
+            "raw_score": f["raw"][rows], "Vol": f["volume"][rows].astype(int),
+            "差距": gap[cand], "合約": f["con"][g].astype(str), "類型": f["cp"][g].astype(str),
+            "天數": days[cand], "勝率": win[cand],
+        }, columns=SCAN_COLUMNS)
+
+
+def scan_underlyings(indexes, target_lev, top=15, op_types=("CALL", "PUT")):
+    """
+    indexes: {標的名稱: ScanIndex}，每個標的有自己的現貨價；各自 scan_all 取前 top 再合併排名
+    (全域前 top 一定落在各標的的前 top 之內，所以結果與全部攤平一起排完全相同)
+    """
+    parts = [idx.scan_all(target_lev, top, op_types).assign(標的=name) for name, idx in indexes.items()]
+    parts = [p for p in parts if not p.empty]
+    if not parts: return pd.DataFrame(columns=["標的", *SCAN_COLUMNS])
+    out = pd.concat(parts, ignore_index=True)
+    order = np.lexsort((-out["天數"].to_numpy(), -out["勝率"].to_numpy(), out["差距"].to_numpy()))
+    return out.iloc[order[:top]][["標的", *SCAN_COLUMNS]].reset_index(drop=True)
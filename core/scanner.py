@@ -0,0 +1,92 @@
+"""
+槓桿掃描引擎 (向量化版)：取代逐列 iterrows() 的智慧掃描迴圈
+"""
+
+import numpy as np
+import pandas as pd
+
+from core.pricing import bs_greeks
+
+SCAN_COLUMNS = ["履約價", "價格", "狀態", "槓桿", "Delta", "raw_score", "Vol", "差距", "合約", "類型", "天數", "勝率"]
+
+
+def calculate_raw_score_array(delta, days, volume, S, K, op_type):
+    """calculate_raw_score_v191 的陣列版，公式完全相同"""
+    delta = np.asarray(delta, dtype=float)
+    K = np.asarray(K, dtype=float)
+    s_delta = np.abs(delta) * 100.0
+    m = (S - K) / S if op_type == "CALL" else (K - S) / S
+    s_money = np.clip(m * 100 * 2, -10, 10) + 50
+    s_time = np.minimum(np.asarray(days, dtype=float) / 90.0 * 100, 100)
+    s_vol = np.minimum(np.asarray(volume, dtype=float) / 5000.0 * 100, 100)
+    return s_delta * 0.4 + s_money * 0.2 + s_time * 0.2 + s_vol * 0.2
+
+
+def micro_expand_scores_array(raw_score):
+    """micro_expand_scores_v191 的陣列版：回傳 (依 raw_score 由高到低的排序索引, 對應勝率)"""
+    raw_score = np.asarray(raw_score, dtype=float)
+    n = len(raw_score)
+    order = np.argsort(-raw_score, kind="stable")
+    if n == 0: return order, np.empty(0)
+    i = np.arange(n, dtype=float)
+    top_n = max(1, int(n * 0.4))
+    remain = n - top_n
+    top = 95.0 - (i / (top_n - 1) * 5.0) if top_n > 1 else np.full(n, 95.0)
+    rest = 85.0 - ((i - top_n) / (remain - 1) * 70.0) if remain > 1 else np.full(n, 15.0)
+    return order, np.round(np.where(i < top_n, top, rest), 1)
+
+
+def contract_days_to_expiry(contract_date, as_of):
+    """月合約 YYYYMM 以當月 15 日為到期日估算剩餘天數 (至少 1 天)；週選等非 6 碼合約回傳 NaN"""
+    cd = pd.Series(contract_date).astype(str)
+    monthly = cd.str.len().eq(6) & cd.str.isdigit()
+    expiry = pd.to_datetime(cd.where(monthly) + "15", format="%Y%m%d", errors="coerce")
+    days = (expiry - pd.Timestamp(as_of).normalize()).dt.days.to_numpy(dtype=float)
+    return np.where(np.isfinite(days), np.maximum(days, 1), np.nan)
+
+
+def scan_chain(tdf, S, T_years, target_lev, op_type, days_to_exp=None, sigma=0.2, r=0.02):
+    """
+    一次算完整條合約鏈的 Delta / 合理價 / 槓桿 / 分數 / 篩選條件
+    tdf: 已篩好買賣權的 TXO 合約 (需含 strike_price, volume, close, contract_date)
+    T_years / days_to_exp 可為純量 (單一月份) 或與 tdf 等長的陣列 (跨月份)
+    回傳已依 (差距, -勝率, -天數) 排好序的 DataFrame，欄位同舊版 dict
+    """
+    if tdf.empty: return pd.DataFrame(columns=SCAN_COLUMNS)
+    if days_to_exp is None: days_to_exp = np.maximum(np.rint(np.asarray(T_years, dtype=float) * 365), 1)
+
+    strike = pd.to_numeric(tdf["strike_price"], errors="coerce").to_numpy(dtype=float)
+    volume = pd.to_numeric(tdf["volume"], errors="coerce").to_numpy(dtype=float)
+    close = pd.to_numeric(tdf["close"], errors="coerce").to_numpy(dtype=float)
+    contract = tdf["contract_date"].astype(str).to_numpy()
+    sigma = np.broadcast_to(np.asarray(sigma, dtype=float), strike.shape)
+    T_years = np.broadcast_to(np.asarray(T_years, dtype=float), strike.shape)
+    days_to_exp = np.broadcast_to(np.asarray(days_to_exp), strike.shape).astype(int)
+
+    ok = np.isfinite(strike) & (strike > 0) & np.isfinite(volume) & np.isfinite(close)
+    greeks = bs_greeks(S, strike, T_years, r, sigma, op_type == "CALL")
+    delta = np.where(greeks.valid, greeks.delta, 0.5)
+    abs_delta = np.abs(delta)
+
+    bs_price = (abs_delta * S) / target_lev
+    traded = volume > 0
+    price = np.where(traded, close, bs_price)
+    ok &= (price > 0.5) & (abs_delta >= 0.1)
+    if not ok.any(): return pd.DataFrame(columns=SCAN_COLUMNS)
+
+    strike, volume, price, delta, traded, contract = strike[ok], volume[ok], price[ok], delta[ok], traded[ok], contract[ok]
+    days_to_exp = days_to_exp[ok]
+    leverage = (np.abs(delta) * S) / price
+    raw = calculate_raw_score_array(delta, days_to_exp, volume, S, strike, op_type)
+
+    order, win = micro_expand_scores_array(raw)
+    res = pd.DataFrame({
+        "履約價": strike[order].astype(int), "價格": np.round(price[order], 1),
+        "狀態": np.where(traded[order], "🟢成交", "🔵合理價"),
+        "槓桿": leverage[order], "Delta": np.round(delta[order], 3),
+        "raw_score": raw[order], "Vol": volume[order].astype(int),
+        "差距": np.abs(leverage[order] - target_lev),
+        "合約": contract[order], "類型": op_type, "天數": days_to_exp[order], "勝率": win,
+    })
+    final = np.lexsort((-res["天數"].to_numpy(), -res["勝率"].to_numpy(), res["差距"].to_numpy()))
+    return res.iloc[final].reset_index(drop=True)
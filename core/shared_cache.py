@@ -0,0 +1,231 @@
+"""
+跨 session / 跨副本共用的市場資料快取：single-flight 合併同 key 的請求 + stale-while-revalidate
+過期後先回傳上一份好的快照，背景只跑一個刷新；整個叢集對 FinMind 的請求量不隨 session 數增加
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+
+
+# ── 後端：只需要 get / set / add (不存在才寫入，當分散式鎖) / delete，與 redis-py 同名同義 ──────
+class MemoryBackend:
+    """單一行程內共用 (多個 session 同一個 Python 行程)"""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None: return None
+            value, expires = item
+            if expires is not None and expires <= time.time():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = (value, time.time() + ex if ex else None)
+
+    def add(self, key, value, ex=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and (item[1] is None or item[1] > time.time()): return False
+            self._data[key] = (value, time.time() + ex if ex else None)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class DiskBackend:
+    """
+    同一台機器 / 共用磁碟的多個副本共用：一個 key 一個檔案，寫入先寫暫存檔再 os.replace
+    add() 用 O_CREAT|O_EXCL 建鎖檔，逾時 (ex 秒) 的鎖視為持有者已掛掉
+    """
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key, suffix=".pkl"):
+        return os.path.join(self.root, hashlib.sha1(key.encode()).hexdigest() + suffix)
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                expires, value = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        if expires is not None and expires <= time.time(): return None
+        return value
+
+    def set(self, key, value, ex=None):
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump((time.time() + ex if ex else None, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp): os.remove(tmp)
+            raise
+
+    def add(self, key, value, ex=None):
+        path = self._path(key, ".lock")
+        try:
+            if ex and time.time() - os.path.getmtime(path) > ex: os.remove(path)
+        except FileNotFoundError:
+            pass
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            return False
+
+    def delete(self, key):
+        for suffix in (".pkl", ".lock"):
+            try:
+                os.remove(self._path(key, suffix))
+            except FileNotFoundError:
+                pass
+
+
+class RedisBackend:
+    """
+    包住任何 redis-py 相容的 client (多台機器共用)；測試時傳入本地替身即可，不需要真的 Redis
+    from_url() 才 import redis，沒設定 Redis 的部署不需要安裝
+    """
+
+    def __init__(self, client, prefix="beigou:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        import redis
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return None if raw is None else pickle.loads(raw)
+
+    def set(self, key, value, ex=None):
+        self.client.set(self.prefix + key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), ex=ex)
+
+    def add(self, key, value, ex=None):
+        return bool(self.client.set(self.prefix + key, pickle.dumps(value), ex=ex, nx=True))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+
+def backend_from_url(url, default_root):
+    """BEIGOU_CACHE_URL：redis://... / memory:// / 其他視為磁碟目錄 (空字串 = default_root)"""
+    if url.startswith(("redis://", "rediss://", "unix://")): return RedisBackend.from_url(url)
+    if url.startswith("memory://"): return MemoryBackend()
+    return DiskBackend(url or default_root)
+
+
+# ── 快取本體 ────────────────────────────────────────────────────────────────
+class SharedCache:
+    """
+    get(key, loader, ttl, stale_ttl)：
+      - 新鮮 (存放未滿 ttl 秒)：直接回傳
+      - 過期但未滿 stale_ttl：立刻回傳舊快照，背景刷新 (同一 key 整個叢集只有拿到鎖的那個副本刷新)
+      - 沒有快照：同 key 的並行呼叫只跑一次 loader，其他人等同一個結果 (跨副本靠後端的 add 鎖)
+    loader 失敗時保留上一份好的快照，不會被錯誤或空結果蓋掉；沒有快照時 error_ttl 秒內直接重丟上次的錯誤，
+    上游掛掉時不會每次 rerun 都再打一次
+    """
+
+    def __init__(self, backend, lock_ttl=30.0, error_ttl=15.0, poll_interval=0.05):
+        self.backend = backend
+        self.lock_ttl = lock_ttl
+        self.poll_interval = poll_interval
+        self.error_ttl = error_ttl
+        self._inflight = {}
+        self._failed = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "stale": 0, "misses": 0, "loads": 0, "coalesced": 0, "errors": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def get(self, key, loader, ttl=60.0, stale_ttl=3600.0):
+        entry = self.backend.get(key)
+        if entry is not None:
+            stored_at, value = entry
+            if time.time() - stored_at < ttl:
+                self._count("hits")
+                return value
+            self._count("stale")
+            self._refresh_async(key, loader, ttl, stale_ttl)
+            return value
+        failed = self._failed.get(key)
+        if failed is not None and time.monotonic() - failed[0] < self.error_ttl: raise failed[1]
+        self._count("misses")
+        return self._load(key, loader, ttl, stale_ttl).result()
+
+    def invalidate(self, key):
+        self.backend.delete(key)
+
+    def _load(self, key, loader, ttl, stale_ttl, locked=False):
+        """同 key 只有一個 Future 在跑；跑完才從 _inflight 移除"""
+        with self._lock:
+            fut = self._inflight.get(key)
+            if fut is not None:
+                self._stats["coalesced"] += 1
+                return fut
+            fut = self._inflight[key] = Future()
+        lock_key = f"{key}:refresh"
+        try:
+            # 跨副本：冷啟動時別的副本已經在抓，就等它寫進後端 (最多 lock_ttl 秒)，不重複打上游
+            if not locked:
+                locked = self.backend.add(lock_key, 1, ex=self.lock_ttl)
+                deadline = time.monotonic() + self.lock_ttl
+                while not locked and time.monotonic() < deadline:
+                    entry = self.backend.get(key)
+                    if entry is not None and time.time() - entry[0] < ttl: break
+                    time.sleep(self.poll_interval)
+                    locked = self.backend.add(lock_key, 1, ex=self.lock_ttl)
+            entry = self.backend.get(key)  # 排隊期間別的執行緒 / 副本可能剛寫好
+            if entry is not None and time.time() - entry[0] < ttl:
+                fut.set_result(entry[1])
+                return fut
+            value = loader()
+            self.backend.set(key, (time.time(), value), ex=stale_ttl)
+            self._count("loads")
+            self._failed.pop(key, None)
+            fut.set_result(value)
+        except Exception as e:
+            self._count("errors")
+            self._failed[key] = (time.monotonic(), e)
+            fut.set_exception(e)
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            if locked: self.backend.delete(lock_key)
+            with self._lock:
+                self._inflight.pop(key, None)
+        return fut
+
+    def _refresh_async(self, key, loader, ttl, stale_ttl):
+        with self._lock:
+            if key in self._inflight: return
+        # 拿不到鎖代表別的副本正在刷新，繼續用舊快照即可
+        if not self.backend.add(f"{key}:refresh", 1, ex=self.lock_ttl): return
+        threading.Thread(target=self._load, args=(key, loader, ttl, stale_ttl, True),
+                         name=f"swr-{key}", daemon=True).start()
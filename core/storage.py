@@ -0,0 +1,27 @@
+"""
+本地資料目錄與 Parquet 原子寫入
+"""
+
+import os
+import tempfile
+
+DATA_DIR = os.environ.get("BEIGOU_DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data"))
+
+
+def data_path(*parts):
+    path = os.path.join(DATA_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def write_parquet_atomic(df, path):
+    """先寫暫存檔再 os.replace，寫到一半當掉也不會留下壞檔"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".parquet.tmp")
+    os.close(fd)
+    try:
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp): os.remove(tmp)
+        raise
@@ -0,0 +1,82 @@
+"""
+多腳策略損益引擎：價差、跨式、日曆價差…… (指數 × 時間) 整張網格一次廣播算完，圖表直接拿陣列畫
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+
+from core.pricing import TXO_MULTIPLIER, bs_price
+
+
+class Leg(NamedTuple):
+    strike: float
+    call_put: str          # "CALL" / "PUT"
+    qty: int = 1           # 正 = 買進、負 = 賣出 (口)
+    premium: float = 0.0   # 進場權利金 (點)
+    days: int = 30         # 距到期天數 (日曆天)
+    sigma: float = 0.2
+
+
+class StrategyGrid(NamedTuple):
+    spots: np.ndarray       # (S,)
+    days: np.ndarray        # (T,) 從今天起經過的天數，最後一格 = 最近到期日
+    pnl: np.ndarray         # (T, S) 各時點的損益 (元)，未到期的腳以 BS 估值
+    expiry_pnl: np.ndarray  # (S,) 最近到期日的損益 (= pnl[-1])
+    breakevens: np.ndarray  # 最近到期日損益由負轉正 / 由正轉負的指數位置
+    max_profit: float       # 網格範圍內最近到期日的最大 / 最小損益
+    max_loss: float
+
+
+def legs_from_scan(records, qty=1, smile=None, sigma=0.2):
+    """
+    智慧掃描結果 (dict 列表，欄位同 SCAN_COLUMNS) → 每筆各 qty 口 (qty 可為與 records 等長的列表)
+    smile: solve_chain_iv 的結果，有收斂的 iv 就用該合約自己的，否則用 sigma
+    """
+    iv = {}
+    if smile is not None and not smile.empty:
+        ok = smile[smile["converged"]]
+        iv = dict(zip(zip(ok["contract_date"], ok["call_put"], ok["strike_price"].astype(float)), ok["iv"]))
+    qtys = qty if isinstance(qty, (list, tuple, np.ndarray)) else [qty] * len(records)
+    return [Leg(float(r["履約價"]), r["類型"], int(q), float(r["價格"]), int(r["天數"]),
+                float(iv.get((str(r["合約"]), r["類型"], float(r["履約價"])), sigma)))
+            for r, q in zip(records, qtys)]
+
+
+def strategy_pnl(legs, spots, n_times=30, r=0.02, multiplier=TXO_MULTIPLIER):
+    """
+    legs: Leg 列表；spots: 指數網格 (S,)
+    時間軸從今天到最近一隻腳到期，切 n_times 格；較遠月份的腳在最近到期日仍以 BS 估值 (日曆價差)
+    全部 (腳 × 時間 × 指數) 一次 bs_price，沒有 Python 迴圈
+    """
+    spots = np.asarray(spots, dtype=float)
+    strike = np.array([leg.strike for leg in legs], dtype=float)[:, None, None]
+    is_call = np.array([leg.call_put == "CALL" for leg in legs])[:, None, None]
+    qty = np.array([leg.qty for leg in legs], dtype=float)[:, None, None]
+    premium = np.array([leg.premium for leg in legs], dtype=float)[:, None, None]
+    leg_days = np.array([leg.days for leg in legs], dtype=float)[:, None, None]
+    sigma = np.array([leg.sigma for leg in legs], dtype=float)[:, None, None]
+
+    days = np.linspace(0.0, leg_days.min(), max(n_times, 2))
+    T = np.maximum(leg_days - days[None, :, None], 0.0) / 365.0              # (L, T, 1)
+    value = bs_price(spots[None, None, :], strike, T, r, sigma, is_call)    # (L, T, S)
+    pnl = ((value - premium) * qty).sum(axis=0) * multiplier
+
+    expiry = pnl[-1]
+    nz = np.flatnonzero(expiry != 0)                                         # 剛好落在 0 的格點跳過，前後兩點內插
+    cross = np.flatnonzero(np.sign(expiry[nz[:-1]]) != np.sign(expiry[nz[1:]]))
+    a, b = nz[cross], nz[cross + 1]
+    x0, x1, y0, y1 = spots[a], spots[b], expiry[a], expiry[b]
+    breakevens = x0 - y0 * (x1 - x0) / (y1 - y0)
+    return StrategyGrid(spots, days, pnl, expiry, breakevens, float(expiry.max()), float(expiry.min()))
+
+
+def expiry_payoff(legs, spots, multiplier=TXO_MULTIPLIER):
+    """只要到期內含價值時的快捷版 (所有腳視為同時到期)：(S,)"""
+    spots = np.asarray(spots, dtype=float)[None, :]
+    strike = np.array([leg.strike for leg in legs], dtype=float)[:, None]
+    is_call = np.array([leg.call_put == "CALL" for leg in legs])[:, None]
+    qty = np.array([leg.qty for leg in legs], dtype=float)[:, None]
+    premium = np.array([leg.premium for leg in legs], dtype=float)[:, None]
+    intrinsic = np.where(is_call, np.maximum(spots - strike, 0.0), np.maximum(strike - spots, 0.0))
+    return ((intrinsic - premium) * qty).sum(axis=0) * multiplier
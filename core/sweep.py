@@ -0,0 +1,86 @@
+"""
+槓桿 × 回測天數 參數掃描：一條報酬序列一次廣播算完整張表，滑桿移動只是查表
+"""
+
+from datetime import date
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+LEVERAGES = np.round(np.arange(2.0, 20.0 + 1e-9, 0.5), 1)  # 同「回測槓桿」滑桿
+HORIZONS = np.arange(30, 500 + 1, 30)                       # 同「回測天數」滑桿
+
+
+class SweepResult(NamedTuple):
+    leverages: np.ndarray
+    horizons: np.ndarray
+    dates: np.ndarray
+    start: np.ndarray     # 每個天數對應的起始列
+    cum_tai: np.ndarray   # (天數, 日期)
+    cum_lev: np.ndarray   # (槓桿, 天數, 日期)，窗口外為 NaN
+    total: np.ndarray     # 以下皆為 (槓桿, 天數)
+    sharpe: np.ndarray
+    maxdd: np.ndarray
+    win_rate: np.ndarray
+    avg_ret: np.ndarray
+
+    def _index(self, lev, days):
+        return int(np.abs(self.leverages - lev).argmin()), int(np.abs(self.horizons - days).argmin())
+
+    def lookup(self, lev, days):
+        """回傳 (chart_df, metrics)，格式同 backtest_taiex_leverage_v191 的近似法"""
+        i, j = self._index(lev, days)
+        s = self.start[j]
+        chart_df = pd.DataFrame({"date": pd.to_datetime(self.dates[s:]), "cum_tai": self.cum_tai[j, s:], "cum_lev": self.cum_lev[i, j, s:]})
+        return chart_df, {
+            'total_lev': float(self.total[i, j]), 'total_tai': float(self.cum_tai[j, -1] - 1),
+            'win_rate': round(float(self.win_rate[i, j]), 1), 'sharpe': round(float(self.sharpe[i, j]), 2),
+            'maxdd': round(float(self.maxdd[i, j]), 1), 'trades': len(self.dates) - int(s),
+            'lev': float(self.leverages[i]), 'avg_ret': round(float(self.avg_ret[i, j]), 2),
+        }
+
+    def to_frame(self, metric="total"):
+        """熱力圖用：列 = 槓桿、欄 = 天數"""
+        return pd.DataFrame(getattr(self, metric), index=self.leverages, columns=self.horizons)
+
+
+def sweep_leverage_horizon(taiex, leverages=LEVERAGES, horizons=HORIZONS, beta=0.8, theta_decay=0.0003, today=None):
+    """
+    taiex: date, close (TaiexHistory 的完整序列)
+    每個天數 h 的窗口同單次回測：date >= today - max(2h, 180)，窗口第一天報酬為 0
+    日報酬模型同近似法：clip(ret × lev × beta - theta_decay, -0.95)
+    全部 (槓桿 × 天數 × 日期) 一次廣播，沒有 Python 迴圈
+    """
+    leverages = np.asarray(leverages, dtype=float)
+    horizons = np.asarray(horizons, dtype=int)
+    today = pd.Timestamp(today or date.today())
+    dates = pd.to_datetime(taiex["date"]).to_numpy()
+    close = taiex["close"].to_numpy(dtype=float)
+    n = len(close)
+    ret = np.r_[0.0, np.diff(close) / close[:-1]]
+
+    window_start = (today - pd.to_timedelta(np.maximum(horizons * 2, 180), unit="D")).to_numpy()
+    start = np.searchsorted(dates, window_start)                       # (H,)
+    t = np.arange(n)
+    in_win = t[None, :] >= start[:, None]                                # (H, T)
+    ret_h = np.where(t[None, :] > start[:, None], ret[None, :], 0.0)     # 窗口第一天報酬為 0
+
+    lev_ret = np.clip(ret_h[None, :, :] * leverages[:, None, None] * beta - theta_decay, -0.95, None)  # (L, H, T)
+    lev_ret = np.where(in_win[None], lev_ret, np.nan)
+    growth = np.where(in_win[None], 1 + lev_ret, 1.0)
+    cum_lev = np.where(in_win[None], np.cumprod(growth, axis=2), np.nan)
+    cum_tai = np.where(in_win, np.cumprod(np.where(in_win, 1 + ret_h, 1.0), axis=1), np.nan)
+
+    count = in_win.sum(axis=1)[None, :]                                  # (1, H)
+    mean = np.nansum(lev_ret, axis=2) / count
+    var = np.nansum((lev_ret - mean[..., None]) ** 2, axis=2) / np.maximum(count - 1, 1)
+    std = np.sqrt(var)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(std > 0, mean / std * np.sqrt(252), 0.0)
+    peak = np.fmax.accumulate(cum_lev, axis=2)
+    maxdd = np.nanmin(cum_lev / peak - 1, axis=2) * 100
+    win = np.nansum(lev_ret > 0, axis=2) / count * 100
+    total = cum_lev[:, :, -1] - 1
+
+    return SweepResult(leverages, horizons, dates, start, cum_tai, cum_lev, total, sharpe, maxdd, win, mean * 100)
@@ -0,0 +1,83 @@
+"""
+TAIEX 日線本地庫：get_data / get_support_pressure / 回測共用同一份，只補抓缺的天數
+"""
+
+import os
+import threading
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+
+from core.storage import data_path, write_parquet_atomic
+
+
+class TaiexHistory:
+    """
+    以 Parquet 落地的 TAIEX 日線 (依日期排序)
+    window() 回傳底層 DataFrame 的 iloc 切片 (pandas Copy-on-Write 下不複製資料)，呼叫端請勿原地修改
+    暖啟動時最多只發一次尾端增量請求；refresh_interval 秒內不重複補抓
+    """
+
+    def __init__(self, client, path=None, refresh_interval=300, stock_id="TAIEX"):
+        self.client = client
+        self.stock_id = stock_id
+        self.path = path or data_path(f"{stock_id.lower()}_daily.parquet")
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._last_refresh = 0.0
+        self._df, self._covered_from = self._load()
+
+    def _load(self):
+        # covered_from 記錄「曾經要求過的最早日期」，避免起點落在假日時每次都重新回補
+        if os.path.exists(self.path):
+            try:
+                raw = pd.read_parquet(self.path)
+                df = self._normalize(raw)
+                covered = raw.attrs.get("covered_from")
+                return df, pd.Timestamp(covered) if covered else (df["date"].iloc[0] if len(df) else None)
+            except Exception:
+                pass
+        return pd.DataFrame(columns=["date", "stock_id", "open", "max", "min", "close"]), None
+
+    @staticmethod
+    def _normalize(df):
+        df = df.copy()
+        df["date"] = pd.to_datetime(df["date"])
+        return df.drop_duplicates("date", keep="last").sort_values("date").reset_index(drop=True)
+
+    def _fetch(self, token, start, end=""):
+        return self.client.fetch(token, "taiwan_stock_daily", stock_id=self.stock_id,
+                                 start_date=start.strftime("%Y-%m-%d"), end_date=end and end.strftime("%Y-%m-%d"))
+
+    def ensure(self, token, start):
+        """確保本地涵蓋 start ~ 今天：前段不足就回補一次，尾端照 refresh_interval 節流補抓"""
+        start = pd.Timestamp(start).normalize()
+        with self._lock:
+            parts = []
+            if self._df.empty:
+                parts.append(self._fetch(token, start))
+                self._last_refresh = time.monotonic()
+                self._covered_from = start
+            else:
+                first, last = self._df["date"].iloc[0], self._df["date"].iloc[-1]
+                if start < min(first, self._covered_from or first):
+                    parts.append(self._fetch(token, start, first - timedelta(days=1)))
+                    self._covered_from = start
+                tail_start = last + timedelta(days=1)
+                due = time.monotonic() - self._last_refresh >= self.refresh_interval
+                if tail_start.date() <= date.today() and due:
+                    parts.append(self._fetch(token, tail_start))
+                    self._last_refresh = time.monotonic()
+            parts = [p for p in parts if p is not None and not p.empty]
+            if parts:
+                self._df = self._normalize(pd.concat([self._df, *parts], ignore_index=True))
+                self._df.attrs["covered_from"] = self._covered_from.strftime("%Y-%m-%d")
+                write_parquet_atomic(self._df, self.path)
+            return self._df
+
+    def window(self, token, days):
+        """最近 days 個日曆天的切片 (同原本 start_date = today - days 的語意)"""
+        start = pd.Timestamp(date.today() - timedelta(days=days))
+        df = self.ensure(token, start)
+        return df.iloc[df["date"].searchsorted(start):]
@@ -0,0 +1,230 @@
+"""
+輕量觀測層：各階段耗時 (p50 / p95)、st.cache_* 命中 / 未命中、上游請求數與位元組，可匯出 Prometheus 文字或 JSONL
+關閉時 timed / span / cached 只多一次布林判斷；預設關閉，只有設了環境變數 BEIGOU_TELEMETRY=1 才在啟動時開啟，管理面板也可以隨時切換
+"""
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+import numpy as np
+
+
+class _NullSpan:
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tel", "stage", "t0")
+
+    def __init__(self, tel, stage):
+        self.tel, self.stage = tel, stage
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tel.observe(self.stage, time.perf_counter() - self.t0, exc)
+        return False
+
+
+def _labels(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(labels):
+    if not labels: return ""
+    inner = ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in labels)
+    return "{" + inner + "}"
+
+
+class Telemetry:
+    """
+    timed(stage) / span(stage)：記錄耗時，例外照樣往外丟但會計入錯誤數
+    cached(name, st.cache_data(...))：包在 Streamlit 快取外層，分辨這次是命中還是真的跑了函式本體
+    incr(name, **labels)：計數器；add_collector(fn)：匯出時才呼叫，把其他元件自己的累計值 (FinMind、共用快取、佇列) 併進來
+    每個階段只保留最近 window 筆耗時算百分位，記憶體固定
+    """
+
+    def __init__(self, enabled=False, window=1024):
+        self.enabled = enabled
+        self.window = window
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._samples = {}
+        self._count = Counter()
+        self._total = Counter()
+        self._errors = Counter()
+        self._last_error = {}
+        self._counters = Counter()
+        self._collectors = []
+
+    # ── 記錄 ────────────────────────────────────────────────────────────────
+    def observe(self, stage, seconds, error=None):
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None: samples = self._samples[stage] = deque(maxlen=self.window)
+            samples.append(seconds)
+            self._count[stage] += 1
+            self._total[stage] += seconds
+            if error is not None:
+                self._errors[stage] += 1
+                self._last_error[stage] = f"{type(error).__name__}: {error}"[:200]
+
+    def error(self, stage, exc):
+        """被 except 吞掉、不會往外丟的錯誤也記一筆 (不計耗時)"""
+        if not self.enabled: return
+        with self._lock:
+            self._errors[stage] += 1
+            self._last_error[stage] = f"{type(exc).__name__}: {exc}"[:200]
+
+    def incr(self, name, value=1, **labels):
+        if not self.enabled: return
+        with self._lock:
+            self._counters[(name, _labels(labels))] += value
+
+    def span(self, stage):
+        return _Span(self, stage) if self.enabled else _NULL_SPAN
+
+    def timed(self, stage=None):
+        def deco(fn):
+            name = stage or fn.__name__
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled: return fn(*args, **kwargs)
+                t0 = time.perf_counter()
+                try:
+                    out = fn(*args, **kwargs)
+                except BaseException as e:
+                    self.observe(name, time.perf_counter() - t0, e)
+                    raise
+                self.observe(name, time.perf_counter() - t0)
+                return out
+            return wrapper
+        return deco
+
+    def cached(self, name, cache_decorator):
+        """
+        @TELEMETRY.cached("support_pressure", st.cache_data(ttl=3600))
+        函式本體只有快取未命中時才會執行，本體一開頭在執行緒區域變數做記號，外層據此記命中 / 未命中
+        """
+        def deco(fn):
+            @functools.wraps(fn)
+            def body(*args, **kwargs):
+                self._local.missed = True
+                return fn(*args, **kwargs)
+            cached_fn = cache_decorator(body)
+            timed_fn = self.timed(name)(cached_fn)
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled: return cached_fn(*args, **kwargs)
+                self._local.missed = False
+                try:
+                    return timed_fn(*args, **kwargs)
+                finally:
+                    self.incr("cache_requests_total", fn=name, result="miss" if self._local.missed else "hit")
+            wrapper.clear = getattr(cached_fn, "clear", None)
+            return wrapper
+        return deco
+
+    def add_collector(self, fn):
+        """fn() -> [(指標名稱, {標籤}, 數值), ...]，只在匯出時呼叫"""
+        with self._lock:
+            self._collectors.append(fn)
+
+    def reset(self):
+        with self._lock:
+            for d in (self._samples, self._count, self._total, self._errors, self._last_error, self._counters):
+                d.clear()
+
+    # ── 匯出 ────────────────────────────────────────────────────────────────
+    def summary(self):
+        """每個階段一列：次數、錯誤、p50 / p95 / 最大 (毫秒)，依總耗時排序"""
+        with self._lock:
+            stages = {k: np.fromiter(v, dtype=float) * 1e3 for k, v in self._samples.items()}
+            rows = [{"stage": k, "count": self._count[k], "errors": self._errors[k],
+                     "p50_ms": float(np.percentile(ms, 50)), "p95_ms": float(np.percentile(ms, 95)),
+                     "max_ms": float(ms.max()), "total_s": self._total[k], "last_error": self._last_error.get(k, "")}
+                    for k, ms in stages.items() if ms.size]
+            rows += [{"stage": k, "count": 0, "errors": n, "p50_ms": float("nan"), "p95_ms": float("nan"),
+                      "max_ms": float("nan"), "total_s": 0.0, "last_error": self._last_error.get(k, "")}
+                     for k, n in self._errors.items() if k not in stages]
+        return sorted(rows, key=lambda r: -r["total_s"])
+
+    def counters(self):
+        """自己的計數器加上各 collector 的值：{(名稱, 標籤 tuple): 數值}"""
+        with self._lock:
+            out = dict(self._counters)
+            collectors = list(self._collectors)
+        for fn in collectors:
+            try:
+                for name, labels, value in fn():
+                    out[(name, _labels(labels))] = value
+            except Exception as e:
+                key = ("collector_errors_total", _labels({"collector": getattr(fn, "__qualname__", "?"), "error": type(e).__name__}))
+                out[key] = out.get(key, 0) + 1
+        return out
+
+    def prometheus(self, prefix="beigou_"):
+        rows = self.summary()
+        lines = [f"# TYPE {prefix}stage_seconds summary"]
+        for row in rows:
+            if not row["count"]: continue
+            s = row["stage"]
+            for q, key in (("0.5", "p50_ms"), ("0.95", "p95_ms")):
+                lines.append(f'{prefix}stage_seconds{_fmt_labels((("stage", s), ("quantile", q)))} {row[key] / 1e3:.6f}')
+            lines.append(f"{prefix}stage_seconds_count{_fmt_labels((('stage', s),))} {row['count']}")
+            lines.append(f"{prefix}stage_seconds_sum{_fmt_labels((('stage', s),))} {row['total_s']:.6f}")
+        lines.append(f"# TYPE {prefix}stage_errors_total counter")
+        lines += [f"{prefix}stage_errors_total{_fmt_labels((('stage', r['stage']),))} {r['errors']}" for r in rows]
+        for (name, labels), value in sorted(self.counters().items()):
+            lines.append(f"{prefix}{name}{_fmt_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def jsonl(self):
+        """一行 JSON 快照 (時間戳 + 階段摘要 + 計數器)，可 append 到檔案給離線分析"""
+        return json.dumps({
+            "ts": time.time(),
+            "stages": self.summary(),
+            "counters": [{"name": n, "labels": dict(l), "value": v} for (n, l), v in sorted(self.counters().items())],
+        }, ensure_ascii=False, default=float)
+
+    def write_jsonl(self, path):
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(self.jsonl() + "\n")
+
+
+def sample_stacks(seconds=5.0, interval=0.005, ignore=("threading.py", "selectors.py", "queue.py")):
+    """
+    取樣剖析：每 interval 秒抓一次所有執行緒的呼叫堆疊，持續 seconds 秒
+    回傳 folded stacks 文字 (「a;b;c 次數」，可直接丟 flamegraph.pl / speedscope)；
+    最內層停在 ignore 檔案裡 (閒置等待) 的樣本略過
+    """
+    me = threading.get_ident()
+    counts = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for tid, frame in sys._current_frames().items():
+            if tid == me: continue
+            if os.path.basename(frame.f_code.co_filename) in ignore: continue
+            stack = []
+            while frame is not None:
+                stack.append(f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            counts[";".join(reversed(stack))] += 1
+        time.sleep(interval)
+    return "\n".join(f"{stack} {n}" for stack, n in counts.most_common())
+
+
+TELEMETRY = Telemetry(enabled=os.environ.get("BEIGOU_TELEMETRY", "") == "1")
@@ -0,0 +1,225 @@
+"""
+Supabase 寫入的本地持久佇列 (write-behind)：按鈕只寫本機 SQLite，背景執行緒批次 upsert，暫時性錯誤退避重試
+同一 (資料表, email) 在佇列中只保留一列，欄位以 json_patch 合併，送到遠端也是 upsert，重送不會重複
+被遠端拒絕 (資料本身有問題) 或重試 max_attempts 次仍失敗的列移到 dead_letter 表，不再拖累同一批的其他列
+"""
+
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tbl TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_try REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    UNIQUE (tbl, key)
+)
+"""
+
+_DEAD_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dead_letter (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tbl TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    failed_at REAL NOT NULL,
+    last_error TEXT
+)
+"""
+
+
+class SupabaseSink:
+    """
+    client_factory: 回傳 supabase client 的函式 (第一次 flush 才呼叫，啟動不載入 supabase)
+    每個資料表一次 upsert 一整批，on_conflict=email 讓重送變成覆寫
+    PostgREST 批次 upsert 會把缺的欄位補 NULL，所以依欄位組合分組送，不會洗掉遠端其他欄位
+    遠端表必須有 email 唯一鍵 (舊版用 insert 不需要)，否則每次 upsert 都會被拒 (42P10)：
+        ALTER TABLE vips ADD CONSTRAINT vips_email_key UNIQUE (email);
+    """
+
+    def __init__(self, client_factory, on_conflict="email"):
+        self.client_factory = client_factory
+        self.on_conflict = on_conflict
+        self._client = None
+
+    def __call__(self, table, rows):
+        if self._client is None: self._client = self.client_factory()
+        groups = {}
+        for row in rows:
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+        for group in groups.values():
+            self._client.table(table).upsert(group, on_conflict=self.on_conflict).execute()
+
+    @staticmethod
+    def is_transient(exc):
+        """
+        值得重試的錯誤：沒到資料庫 (連線 / 逾時)、閘道回的 408 / 429 / 5xx、連線中斷 / 交易衝突 / 資源不足類的 SQLSTATE
+        其他 SQLSTATE (違反約束、欄位不存在…) 與 PGRST 請求錯誤是資料本身被拒，重送也一樣
+        """
+        code = getattr(exc, "code", None)  # postgrest.APIError：SQLSTATE / PGRST 代碼，回應不是 JSON 時是 HTTP 狀態
+        if code is None: return True
+        code = str(code)
+        if code.isdigit(): return code in ("408", "429") or code.startswith("5")
+        return code[:2] in ("08", "40", "53", "57") or code in ("PGRST000", "PGRST001", "PGRST002", "PGRST003")
+
+
+class WriteBehindQueue:
+    """
+    enqueue() 只做一次本機 SQLite upsert (WAL，毫秒以下)，行程掛掉重啟後未送出的列仍在
+    背景執行緒每 flush_interval 秒或佇列滿 batch_size 時送一批；暫時性失敗依 2^attempts 秒退避 (上限 max_backoff)
+    整批被拒時改逐列送，找出被拒的那幾列移到 dead_letter；重試 max_attempts 次仍失敗的列也移過去
+    is_transient(exc) 判斷錯誤值不值得重試 (預設全部重試，只受 max_attempts 限制)
+    送出期間同一列又被更新時 version 會變，送完只刪 version 相同的列，新的變更不會遺失
+    """
+
+    def __init__(self, path, sink, batch_size=200, flush_interval=1.0, base_backoff=1.0, max_backoff=300.0,
+                 max_attempts=10, is_transient=None, start=True):
+        self.path = path
+        self.sink = sink
+        self.max_attempts = max_attempts
+        self.is_transient = is_transient or (lambda exc: True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._local = threading.local()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {"enqueued": 0, "sent": 0, "batches": 0, "failures": 0, "last_error": ""}
+        with self._conn() as conn:
+            conn.execute(_SCHEMA)
+            conn.execute(_DEAD_SCHEMA)
+        self._worker = None
+        if start: self.start()
+
+    def _conn(self):
+        # sqlite3 連線不能跨執行緒共用：每個執行緒一條
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ── 寫入端 ──────────────────────────────────────────────────────────────
+    def enqueue(self, table, key, payload):
+        """payload 與佇列中同 key 的舊值合併 (新欄位覆蓋舊欄位)；立即返回"""
+        self._conn().execute(
+            "INSERT INTO outbox (tbl, key, payload) VALUES (?, ?, ?) "
+            "ON CONFLICT (tbl, key) DO UPDATE SET payload = json_patch(outbox.payload, excluded.payload), "
+            "version = outbox.version + 1, next_try = 0",
+            (table, key, json.dumps(payload, ensure_ascii=False)))
+        with self._stats_lock:
+            self._stats["enqueued"] += 1
+        if self.pending() >= self.batch_size: self._wake.set()
+
+    def pending(self):
+        return self._conn().execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def dead(self):
+        return self._conn().execute("SELECT COUNT(*) FROM dead_letter").fetchone()[0]
+
+    def stats(self):
+        with self._stats_lock:
+            return {**self._stats, "pending": self.pending(), "dead": self.dead()}
+
+    # ── 送出端 ──────────────────────────────────────────────────────────────
+    def flush_once(self):
+        """送出一批到期的列，回傳送出的列數 (背景執行緒與測試共用)"""
+        with self._flush_lock:
+            conn = self._conn()
+            rows = conn.execute(
+                "SELECT id, tbl, payload, version, attempts FROM outbox WHERE next_try <= ? ORDER BY id LIMIT ?",
+                (time.time(), self.batch_size)).fetchall()
+            if not rows: return 0
+            by_table = {}
+            for row in rows:
+                by_table.setdefault(row[1], []).append(row)
+            return sum(self._send(conn, table, batch) for table, batch in by_table.items())
+
+    def _send(self, conn, table, batch):
+        """送一批同資料表的列，回傳送達列數；失敗的列退避重試或移到 dead_letter"""
+        try:
+            self.sink(table, [json.loads(r[2]) for r in batch])
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"[:200]
+            with self._stats_lock:
+                self._stats["failures"] += 1
+                self._stats["last_error"] = error
+            transient = self.is_transient(e)
+            log.warning("write-behind flush to %s failed (%d rows, %s): %s", table, len(batch),
+                        "retry" if transient else "rejected", e)
+            if not transient and len(batch) > 1:
+                # 整批被拒：可能只有其中一列有問題，逐列送把它找出來，其他列照常送達
+                return sum(self._send(conn, table, [r]) for r in batch)
+            now = time.time()
+            dead = [r for r in batch if not transient or r[4] + 1 >= self.max_attempts]
+            retry = [r for r in batch if transient and r[4] + 1 < self.max_attempts]
+            for r in dead:
+                # 送出期間被更新過 (version 變了) 的列不丟，留在佇列裡用新的內容再試
+                moved = conn.execute(
+                    "INSERT INTO dead_letter (tbl, key, payload, attempts, failed_at, last_error) "
+                    "SELECT tbl, key, payload, attempts + 1, ?, ? FROM outbox WHERE id = ? AND version = ?",
+                    (now, error, r[0], r[3])).rowcount
+                if moved:
+                    conn.execute("DELETE FROM outbox WHERE id = ?", (r[0],))
+                    log.error("write-behind row moved to dead_letter (%s): %s", table, error)
+                else:
+                    retry.append(r)
+            conn.executemany(
+                "UPDATE outbox SET attempts = attempts + 1, next_try = ?, last_error = ? WHERE id = ?",
+                [(now + self._backoff(r[4]), error, r[0]) for r in retry])
+            return 0
+        conn.executemany("DELETE FROM outbox WHERE id = ? AND version = ?", [(r[0], r[3]) for r in batch])
+        with self._stats_lock:
+            self._stats["batches"] += 1
+            self._stats["sent"] += len(batch)
+        return len(batch)
+
+    def _backoff(self, attempts):
+        delay = min(self.base_backoff * 2 ** attempts, self.max_backoff)
+        return delay * random.uniform(0.5, 1.0)  # 抖動，避免多個副本同時重試
+
+    def flush(self, timeout=10.0):
+        """送到佇列清空 (或只剩退避中的列) 為止；回傳剩餘列數"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and self.flush_once():
+            pass
+        return self.pending()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                while self.flush_once() >= self.batch_size:
+                    pass
+            except Exception:
+                log.exception("write-behind worker error")
+
+    def start(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._stop.clear()
+            self._worker = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._worker.start()
+
+    def close(self, timeout=5.0):
+        self._stop.set()
+        self._wake.set()
+        if self._worker is not None: self._worker.join(timeout)
+        self.flush(timeout)
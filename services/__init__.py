@@ -0,0 +1,3 @@
+"""
+🔰 貝伊果屋 - Streamlit 服務層 (快取的資料抓取與圖表)，模組只在第一次 import 時執行，重跑不重建
+"""
@@ -0,0 +1,43 @@
+"""
+管理面板：各階段 p50 / p95、快取命中、上游請求數，Prometheus / JSONL 匯出與取樣剖析
+只有網址帶 ?admin=<ADMIN_TOKEN> 時 app 才會 import 這個模組
+"""
+
+import pandas as pd
+import streamlit as st
+
+from core.telemetry import TELEMETRY, sample_stacks
+
+
+def render_admin_panel():
+    with st.expander("🛠️ 效能監控 (管理員)", expanded=True):
+        TELEMETRY.enabled = st.toggle("啟用量測 (本行程所有 session)", value=TELEMETRY.enabled, key="admin_telemetry")
+        if not TELEMETRY.enabled:
+            st.caption("量測關閉中：timed / span 只多一次布林判斷")
+
+        rows = TELEMETRY.summary()
+        if rows:
+            df = pd.DataFrame(rows)
+            st.dataframe(df.round({"p50_ms": 2, "p95_ms": 2, "max_ms": 2, "total_s": 3}), use_container_width=True, hide_index=True)
+        else:
+            st.info("還沒有量測資料，重跑幾次再回來看")
+
+        counters = TELEMETRY.counters()
+        if counters:
+            st.dataframe(pd.DataFrame([{"name": n, "labels": ", ".join(f"{k}={v}" for k, v in l), "value": v}
+                                       for (n, l), v in sorted(counters.items())]),
+                         use_container_width=True, hide_index=True)
+
+        col_a, col_b, col_c = st.columns(3)
+        col_a.download_button("⬇️ Prometheus", TELEMETRY.prometheus(), "beigou_metrics.prom", key="admin_prom")
+        col_b.download_button("⬇️ JSONL 快照", TELEMETRY.jsonl() + "\n", "beigou_metrics.jsonl", key="admin_jsonl")
+        if col_c.button("🧹 清空量測", key="admin_reset"):
+            TELEMETRY.reset()
+            st.rerun()
+
+        seconds = st.slider("取樣剖析秒數 (期間其他 session 的重跑都會被取樣)", 1, 30, 5, key="admin_profile_secs")
+        if st.button("🔬 開始取樣", key="admin_profile"):
+            with st.spinner(f"取樣 {seconds} 秒..."):
+                folded = sample_stacks(seconds)
+            st.download_button("⬇️ folded stacks (flamegraph / speedscope)", folded, "beigou_profile.folded", key="admin_folded")
+            st.code("\n".join(folded.splitlines()[:30]) or "(沒有取樣到忙碌的執行緒)", language=None)
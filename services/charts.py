@@ -0,0 +1,70 @@
+"""
+Plotly 圖表：plotly 只在第一次畫圖時 import，沒打開圖表的使用者不付這筆啟動成本
+"""
+
+import numpy as np
+
+from core.telemetry import TELEMETRY
+
+
+def _go():
+    import plotly.graph_objects as go
+    return go
+
+
+@TELEMETRY.timed("chart.payoff")
+def plot_payoff(K, premium, cp):
+    # 單腳到期損益：交給 core.strategy 的向量化版本 (乘數 TXO_MULTIPLIER，不再寫死 ×50)
+    from core.strategy import Leg, expiry_payoff
+    go = _go()
+    x_range = np.linspace(K * 0.9, K * 1.1, 100)
+    profit = expiry_payoff([Leg(K, cp, 1, premium)], x_range)
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=x_range, y=profit, mode='lines', fill='tozeroy', 
+                             line=dict(color='green' if profit[-1]>0 else 'red')))
+    fig.add_hline(y=0, line_dash="dash", line_color="gray")
+    fig.update_layout(title=f"到期損益圖 ({cp} @ {K})", xaxis_title="指數", yaxis_title="損益(TWD)", 
+                      height=300, margin=dict(l=0,r=0,t=30,b=0))
+    return fig
+
+
+@TELEMETRY.timed("chart.strategy")
+def plot_strategy(grid, title="策略損益"):
+    """StrategyGrid → 今天 / 中途 / 最近到期日 三條損益曲線"""
+    go = _go()
+    fig = go.Figure()
+    for t, name, dash in [(0, "今天", "dot"), (len(grid.days) // 2, f"{grid.days[len(grid.days) // 2]:.0f} 天後", "dash"), (-1, "到期", "solid")]:
+        fig.add_trace(go.Scatter(x=grid.spots, y=grid.pnl[t], mode="lines", name=name, line=dict(dash=dash)))
+    for be in grid.breakevens:
+        fig.add_vline(x=be, line_dash="dot", line_color="gray", annotation_text=f"損平 {be:,.0f}")
+    fig.add_hline(y=0, line_dash="dash", line_color="gray")
+    fig.update_layout(title=title, xaxis_title="指數", yaxis_title="損益(TWD)", height=320, margin=dict(l=0, r=0, t=30, b=0))
+    return fig
+
+
+@TELEMETRY.timed("chart.oi_walls")
+def plot_oi_walls(walls, current_price, width=1000):
+    """walls: core.oi_walls.OIWalls；現價 ±width 的 CALL (上) / PUT (下) 未平倉與日增減"""
+    go = _go()
+    w = walls.window(current_price, width)
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=w.strikes, y=w.call_oi, name='Call OI (壓力)', marker_color='#FF6B6B'))
+    fig.add_trace(go.Bar(x=w.strikes, y=-w.put_oi, name='Put OI (支撐)', marker_color='#4ECDC4'))
+    if np.isfinite(w.call_chg).any():
+        fig.add_trace(go.Scatter(x=w.strikes, y=w.call_chg, name='Call 日增減', mode='markers', marker=dict(color='#C0392B', symbol='diamond')))
+        fig.add_trace(go.Scatter(x=w.strikes, y=-w.put_chg, name='Put 日增減', mode='markers', marker=dict(color='#16A085', symbol='diamond')))
+    fig.add_vline(x=current_price, line_dash="dash", line_color="gray", annotation_text="現價")
+    fig.add_vline(x=walls.max_pain, line_dash="dot", line_color="orange", annotation_text="最大痛點")
+    fig.update_layout(title="籌碼戰場 (OI Walls)", barmode='overlay', height=300, margin=dict(l=0,r=0,t=30,b=0))
+    return fig
+
+
+@TELEMETRY.timed("chart.sweep_heatmap")
+def plot_sweep_heatmap(sweep, metric="total"):
+    """槓桿 × 天數 熱力圖 (百分比)"""
+    go = _go()
+    grid = sweep.to_frame(metric) * 100
+    fig = go.Figure(go.Heatmap(z=grid.values, x=grid.columns, y=grid.index, colorscale="RdYlGn", zmid=0,
+                               colorbar=dict(title="%")))
+    fig.update_layout(xaxis_title="回測天數", yaxis_title="槓桿", height=320, margin=dict(l=0, r=0, t=10, b=0))
+    return fig
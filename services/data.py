@@ -0,0 +1,257 @@
+"""
+資料來源與快取：FinMind 連線、TAIEX / TXO 本地封存、新聞、法人、回測
+重的相依 (回測引擎、Supabase) 延到第一次用到才 import
+"""
+
+import hashlib
+import os
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from core.finmind_client import FinMindClient
+from core.market import backtest_window, fallback_market, leverage_backtest, load_market
+from core.option_archive import OptionArchive
+from core.quota import QuotaStore
+from core.shared_cache import SharedCache, backend_from_url
+from core.storage import data_path
+from core.taiex_store import TaiexHistory
+from core.telemetry import TELEMETRY
+from core.write_queue import SupabaseSink, WriteBehindQueue
+
+
+
+def read_finmind_token():
+    return st.secrets.get("FINMIND_TOKEN", st.secrets.get("finmind_token", ""))
+
+
+@st.cache_resource
+def get_finmind_client():
+    # 全部 fetcher 共用：每個 token 只登入一次，HTTP 連線池重複使用，認證失敗重讀 secrets 重登
+    client = FinMindClient(token_provider=read_finmind_token)
+    TELEMETRY.add_collector(lambda: [(f"upstream_{k}_total", {"source": "finmind"}, v) for k, v in client.stats().items()])
+    return client
+
+
+@st.cache_resource
+def get_taiex_store():
+    # TAIEX 日線落地 Parquet，各功能切自己的窗口，暖啟動只補抓缺的尾端
+    return TaiexHistory(get_finmind_client())
+
+
+@st.cache_resource
+def get_option_archive():
+    # TXO 日線依交易日分區落地，只追加新日期；FinMind 掛掉時仍可用本地最新一天
+    return OptionArchive(get_finmind_client())
+
+
+def _supabase_client():
+    from supabase import create_client  # 只有開通 Email 時才需要，啟動不載入
+    return create_client(
+        st.secrets["SUPABASE_URL"],
+        st.secrets["SUPABASE_ANON_KEY"]
+    )
+
+
+@st.cache_resource
+def get_write_queue():
+    # 開通 / 使用次數寫入先進本機佇列，背景執行緒批次 upsert 到 Supabase (client 在第一次送出時才建立)
+    # upsert 需要 vips.email 唯一鍵 (見 SupabaseSink)；被拒或重試 10 次仍失敗的列留在本機 dead_letter 表
+    sink = SupabaseSink(_supabase_client)
+    queue = WriteBehindQueue(data_path("outbox.sqlite"), TELEMETRY.timed("supabase.upsert")(sink), is_transient=sink.is_transient)
+    TELEMETRY.add_collector(lambda: [(f"outbox_{k}", {"sink": "supabase"}, v) for k, v in queue.stats().items() if k != "last_error"])
+    return queue
+
+
+@st.cache_resource
+def get_quota_store():
+    # 每日回測額度 (伺服器端，跨 session / 重啟都算數)；每次扣額度把當日次數丟進佇列同步到 vips.uses
+    queue = get_write_queue()
+    store = QuotaStore(data_path("quota.sqlite"), limit=3,
+                       on_change=lambda email, day, used: queue.enqueue("vips", email, {"email": email, "uses": used}))
+    store.purge()
+    return store
+
+
+def with_script_ctx(fn):
+    # 預抓在工作執行緒跑，掛上目前 rerun 的 ScriptRunContext，st.cache_* 才不會警告
+    from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+    ctx = get_script_run_ctx()
+    def run():
+        add_script_run_ctx(ctx=ctx)
+        return fn()
+    return run
+
+
+@st.cache_resource
+def get_shared_cache():
+    # 行情快照跨 session 共用：BEIGOU_CACHE_URL=redis://... 多台共用、memory:// 單一行程，預設為本地磁碟
+    cache = SharedCache(backend_from_url(os.environ.get("BEIGOU_CACHE_URL", ""), data_path("cache", "")))
+    TELEMETRY.add_collector(lambda: [("shared_cache_total", {"result": k}, v) for k, v in cache.stats().items()])
+    return cache
+
+
+def _cache_key(name, token):
+    # key 不放 token 本身，只放雜湊
+    return f"{name}:{hashlib.sha1(token.encode()).hexdigest()[:12]}"
+
+
+@st.cache_resource
+def get_source_latency():
+    # 本行程最近一次刷新行情時各上游 (TAIEX / TXO) 的 FetchResult；快照由別台刷新時維持上一次的
+    return {}
+
+
+@TELEMETRY.timed("get_data")
+def get_data(token):
+    # 60 秒內直接回傳共用快照；過期先給舊的、背景只跑一個刷新；刷新失敗保留上一份好的快照
+    taiex, archive, sources = get_taiex_store(), get_option_archive(), get_source_latency()
+    try:
+        return get_shared_cache().get(_cache_key("market", token), lambda: load_market(token, taiex, archive, sources), ttl=60)
+    except Exception as e:
+        TELEMETRY.error("get_data", e)
+        return fallback_market(archive)  # 完全沒有快照時，本地封存還是比空表好
+
+
+@st.cache_resource
+def get_news_store():
+    # 新聞依水位增量追加、雜湊去重；面板讀記憶體裡的最新 10 則
+    from core.flow_store import NewsHistory
+    return NewsHistory(get_finmind_client())
+
+
+@st.cache_resource
+def get_institutional_store():
+    # 三大法人買賣超只抓水位之後的交易日，歷史留在本地給趨勢用
+    from core.flow_store import InstitutionalHistory
+    return InstitutionalHistory(get_finmind_client())
+
+
+def _latest_slice(store, token, stage):
+    # 補抓失敗照樣回傳本地已有的最新切片
+    try:
+        with TELEMETRY.span(f"load.{stage}"):
+            store.refresh(token)
+    except Exception as e:
+        TELEMETRY.error(stage, e)
+    return store.latest()
+
+
+def get_real_news(token):
+    return _latest_slice(get_news_store(), token, "news")
+
+
+def get_institutional_data(token):
+    return _latest_slice(get_institutional_store(), token, "institutional")
+
+
+@TELEMETRY.cached("support_pressure", st.cache_data(ttl=3600))
+def get_support_pressure(token):
+    try:
+        df = get_taiex_store().window(token, 90)
+        if df.empty: return 0, 0
+        pressure = df['max'].tail(20).max()
+        support = df['min'].tail(60).min()
+        return pressure, support
+    except Exception as e:
+        TELEMETRY.error("support_pressure", e)
+        return 0, 0
+
+
+@st.cache_resource
+def get_iv_cache():
+    # 跨 session 共用，以 (資料日期, 月份) 為鍵，get_data 60 秒 TTL 內重複掃描不重解
+    from core.iv import IVCache
+    return IVCache()
+
+
+@st.cache_resource
+def get_render_cache():
+    # 顯示用表格 / Plotly 圖以 (快照版本, 元件參數) 記憶，跨 session 共用
+    from core.render_cache import RenderCache
+    cache = RenderCache()
+    TELEMETRY.add_collector(lambda: [("render_cache_total", {"result": k}, v) for k, v in cache.stats().items() if k != "entries"])
+    return cache
+
+
+def snapshot_version(as_of, chain, S):
+    # 同一份 get_data 快照 → 同一個版本字串 (get_scan_index 也是以這三者為鍵)
+    return f"{pd.Timestamp(as_of):%Y%m%d}:{len(chain)}:{S:.2f}"
+
+
+@st.cache_resource
+def get_quote_streamer():
+    # 盤中串流：secrets QUOTE_REPLAY (或環境變數 BEIGOU_QUOTE_REPLAY) 指向回放檔才啟用；接券商行情時換成 QueueSource
+    path = st.secrets.get("QUOTE_REPLAY", os.environ.get("BEIGOU_QUOTE_REPLAY", ""))
+    if not path: return None
+    from core.quote_stream import QuoteStreamer, ReplaySource
+    streamer = QuoteStreamer(ReplaySource(path, speed=float(st.secrets.get("QUOTE_REPLAY_SPEED", 1.0))), push_interval=1.0)
+    TELEMETRY.add_collector(lambda: [(f"stream_{k}_total", {}, v) for k, v in streamer.stats().items()])
+    return streamer
+
+
+def seed_quote_streamer(streamer, version, chain, S, as_of, smile):
+    # 每份收盤快照只建一次定價表 (各合約 iv 同掃描用的 chain_sigma)，之後盤中報價只增量更新
+    def build():
+        from core.iv import chain_sigma
+        from core.quote_stream import LiveRepricer
+        return LiveRepricer(chain, S, as_of, sigma=chain_sigma(chain, smile, S))
+    streamer.seed(version, build)
+
+
+@TELEMETRY.cached("scan_index", st.cache_resource(max_entries=4))
+def get_scan_index(_chain, S, as_of, n_rows):
+    # 每份 get_data 快照 (S, 資料日期, 列數) 只建一次：正規化、全月份 IV、Delta、分數都先算好
+    # _chain 以底線開頭，Streamlit 不雜湊整張表
+    from core.iv import chain_sigma
+    from core.scan_index import ScanIndex
+    from core.scanner import contract_days_to_expiry
+    chain = _chain.assign(**{c: pd.to_numeric(_chain[c], errors="coerce").fillna(0) for c in ["close", "volume", "strike_price"]})
+    contracts = chain["contract_date"].astype("category").cat.categories.astype(str)
+    monthly = [c for c, d in zip(contracts, contract_days_to_expiry(contracts, as_of)) if np.isfinite(d)]
+    smile = get_iv_cache().smile(chain, S, as_of, monthly) if monthly else pd.DataFrame()
+    return ScanIndex(chain, S, as_of, sigma=chain_sigma(chain, smile, S)), smile
+
+
+@st.cache_resource
+def get_oi_tracker():
+    # 以交易日保存每日 (履約價 × 買賣權) 未平倉，新交易日只樞紐那一天
+    from core.oi_walls import OIWallTracker
+    return OIWallTracker()
+
+
+@TELEMETRY.cached("oi_walls", st.cache_resource(max_entries=4))
+def get_oi_walls(_chain, as_of, n_rows):
+    # 每份快照算一次；前一交易日從本地封存讀單一分區算日增減
+    archive = get_option_archive()
+    return get_oi_tracker().walls(as_of, _chain, prev_day=archive.previous_date(as_of), load_day=archive.read_day)
+
+
+@st.cache_resource
+def warm_option_archive(token, max_days=500):
+    # 回測要的 TXO 歷史 (1000 天，分段約 33 次請求) 在背景回補一次，不放在回測按鈕上；補完之前回測先用近似表
+    archive = get_option_archive()
+
+    def run():
+        try:
+            archive.backfill(token, date.today() - timedelta(days=backtest_window(max_days)))
+        except Exception as e:
+            TELEMETRY.error("option_archive.backfill", e)
+    thread = threading.Thread(target=run, name="txo-backfill", daemon=True)
+    thread.start()
+    return thread
+
+
+@TELEMETRY.cached("backtest_sweep", st.cache_resource(ttl=3600))
+def get_backtest_sweep(token):
+    # 整張 槓桿 × 天數 表一次算好 (近似法)，滑桿移動只查表；cache_resource 不複製數 MB 的陣列
+    from core.sweep import sweep_leverage_horizon
+    return sweep_leverage_horizon(get_taiex_store().window(token, 1000))
+
+
+@TELEMETRY.cached("backtest", st.cache_data(ttl=3600))
+def backtest_taiex_leverage_v191(lev, days, token):
+    return leverage_backtest(token, lev, days, get_option_archive(), get_taiex_store(), sweep=lambda: get_backtest_sweep(token))
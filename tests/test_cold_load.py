@@ -0,0 +1,52 @@
+"""
+冷啟動：load_market 對本地假 FinMind 伺服器並行抓 TAIEX / TXO，並回報各來源延遲
+執行：python -m pytest -q
+"""
+
+import time
+
+import pytest
+
+from benchmarks.fake_finmind import FakeFinMind
+from core.finmind_client import FinMindClient
+from core.market import load_market
+from core.option_archive import OptionArchive
+from core.taiex_store import TaiexHistory
+
+DELAYS = {"TaiwanStockPrice": 0.4, "TaiwanOptionDaily": 0.8}
+
+
+@pytest.fixture
+def stores(tmp_path):
+    with FakeFinMind(dict(DELAYS)) as fake:
+        client = FinMindClient(api_url=fake.api_url)
+        yield fake, TaiexHistory(client, path=str(tmp_path / "taiex.parquet")), OptionArchive(client, root=str(tmp_path / "txo"))
+
+
+def test_cold_load_fetches_sources_concurrently(stores):
+    _, taiex, archive = stores
+    sources = {}
+    t0 = time.perf_counter()
+    S, chain, as_of, ma20, ma60 = load_market("", taiex, archive, sources)
+    elapsed = time.perf_counter() - t0
+
+    assert S > 0 and not chain.empty
+    assert elapsed < sum(r.seconds for r in sources.values()), "兩個來源應同時發出，總時間接近最慢的那一個"
+    assert set(sources) == {"taiex", "txo"}
+    assert all(r.ok and r.value is None for r in sources.values())
+    assert sources["taiex"].seconds >= DELAYS["TaiwanStockPrice"]
+    assert sources["txo"].seconds >= DELAYS["TaiwanOptionDaily"]
+
+
+def test_txo_failure_uses_local_archive(stores, monkeypatch):
+    _, taiex, archive = stores
+    load_market("", taiex, archive)
+
+    def down(token, force=False): raise ConnectionError("upstream down")
+    monkeypatch.setattr(archive, "update", down)
+    sources = {}
+    _, chain, _, _, _ = load_market("", taiex, archive, sources)
+
+    assert not chain.empty, "TXO 抓不到要沿用本地封存的最新交易日"
+    assert sources["taiex"].ok
+    assert not sources["txo"].ok and sources["txo"].error.startswith("ConnectionError")
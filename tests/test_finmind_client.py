@@ -0,0 +1,38 @@
+"""
+FinMindClient：只有認證錯誤才重登；換 token 時舊的連線池過了寬限期才關
+執行：python -m pytest -q
+"""
+
+import pytest
+
+from benchmarks.fake_finmind import FakeFinMind
+from core.finmind_client import FinMindClient, is_auth_error
+
+
+@pytest.mark.parametrize("message, auth", [
+    ("Final response status: 401, text: Unauthorized", True),
+    ("Final response status: 403, text: Forbidden", True),
+    ('Final response status: 400, text: {"msg": "Your token is invalid"}', True),
+    ('Final response status: 402, text: {"msg": "Requests reach the upper limit. token level: register"}', False),
+    ("HTTPSConnectionPool: Read timed out", False),
+])
+def test_is_auth_error(message, auth):
+    assert is_auth_error(Exception(message)) is auth
+
+
+def test_token_swap_keeps_old_pool_until_grace():
+    with FakeFinMind() as fake:
+        client = FinMindClient(api_url=fake.api_url)
+        old = client.loader("a")
+        client.fetch("a", "taiwan_stock_daily", stock_id="TAIEX", start_date="2026-01-01")
+        before = client.stats()["connections"]
+
+        assert client.loader("b") is not old
+        assert [dl for _, dl in client._retired] == [old], "其他執行緒可能還在用舊的，不能馬上關"
+        # 舊 session 仍可送請求，連線沒有被關掉
+        old.taiwan_stock_daily(stock_id="TAIEX", start_date="2026-01-01")
+        assert client.stats()["connections"] == before
+
+        client.retire_grace = 0.0
+        client.loader("b")
+        assert client._retired == []
@@ -0,0 +1,48 @@
+"""
+QuoteStreamer 重新 seed：盤中已收到的各合約最新報價要套回新的定價表，比新收盤資料舊的不套
+執行：python -m pytest -q
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_iv import S, make_full_chain
+from core.quote_stream import INDEX_SYMBOL, LiveRepricer, Quote, QueueSource, QuoteStreamer
+
+
+def wait_for(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not cond() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cond()
+
+
+def test_reseed_reapplies_latest_option_quotes():
+    chain = make_full_chain().drop(columns="true_iv")
+    today = pd.Timestamp.now("Asia/Taipei").normalize().tz_localize(None)  # 收盤資料日是台北日期
+    yesterday = today - pd.Timedelta(days=1)
+    source = QueueSource()
+    streamer = QuoteStreamer(source, push_interval=0.01)
+    streamer.seed("v1", lambda: LiveRepricer(chain, S, yesterday))
+    symbols = list(streamer._repricer.symbols)[:3]
+    now = time.time()
+    for i, sym in enumerate(symbols):
+        source.push(Quote(now, sym, 100.0 + i))
+        source.push(Quote(now + 1, sym, 200.0 + i))  # 同一檔只留最後一筆
+    source.push(Quote(now, INDEX_SYMBOL, S + 50))
+    wait_for(lambda: streamer.stats()["ticks"] == 7)
+
+    streamer.seed("v2", lambda: LiveRepricer(chain, S, yesterday))
+    snap = streamer.snapshot()
+    rows = [streamer._repricer.symbols[sym] for sym in symbols]
+    np.testing.assert_array_equal(snap.close[rows], [200.0, 201.0, 202.0])
+    assert np.isfinite(snap.updated[rows]).all() and snap.S == S + 50
+
+    # 新的收盤資料是今天的：今天盤中的報價已經比它舊，不能蓋掉收盤價
+    streamer.seed("v3", lambda: LiveRepricer(chain, S, today))
+    snap = streamer.snapshot()
+    assert not np.isfinite(snap.updated).any() and snap.S == S
+    source.close()
+    assert streamer.done.wait(5)
@@ -0,0 +1,58 @@
+"""
+WriteBehindQueue：被拒的列移到 dead_letter、不拖累同批其他列；暫時性錯誤重試到 max_attempts 為止
+執行：python -m pytest -q
+"""
+
+import pytest
+from supabase import create_client
+
+from benchmarks.fake_supabase import FAKE_KEY, FakeSupabase
+from core.write_queue import SupabaseSink, WriteBehindQueue
+
+
+@pytest.fixture
+def fake():
+    with FakeSupabase() as server:
+        yield server
+
+
+def make_queue(tmp_path, fake, **kwargs):
+    sink = SupabaseSink(lambda: create_client(fake.url, FAKE_KEY))
+    return WriteBehindQueue(str(tmp_path / "outbox.sqlite"), sink, is_transient=sink.is_transient,
+                            base_backoff=0.0, start=False, **kwargs)
+
+
+def test_rejected_row_goes_to_dead_letter(tmp_path, fake):
+    queue = make_queue(tmp_path, fake)
+    for i in range(5):
+        queue.enqueue("vips", f"u{i}@x.tw", {"email": f"u{i}@x.tw", "uses": 0})
+    queue.enqueue("vips", "bad", {"email": None, "uses": 0})
+
+    assert queue.flush() == 0
+    assert sorted(fake.tables["vips"]) == [f"u{i}@x.tw" for i in range(5)]
+    stats = queue.stats()
+    assert stats["pending"] == 0 and stats["dead"] == 1
+    key, attempts, error = queue._conn().execute("SELECT key, attempts, last_error FROM dead_letter").fetchone()
+    assert key == "bad" and attempts == 1 and "23502" in error
+
+
+def test_transient_errors_stop_after_max_attempts(tmp_path, fake):
+    fake.fail_rate = 1.0
+    queue = make_queue(tmp_path, fake, max_attempts=3)
+    queue.enqueue("vips", "a@x.tw", {"email": "a@x.tw", "uses": 0})
+
+    for attempt in range(1, 4):
+        assert queue.flush_once() == 0
+        assert queue.pending() == (1 if attempt < 3 else 0)
+    assert queue.dead() == 1
+    assert len(fake.requests) == 3
+
+
+def test_is_transient():
+    class APIError(Exception):
+        def __init__(self, code): self.code = code
+
+    assert SupabaseSink.is_transient(ConnectionError("reset"))
+    assert SupabaseSink.is_transient(APIError(503)) and SupabaseSink.is_transient(APIError("40P01"))
+    assert not SupabaseSink.is_transient(APIError("42P10"))  # on_conflict 欄位沒有唯一鍵
+    assert not SupabaseSink.is_transient(APIError("23502"))